@@ -0,0 +1,306 @@
+"""Retrain the diagnosis classifier from feedback on diagnostic logs.
+
+Diagnosed photos are kept under ``ml.IMAGE_DIR`` by content hash and their
+log rows carry ``image_hash``. A run of :func:`retrain`:
+
+1. pages through ``diagnostic_logs`` by id and turns ``user_feedback`` into
+   labels (see :func:`feedback_label`);
+2. embeds only images whose hash is not in the dataset yet, using the
+   served model without its classification layer, and appends them to an
+   embedding shard, then deletes photos past their retention (see
+   :func:`app.services.ml.prune_images`);
+3. trains a new classification layer on the embeddings on CPU, starting
+   from the current one so known classes keep their indices;
+4. publishes ``MODEL_DIR/vNNNN`` and moves ``MODEL_DIR/CURRENT`` to it when
+   it does at least as well as the served model on a held-out split.
+
+Running workers swap to the new version on their own, see
+:func:`app.services.ml.check_for_update`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from utils.symptom_action_map import SYMPTOM_ACTION_MAP
+
+from ..services import ml
+from ..utils import storage
+
+FEEDBACK_DIR = Path(os.getenv("FEEDBACK_DIR", "artifacts/feedback"))
+PAGE_SIZE = int(os.getenv("FEEDBACK_PAGE_SIZE", "500"))
+MIN_CLASS_EXAMPLES = int(os.getenv("FEEDBACK_MIN_CLASS_EXAMPLES", "5"))
+EMBED_BATCH_SIZE = 32
+HOLDOUT_BUCKETS = 5
+"""One image in ``HOLDOUT_BUCKETS`` (chosen by hash) is held out for evaluation."""
+
+CONFIRM = {"correct", "corect", "ok", "yes", "da", "true"}
+NEW_LABEL_PREFIX = "label:"
+"""Feedback starting with this names a class the model does not know yet."""
+_LABEL = re.compile(r"^[a-z][a-z0-9_]{1,40}$")
+
+
+def _normalize(text: str) -> str:
+    return text.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def known_classes(label_map: dict[str, int]) -> set[str]:
+    """Classes feedback may name without the new-label prefix."""
+    return (set(label_map) | set(SYMPTOM_ACTION_MAP)) - {"unknown"}
+
+
+def feedback_label(feedback, predicted_class: str | None, known: set[str]) -> str | None:
+    """Turn free-form feedback into a training label.
+
+    Confirmations keep the predicted class and a ``known`` class name
+    relabels the image. A class the model has never seen has to be written
+    as ``label:<name>``; anything else is ignored, so comments never become
+    classes.
+    """
+    text = str(feedback or "").strip().lower()
+    if text.startswith(NEW_LABEL_PREFIX):
+        label = _normalize(text[len(NEW_LABEL_PREFIX):])
+        return label if _LABEL.match(label) else None
+    text = _normalize(text)
+    if text in CONFIRM:
+        return predicted_class
+    return text if text in known else None
+
+
+def iter_feedback(
+    backend: storage.StorageBackend, known: set[str], page_size: int = PAGE_SIZE
+) -> Iterator[tuple[str, str]]:
+    """Yield ``(image_hash, label)`` for labeled logs, one page at a time.
+
+    Feedback can be changed after the fact, so every run walks the whole
+    table; only rows are fetched, never images.
+    """
+    after_id = None
+    columns = ("id", "image_hash", "predicted_class", "user_feedback")
+    while True:
+        page = backend.scan("diagnostic_logs", after_id, page_size, columns)
+        for row in page:
+            label = feedback_label(row.get("user_feedback"), row.get("predicted_class"), known)
+            if label and row.get("image_hash"):
+                yield row["image_hash"], label
+        if len(page) < page_size:
+            return
+        after_id = page[-1]["id"]
+
+
+def _holdout(digest: str) -> bool:
+    return int(digest[:8], 16) % HOLDOUT_BUCKETS == 0
+
+
+class FeedbackDataset:
+    """Embeddings of labeled images, stored once per image and embedder.
+
+    Each run appends the embeddings it computed as one ``.npz`` shard under
+    ``<directory>/embeddings/<embedder>/``; earlier shards are never
+    rewritten.
+    """
+
+    def __init__(self, embedder: str, directory: Path = FEEDBACK_DIR) -> None:
+        self.directory = directory / "embeddings" / re.sub(r"[^A-Za-z0-9_.-]+", "_", embedder)
+        self.vectors: dict[str, np.ndarray] = {}
+        for shard in sorted(self.directory.glob("*.npz")):
+            with np.load(shard) as data:
+                self.vectors.update(zip(data["hashes"].tolist(), data["vectors"]))
+
+    def missing(self, hashes) -> list[str]:
+        return [h for h in dict.fromkeys(hashes) if h not in self.vectors]
+
+    def add(self, hashes: list[str], vectors: np.ndarray) -> None:
+        if not hashes:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        shard = self.directory / f"{len(list(self.directory.glob('*.npz'))):05d}.npz"
+        tmp = shard.with_name(shard.stem + ".tmp.npz")
+        np.savez(tmp, hashes=np.array(hashes), vectors=vectors.astype(np.float32))
+        os.replace(tmp, shard)
+        self.vectors.update(zip(hashes, vectors))
+
+
+class Classifier:
+    """A served diagnosis model split into embedder and classification layer."""
+
+    def __init__(self, version: str | None) -> None:
+        import tensorflow as tf
+
+        self.version = version
+        model_path, _, label_map_path = ml.artifact_paths(version)
+        self.model = tf.keras.models.load_model(model_path)
+        self.head = self.model.layers[-1]
+        if not isinstance(self.head, tf.keras.layers.Dense):
+            raise ValueError("The last layer of the diagnosis model must be a Dense classifier")
+        self.body = tf.keras.Model(self.model.inputs, self.model.layers[-2].output)
+        self.label_map = json.loads(label_map_path.read_text())
+        meta = model_path.parent / "metadata.json"
+        if version is not None and meta.exists():
+            self.embedder = json.loads(meta.read_text())["embedder"]
+        else:
+            self.embedder = f"{model_path.name}:{model_path.stat().st_mtime_ns}"
+
+    def embed(self, hashes: list[str]) -> tuple[list[str], np.ndarray]:
+        """Embed stored images, skipping hashes whose file is missing or unreadable."""
+        found, batches, images = [], [], []
+        for digest in hashes:
+            path = ml.IMAGE_DIR / digest[:2] / f"{digest}.img"
+            try:
+                images.append(ml._preprocess(path.read_bytes()))
+            except Exception as exc:
+                logging.error("Skipping image %s: %s", digest, exc)
+                continue
+            found.append(digest)
+            if len(images) == EMBED_BATCH_SIZE:
+                batches.append(self._embed_batch(images))
+                images = []
+        if images:
+            batches.append(self._embed_batch(images))
+        width = self.body.output.shape[-1]
+        return found, np.concatenate(batches) if batches else np.empty((0, width), dtype=np.float32)
+
+    def _embed_batch(self, images: list[np.ndarray]) -> np.ndarray:
+        batch = np.stack(images).astype(np.float32) * ml._SCALE
+        return np.asarray(self.body.predict_on_batch(batch))
+
+    def accuracy(self, x: np.ndarray, labels: list[str]) -> float:
+        """Accuracy of the current classification layer on embeddings."""
+        if not labels:
+            return 0.0
+        index_to_class = {v: k for k, v in self.label_map.items()}
+        predicted = np.argmax(np.asarray(self.head(x)), axis=1)
+        return float(np.mean([index_to_class.get(int(p)) == label for p, label in zip(predicted, labels)]))
+
+
+def class_list(label_map: dict[str, int], labels: list[str], min_examples: int = MIN_CLASS_EXAMPLES) -> list[str]:
+    """Known classes in index order, then new labels with enough examples."""
+    known = sorted(label_map, key=label_map.get)
+    counts: dict[str, int] = {}
+    for label in labels:
+        counts[label] = counts.get(label, 0) + 1
+    new = sorted(label for label, n in counts.items() if label not in label_map and n >= min_examples)
+    return known + new
+
+
+def train_head(classifier: Classifier, classes: list[str], x: np.ndarray, y: np.ndarray, epochs: int = 30):
+    """Fit a softmax layer on embeddings, starting from the served weights."""
+    import tensorflow as tf
+
+    kernel, bias = classifier.head.get_weights()
+    new_kernel = np.random.default_rng(0).normal(0, 0.01, (kernel.shape[0], len(classes))).astype(np.float32)
+    new_bias = np.zeros(len(classes), dtype=np.float32)
+    new_kernel[:, : kernel.shape[1]] = kernel
+    new_bias[: bias.shape[0]] = bias
+
+    head = tf.keras.Sequential([tf.keras.Input((x.shape[1],)), tf.keras.layers.Dense(len(classes), activation="softmax")])
+    head.layers[-1].set_weights([new_kernel, new_bias])
+    head.compile(optimizer=tf.keras.optimizers.Adam(1e-3), loss="sparse_categorical_crossentropy")
+    counts = np.bincount(y, minlength=len(classes))
+    weights = {i: len(y) / (len(classes) * n) for i, n in enumerate(counts) if n}
+    head.fit(x, y, epochs=epochs, batch_size=32, class_weight=weights, verbose=0)
+    return head.layers[-1]
+
+
+def _next_version(model_dir: Path) -> str:
+    numbers = [int(p.name[1:]) for p in model_dir.glob("v[0-9]*") if p.name[1:].isdigit()]
+    return f"v{max(numbers, default=0) + 1:04d}"
+
+
+def publish(classifier: Classifier, head, classes: list[str], metadata: dict, model_dir: Path | None = None) -> str:
+    """Write a new artifact version and point ``CURRENT`` at it."""
+    import tensorflow as tf
+
+    model_dir = model_dir or ml.MODEL_DIR
+    model_dir.mkdir(parents=True, exist_ok=True)
+    version = _next_version(model_dir)
+    staging = model_dir / f".{version}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+
+    dense = tf.keras.layers.Dense(len(classes), activation="softmax", name=f"classifier_{version}")
+    model = tf.keras.Model(classifier.body.inputs, dense(classifier.body.output))
+    dense.set_weights(head.get_weights())
+    model.save(staging / "model.keras")
+    (staging / "label_map.json").write_text(json.dumps({c: i for i, c in enumerate(classes)}, indent=2))
+    (staging / "metadata.json").write_text(json.dumps({"version": version, **metadata}, indent=2))
+    os.replace(staging, model_dir / version)
+
+    tmp = model_dir / "CURRENT.tmp"
+    tmp.write_text(version)
+    os.replace(tmp, model_dir / "CURRENT")
+    logging.info("Published diagnosis model %s", version)
+    return version
+
+
+def retrain(
+    backend: storage.StorageBackend | None = None,
+    epochs: int = 30,
+    min_examples: int = MIN_CLASS_EXAMPLES,
+    force: bool = False,
+    dry_run: bool = False,
+    feedback_dir: Path = FEEDBACK_DIR,
+) -> dict:
+    """Run the pipeline once and return a report of what it did."""
+    backend = backend or storage.get_backend()
+    classifier = Classifier(ml.current_version())
+    labels = dict(iter_feedback(backend, known_classes(classifier.label_map)))
+    dataset = FeedbackDataset(classifier.embedder, feedback_dir)
+    found, vectors = classifier.embed(dataset.missing(labels))
+    dataset.add(found, vectors)
+    pruned = ml.prune_images()
+
+    usable = [h for h in labels if h in dataset.vectors]
+    classes = class_list(classifier.label_map, [labels[h] for h in usable], min_examples)
+    index = {c: i for i, c in enumerate(classes)}
+    usable = [h for h in usable if labels[h] in index]
+    train = [h for h in usable if not _holdout(h)]
+    holdout = [h for h in usable if _holdout(h)]
+    report = {
+        "parent": classifier.version,
+        "embedder": classifier.embedder,
+        "classes": classes,
+        "labeled": len(labels),
+        "embedded_now": len(found),
+        "pruned_images": pruned,
+        "train": len(train),
+        "holdout": len(holdout),
+        "published": None,
+    }
+    if not train:
+        report["reason"] = "no labeled images"
+        return report
+
+    def xy(hashes):
+        return np.stack([dataset.vectors[h] for h in hashes]), np.array([index[labels[h]] for h in hashes])
+
+    head = train_head(classifier, classes, *xy(train), epochs=epochs)
+    if holdout:
+        x_holdout, y_holdout = xy(holdout)
+        report["accuracy"] = float(np.mean(np.argmax(np.asarray(head(x_holdout)), axis=1) == y_holdout))
+        report["baseline_accuracy"] = classifier.accuracy(x_holdout, [labels[h] for h in holdout])
+
+    if dry_run:
+        report["reason"] = "dry run"
+    elif not force and not holdout:
+        report["reason"] = "no held-out images to evaluate on"
+    elif not force and report["accuracy"] < report["baseline_accuracy"]:
+        report["reason"] = "held-out accuracy below the served model"
+    else:
+        metadata = {k: report[k] for k in ("parent", "embedder", "train", "holdout")}
+        metadata.update(
+            accuracy=report.get("accuracy"),
+            baseline_accuracy=report.get("baseline_accuracy"),
+            created_at=datetime.now(timezone.utc).isoformat(),
+        )
+        report["published"] = publish(classifier, head, classes, metadata)
+    return report
@@ -1,5 +1,55 @@
+import numpy as np
 import pandas as pd
-from datetime import timedelta
+
+
+def index_forecast(forecast_df: pd.DataFrame) -> dict:
+    """
+    Indexează prognoza o singură dată: dată -> True dacă prima intrare din ziua respectivă e 'rainy'.
+    """
+    dates = pd.to_datetime(forecast_df['date']).dt.date
+    first = ~dates.duplicated()
+    rainy = forecast_df['weather_outside'].to_numpy()[first.to_numpy()] == 'rainy'
+    return dict(zip(dates[first], rainy))
+
+
+def recommend_watering_batch(
+    model,
+    rows: pd.DataFrame,
+    forecast_df: pd.DataFrame = None,
+    moisture_threshold: float = 60.0,
+    rainy_days: dict = None,
+) -> pd.DataFrame:
+    """
+    Variantă vectorizată a `recommend_watering` pentru un DataFrame de observații.
+    Un singur apel `model.predict`; prognoza se indexează o dată (sau se dă deja indexată prin `rainy_days`).
+    Returnează un DataFrame cu coloanele water_given_ml, avoid_overwatering, next_watering_datetime.
+    """
+    timestamps = pd.to_datetime(rows['timestamp']) if 'timestamp' in rows else None
+    features = rows.drop(columns='timestamp', errors='ignore')
+
+    preds = np.asarray(model.predict(features), dtype=float)
+    vol, next_days = preds[:, 0], preds[:, 1]
+
+    avoid = (features['soil_moisture'].to_numpy() >= moisture_threshold) | (vol <= 0)
+    next_dt = np.full(len(rows), None, dtype=object)
+
+    if timestamps is not None:
+        if rainy_days is None and forecast_df is not None:
+            rainy_days = index_forecast(forecast_df)
+        if rainy_days:
+            avoid |= timestamps.dt.date.map(rainy_days).fillna(False).to_numpy(dtype=bool)
+        formatted = (timestamps + pd.to_timedelta(next_days, unit='D')).dt.strftime('%Y-%m-%d %H:%M')
+        next_dt = np.where(formatted.notna(), formatted.astype(object), None)
+
+    return pd.DataFrame(
+        {
+            'water_given_ml': np.where(avoid, 0.0, vol).round(1),
+            'avoid_overwatering': avoid,
+            'next_watering_datetime': pd.Series(next_dt, index=rows.index, dtype=object),
+        },
+        index=rows.index,
+    )
+
 
 def recommend_watering(model, row: dict, forecast_df: pd.DataFrame = None, moisture_threshold: float = 60.0) -> dict:
     """
@@ -9,31 +59,9 @@ def recommend_watering(model, row: dict, forecast_df: pd.DataFrame = None, moist
         - avoid_overwatering (bool)
         - next_watering_datetime (str)
     """
-    timestamp = row.get("timestamp")
-    input_row = row.copy()
-    if "timestamp" in input_row:
-        input_row.pop("timestamp")
-
-    df = pd.DataFrame([input_row])
-    preds = model.predict(df)[0]
-    vol, next_days = float(preds[0]), float(preds[1])
-
-    avoid = False
-    if row['soil_moisture'] >= moisture_threshold or vol <= 0:
-        avoid = True
-        vol = 0.0
-
-    if forecast_df is not None and timestamp is not None:
-        today = pd.to_datetime(timestamp).date()
-        mask = forecast_df['date'].dt.date == today
-        if mask.any() and forecast_df.loc[mask, 'weather_outside'].iloc[0] == 'rainy':
-            avoid = True
-            vol = 0.0
-
-    next_dt = pd.to_datetime(timestamp) + timedelta(days=next_days) if timestamp else None
-
+    result = recommend_watering_batch(model, pd.DataFrame([row]), forecast_df, moisture_threshold).iloc[0]
     return {
-        'water_given_ml': round(vol, 1),
-        'avoid_overwatering': avoid,
-        'next_watering_datetime': next_dt.strftime('%Y-%m-%d %H:%M') if next_dt is not None else None
+        'water_given_ml': float(result['water_given_ml']),
+        'avoid_overwatering': bool(result['avoid_overwatering']),
+        'next_watering_datetime': result['next_watering_datetime'],
     }
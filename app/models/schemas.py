@@ -20,3 +20,18 @@ class PlantInfo(BaseModel):
     description: str | None = None
     tratament: str | None = None
 
+
+class DeviceCommand(BaseModel):
+    """Command sent to a device."""
+
+    type: str = "water"
+    payload: dict | None = None
+    command_id: str | None = None
+
+
+class ReportingParams(BaseModel):
+    """Dead-band reporting overrides for one device."""
+
+    thresholds: dict[str, float] | None = None
+    heartbeat_s: int | None = Field(None, ge=10)
+    sample_s: int | None = Field(None, ge=1)
@@ -1,9 +1,13 @@
 """Image diagnosis and diagnostic logs."""
 
+import logging
+
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Body
 
-from ..services import ml
-from ..utils.db import client as supabase
+from ..services import cache, decision, ml
+from ..utils import storage
+from ..utils.executor import run_blocking, run_db
+from ..utils.features import DIAGNOSIS_ENABLED
 from ..utils.security import verify_api_key
 from utils.symptom_action_map import SYMPTOM_ACTION_MAP
 
@@ -11,12 +15,26 @@ router = APIRouter()
 
 
 @router.post("/api/diagnose-photo", dependencies=[Depends(verify_api_key)])
-async def diagnose_photo(file: UploadFile = File(...), plant_type: str | None = None):
+async def diagnose_photo(
+    file: UploadFile = File(...), plant_type: str | None = None, device_id: str | None = None
+):
     """Diagnose a plant photo using the ML model."""
+    if not DIAGNOSIS_ENABLED:
+        raise HTTPException(status_code=503, detail="Diagnosis is disabled")
+    if file.size is not None and file.size > ml.MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
     try:
         contents = await file.read()
-        predicted_class, confidence, scores = ml.predict(contents)
+        key = await run_blocking(ml.result_key, contents)
+        digest = key.rsplit(":", 1)[1]
+        # Store under the version that actually answered, which differs from
+        # the lookup key when the model is swapped during the request.
+        (predicted_class, confidence, scores, version), cached = await cache.diagnosis_results.get_or_compute(
+            key, lambda: ml.predict_async(contents), key_of=lambda result: f"{result[3]}:{digest}"
+        )
         mapping = SYMPTOM_ACTION_MAP.get(predicted_class, SYMPTOM_ACTION_MAP["unknown"])
+        if device_id:
+            decision.engine.apply_diagnosis(device_id, predicted_class, mapping)
         adjust_days = mapping["adjust_watering_days"]
         reduce_ml = mapping["reduce_water_ml"]
         decision_reason = (
@@ -31,13 +49,19 @@ async def diagnose_photo(file: UploadFile = File(...), plant_type: str | None =
             "reduce_ml": reduce_ml,
             "all_scores": scores,
             "decision_reason": decision_reason,
+            "image_hash": digest,
+            "model_version": version,
         }
-        try:
-            supabase.table("diagnostic_logs").insert(log_entry).execute()
-        except Exception as db_err:  # pragma: no cover - db error
-            import logging
-
-            logging.error("diagnostic_logs insert failed: %s", db_err)
+        if not cached:
+            try:
+                await run_blocking(ml.save_image, contents, digest)
+            except OSError as exc:
+                logging.error("Saving diagnosis image failed: %s", exc)
+            try:
+                stored = await run_db(storage.get_backend().insert, "diagnostic_logs", [log_entry])
+                cache.diagnostic_logs.add(stored or [log_entry])
+            except Exception as db_err:  # pragma: no cover - db error
+                logging.error("diagnostic_logs insert failed: %s", db_err)
         return {
             "predicted_class": predicted_class,
             "confidence": confidence,
@@ -46,32 +70,43 @@ async def diagnose_photo(file: UploadFile = File(...), plant_type: str | None =
             "adjust_days": adjust_days,
             "reduce_ml": reduce_ml,
             "decision_reason": decision_reason,
+            "cached": cached,
         }
+    except ml.ImageTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
     except Exception as exc:  # pragma: no cover - runtime errors
         raise HTTPException(status_code=500, detail=str(exc))
 
 
+@router.get("/api/diagnose-stats")
+def get_diagnose_stats():
+    """Return inference batcher metrics and result cache hit rate."""
+    return {"batcher": ml.batcher.stats(), "result_cache": cache.diagnosis_results.stats()}
+
+
 @router.get("/api/diagnostic-logs")
 async def get_diagnostic_logs(limit: int = 50):
     """Return saved diagnostic logs."""
     try:
-        response = (
-            supabase.table("diagnostic_logs").select("*").order("timestamp", desc=True).limit(limit).execute()
-        )
-        return response.data
+        return await cache.diagnostic_logs.aget(limit)
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(exc))
 
 
 @router.patch("/api/diagnostic-logs/{log_id}/feedback")
 async def update_diagnostic_feedback(log_id: str, user_feedback: str = Body(..., embed=True)):
-    """Store user feedback for a diagnostic log."""
+    """Store user feedback for a diagnostic log.
+
+    Retraining uses confirmations, known class names and ``label:<name>``
+    for new classes, see :func:`app.ml.retrain.feedback_label`.
+    """
     try:
-        response = (
-            supabase.table("diagnostic_logs").update({"user_feedback": user_feedback}).eq("id", log_id).execute()
+        updated = await run_db(
+            storage.get_backend().update, "diagnostic_logs", log_id, {"user_feedback": user_feedback}
         )
-        if response.data:
-            return {"message": "Feedback saved", "log": response.data[0]}
+        if updated:
+            cache.diagnostic_logs.update(updated[0])
+            return {"message": "Feedback saved", "log": updated[0]}
         raise HTTPException(status_code=404, detail="Log not found")
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(exc))
@@ -1,30 +1,93 @@
 """Manual watering control endpoints."""
 
-from fastapi import APIRouter
+import json
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..models.schemas import DeviceCommand, ReportingParams
+from ..services.commands import command_queue
+from ..services.deadband import reporting
+from ..services.state import DEFAULT_DEVICE
+from ..utils.executor import run_blocking
 
 router = APIRouter()
 
-water_now_manual = False
+MAX_WAIT = 60.0
+SSE_HEARTBEAT = 15.0
 
 
 @router.post("/api/manual-water")
-async def trigger_manual_water():
+async def trigger_manual_water(device_id: str = DEFAULT_DEVICE):
     """Request watering from the device."""
-    global water_now_manual
-    water_now_manual = True
-    return {"status": "manual_watering_requested"}
+    command = await command_queue.enqueue(device_id, "water")
+    return {"status": "manual_watering_requested", "command_id": command["id"]}
 
 
 @router.get("/api/manual-water-status")
-async def manual_water_status():
+async def manual_water_status(device_id: str = DEFAULT_DEVICE):
     """Return current manual watering status."""
-    return {"water_now_manual": water_now_manual}
+    pending = [c for c in await command_queue.pending(device_id) if c["type"] == "water"]
+    return {"water_now_manual": bool(pending)}
 
 
 @router.post("/api/manual-water-done")
-async def manual_water_done():
-    """Reset manual watering flag."""
-    global water_now_manual
-    water_now_manual = False
+async def manual_water_done(device_id: str = DEFAULT_DEVICE):
+    """Acknowledge all pending manual watering commands."""
+    for command in await command_queue.pending(device_id):
+        if command["type"] == "water":
+            await command_queue.ack(device_id, command["id"])
     return {"status": "manual_watering_reset"}
 
+
+@router.post("/api/devices/{device_id}/commands")
+async def create_command(device_id: str, command: DeviceCommand):
+    """Queue a command for a device. Reusing ``command_id`` is idempotent."""
+    return await command_queue.enqueue(device_id, command.type, command.payload, command.command_id)
+
+
+@router.get("/api/devices/{device_id}/commands")
+async def poll_commands(device_id: str, wait: float = Query(0, ge=0, le=MAX_WAIT)):
+    """Return pending commands, long-polling up to ``wait`` seconds."""
+    return {"commands": await command_queue.wait(device_id, wait)}
+
+
+@router.get("/api/devices/{device_id}/commands/stream")
+async def stream_commands(device_id: str):
+    """Deliver pending commands as Server-Sent Events."""
+
+    async def events():
+        sent: set[str] = set()
+        while True:
+            commands = await command_queue.wait(device_id, SSE_HEARTBEAT, exclude=sent)
+            if not commands:
+                yield ": keep-alive\n\n"
+                continue
+            for command in commands:
+                sent.add(command["id"])
+                yield f"id: {command['id']}\nevent: command\ndata: {json.dumps(command)}\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+@router.post("/api/devices/{device_id}/commands/{command_id}/ack")
+async def ack_command(device_id: str, command_id: str):
+    """Mark a command as executed by the device."""
+    command = await command_queue.ack(device_id, command_id)
+    if command is None:
+        raise HTTPException(status_code=404, detail="Command not found")
+    return command
+
+
+@router.get("/api/devices/{device_id}/reporting")
+async def get_reporting(device_id: str):
+    """Return the dead-band reporting parameters of a device."""
+    return await run_blocking(reporting.params, device_id)
+
+
+@router.put("/api/devices/{device_id}/reporting")
+async def set_reporting(device_id: str, params: ReportingParams):
+    """Override dead bands, heartbeat or sample interval for a device."""
+    return await run_blocking(reporting.set, device_id, params.thresholds, params.heartbeat_s, params.sample_s)
@@ -1,22 +1,44 @@
 """Plant related API endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 
 from ..models.schemas import PredictRequest
 from ..services import watering
-from ..utils.loaders import load_plant_info
+from ..utils.loaders import plant_catalog
 from ..utils.security import verify_api_key
 
 router = APIRouter()
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
 @router.get("/api/plant-info")
-def get_plant_info(plant_type: str | None = None):
+def get_plant_info(plant_type: str | None = None, if_none_match: str | None = Header(None)):
     """Return information about a plant type."""
-    info = load_plant_info(plant_type)
-    if not info:
+    entry = plant_catalog.serialized(plant_type)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Plant info not found")
-    return info
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _fallback(req: PredictRequest) -> dict:
+    """Simple heuristic used when the ML model is unavailable."""
+    return {
+        "water_given_ml": 80.0 if req.soil_moisture < 30 else 0.0,
+        "next_watering_days": 1 if req.soil_moisture < 30 else 3,
+        "source": "fallback",
+    }
 
 
 @router.post("/predict", dependencies=[Depends(verify_api_key)])
@@ -30,12 +52,23 @@ def predict_watering(req: PredictRequest):
             "source": "ML",
         }
     except Exception as exc:
-        # Fallback simple heuristic
-        fallback = {
-            "water_given_ml": 80.0 if req.soil_moisture < 30 else 0.0,
-            "next_watering_days": 1 if req.soil_moisture < 30 else 3,
-            "source": "fallback",
-        }
-        logging = __import__("logging")
         logging.error("ML prediction failed: %s", exc)
-        return fallback
+        return _fallback(req)
+
+
+@router.post("/predict/batch", dependencies=[Depends(verify_api_key)])
+def predict_watering_batch(reqs: list[PredictRequest]):
+    """Predict watering for many observations with a single model call."""
+    try:
+        results = watering.predict_many(reqs)
+        return [
+            {
+                "water_given_ml": round(water_ml, 1),
+                "next_watering_days": round(next_days, 1),
+                "source": "ML",
+            }
+            for water_ml, next_days in results
+        ]
+    except Exception as exc:
+        logging.error("ML batch prediction failed: %s", exc)
+        return [_fallback(req) for req in reqs]
@@ -1,65 +1,256 @@
 """Sensor data and history endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Literal
 
-from ..utils.db import client as supabase
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+
+from ..services import cache, deadband, decision, ingest, quality, rollups, sensor_codec, state
+from ..utils import storage
+from ..utils.executor import run_db
 from ..utils.security import verify_api_key
 
 router = APIRouter()
 
 
+def _device_rows(device_id: str, limit: int) -> list[dict]:
+    return storage.get_backend().recent("sensor_logs", limit, device_id)
+
+
 @router.get("/history")
-def get_history(limit: int = 20):
-    """Return recent sensor history entries."""
+async def get_history(limit: int = 20, device_id: str | None = None):
+    """Return recent sensor history entries, optionally for one device."""
     try:
-        response = (
-            supabase.table("sensor_logs").select("*").order("timestamp", desc=True).limit(limit).execute()
-        )
-        return response.data
+        if device_id:
+            return await run_db(_device_rows, device_id, limit)
+        return await cache.sensor_logs.aget(limit)
     except Exception as exc:  # pragma: no cover - db failures
         raise HTTPException(status_code=500, detail=str(exc))
 
 
 @router.get("/api/history")
-def get_watering_history(limit: int = 100):
+async def get_watering_history(limit: int = 100):
     """Return watering logs."""
     try:
-        response = (
-            supabase.table("watering_logs").select("*").order("timestamp", desc=True).limit(limit).execute()
-        )
-        return response.data
+        return await cache.watering_logs.aget(limit)
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(exc))
 
 
 @router.get("/api/sensors", dependencies=[Depends(verify_api_key)])
-async def get_sensors():
-    """Return latest sensor values."""
+async def get_sensors(device_id: str | None = None):
+    """Return latest sensor values, optionally for one device."""
+    if device_id:
+        row = state.latest.get(device_id)
+        if row is not None:
+            return row
     try:
-        response = (
-            supabase.table("sensor_logs").select("*").order("timestamp", desc=True).limit(1).execute()
-        )
-        if not response.data:
-            raise HTTPException(status_code=404, detail="No sensor data")
-        return response.data[0]
+        if device_id:
+            rows = await run_db(_device_rows, device_id, 1)
+        else:
+            rows = await cache.sensor_logs.aget(1)
+        state.latest.update(rows[:1])
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(exc))
+    if not rows:
+        raise HTTPException(status_code=404, detail="No sensor data")
+    return rows[0]
+
+
+@router.get("/api/devices", dependencies=[Depends(verify_api_key)])
+async def get_devices():
+    """Return the latest known reading of every device."""
+    return state.latest.devices()
+
+
+def _timestamp(value) -> str:
+    """Return a device timestamp (ISO string or epoch number) as an ISO string.
+
+    Unparseable values are rejected with 422 here, before the reading is
+    filtered or queued.
+    """
+    if not value:
+        return datetime.now(timezone.utc).isoformat()
+    try:
+        epoch = rollups.to_epoch(value)
+        if isinstance(value, str):
+            return value
+        return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+    except (AttributeError, TypeError, ValueError, OverflowError, OSError):
+        raise HTTPException(status_code=422, detail=f"Invalid timestamp: {value!r}")
+
+
+def _sensor_row(data: dict) -> dict:
+    """Pick the ``sensor_logs`` columns out of an ESP32 payload."""
+    return {
+        "device_id": data.get("device_id"),
+        "timestamp": _timestamp(data.get("timestamp")),
+        "plant_type": data.get("plant_type"),
+        "soil_moisture": data.get("soil_moisture"),
+        "temperature": data.get("temperature"),
+        "air_humidity": data.get("air_humidity"),
+        "light": data.get("light"),
+    }
+
+
+async def _ingest(rows: list[dict]) -> list[dict]:
+    """Filter readings, queue them for storage and update in-memory views."""
+    kept = quality.reading_filter.process(rows)
+    await ingest.sensor_buffer.put(kept)
+    state.latest.update(kept)
+    rollups.store.add_rows(kept)
+    return kept
+
+
+def _verdict(rows: list[dict], kept: list[dict]) -> dict:
+    """Decide on the newest kept reading; filtered readings never trigger watering."""
+    if kept:
+        return decision.engine.decide(kept[-1])
+    return {"water_now": False, "reason": "reading filtered" if rows else "no readings"}
 
 
 @router.post("/api/sensor-data")
 async def receive_sensor_data(data: dict):
-    """Store incoming sensor measurements from ESP32."""
+    """Store incoming sensor measurements from ESP32.
+
+    Payloads flagged ``"delta": true`` carry only the metrics that moved
+    past their dead band; the rest are taken from the device's latest
+    reading. The response tells the device which dead bands to use next.
+    """
+    rows = [_sensor_row(await deadband.merge_delta(data))]
+    try:
+        kept = await _ingest(rows)
+        row = (kept or rows)[0]
+        low, _ = decision.engine.bounds(row.get("plant_type"))
+        reporting = deadband.reporting.params(row.get("device_id"), row.get("soil_moisture"), low)
+        return {**_verdict(rows, kept), "reporting": reporting}
+    except ingest.BufferFullError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    except Exception as exc:  # pragma: no cover
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.post("/api/sensor-data/batch")
+async def receive_sensor_batch(readings: list[dict]):
+    """Store several sensor readings in one request."""
+    rows = [_sensor_row(data) for data in readings]
+    try:
+        kept = await _ingest(rows)
+        verdict = _verdict(rows, kept)
+        return {"accepted": len(kept), "filtered": len(rows) - len(kept), **verdict}
+    except ingest.BufferFullError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    except Exception as exc:  # pragma: no cover
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.post("/api/sensor-data/binary")
+async def receive_sensor_binary(request: Request):
+    """Store a compact binary batch of readings (see ``sensor_codec``)."""
+    try:
+        device_id, plant_type, records = sensor_codec.decode(await request.body())
+    except sensor_codec.PayloadError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    valid = sensor_codec.validate(records)
+    rows = sensor_codec.to_rows(device_id, plant_type, records[valid])
     try:
-        db_data = {
-            "plant_type": data.get("plant_type"),
-            "soil_moisture": data.get("soil_moisture"),
-            "temperature": data.get("temperature"),
-            "air_humidity": data.get("air_humidity"),
-            "light": data.get("light"),
+        kept = await _ingest(rows)
+        verdict = _verdict(rows, kept)
+        return {
+            "accepted": len(kept),
+            "rejected": int(len(records) - len(rows)),
+            "filtered": len(rows) - len(kept),
+            **verdict,
         }
-        supabase.table("sensor_logs").insert(db_data).execute()
-        water_now = data.get("soil_moisture", 100) < 35
-        return {"water_now": water_now}
+    except ingest.BufferFullError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    except Exception as exc:  # pragma: no cover
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+_DEFAULT_SPAN = {"minute": timedelta(hours=6), "hour": timedelta(days=7), "day": timedelta(days=90)}
+
+
+@router.get("/api/sensor-stats")
+async def get_sensor_stats(
+    device_id: str | None = None,
+    metric: Literal["soil_moisture", "temperature", "air_humidity", "light"] | None = None,
+    resolution: Literal["minute", "hour", "day"] = "hour",
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    """Return min/max/mean per time bucket for one device."""
+    device = state.device_key(device_id)
+    end_ts = rollups.to_epoch(end) if end else datetime.now(timezone.utc).timestamp()
+    start_ts = rollups.to_epoch(start) if start else end_ts - _DEFAULT_SPAN[resolution].total_seconds()
+    try:
+        await rollups.store.ensure_covered(device, start_ts)
+    except Exception as exc:  # pragma: no cover
+        raise HTTPException(status_code=500, detail=str(exc))
+    metrics = [metric] if metric else rollups.METRICS
+    return {
+        "device_id": device,
+        "resolution": resolution,
+        "metrics": {m: rollups.store.query(device, m, resolution, start_ts, end_ts) for m in metrics},
+    }
+
+
+MAX_SERIES_POINTS = 10_000
+
+
+@router.get("/api/sensor-series")
+async def get_sensor_series(
+    device_id: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    step: int = Query(60, ge=1),
+):
+    """Return a regular series rebuilt from a device's dead-band reports."""
+    device = state.device_key(device_id)
+    end_ts = rollups.to_epoch(end) if end else datetime.now(timezone.utc).timestamp()
+    start_ts = rollups.to_epoch(start) if start else end_ts - _DEFAULT_SPAN["minute"].total_seconds()
+    if not 0 < (end_ts - start_ts) / step <= MAX_SERIES_POINTS:
+        raise HTTPException(status_code=400, detail=f"Range must cover 1 to {MAX_SERIES_POINTS} steps")
+    heartbeat = deadband.reporting.params(device_id)["heartbeat_s"]
+    try:
+        # Start one stale window early so the first grid point has a value to carry.
+        rows = await run_db(rollups.fetch_raw, device, start_ts - deadband.STALE_FACTOR * heartbeat, end_ts)
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(exc))
+    series = deadband.reconstruct(rows, start_ts, end_ts, step, heartbeat)
+    return {
+        "device_id": device,
+        "step": step,
+        "timestamps": [datetime.fromtimestamp(t, timezone.utc).isoformat() for t in series["timestamps"]],
+        **{m: [None if math.isnan(v) else v for v in series[m].tolist()] for m in rollups.METRICS},
+    }
+
+
+@router.get("/api/decision-stats")
+def get_decision_stats():
+    """Return decision engine counters and prediction cache size."""
+    return decision.engine.stats()
+
+
+@router.get("/api/sensor-quality")
+def get_sensor_quality(device_id: str | None = None):
+    """Return filter counters, or one device's smoothed readings."""
+    if device_id is None:
+        return quality.reading_filter.stats()
+    smoothed = quality.reading_filter.smoothed(device_id)
+    if smoothed is None:
+        raise HTTPException(status_code=404, detail="Unknown device")
+    return smoothed
+
+
+@router.get("/api/ingest-stats")
+def get_ingest_stats():
+    """Return write-behind queue depth and flush latency counters."""
+    return ingest.sensor_buffer.stats()
+
 
+@router.get("/api/cache-stats")
+def get_cache_stats():
+    """Return hit/miss counters of the recent-rows caches."""
+    return [c.stats() for c in (cache.sensor_logs, cache.watering_logs, cache.diagnostic_logs)]
@@ -2,10 +2,14 @@
 
 import os
 import socket
-import serial
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
+from ..services import warmup
+from ..utils import metrics, storage
+from ..utils.executor import run_blocking
+
 router = APIRouter()
 
 
@@ -16,18 +20,30 @@ class WiFiCreds(BaseModel):
     password: str
 
 
+def _write_serial(payload: bytes) -> None:
+    import serial
+
+    with serial.Serial("COMx", 115200, timeout=1) as ser:
+        ser.write(payload)
+
+
 @router.post("/set-wifi")
 async def set_wifi(creds: WiFiCreds):
     """Send WiFi credentials over serial to the device."""
     try:
-        ser = serial.Serial("COMx", 115200, timeout=1)
-        cmd = f"{creds.ssid},{creds.password}\n"
-        ser.write(cmd.encode())
+        await run_blocking(_write_serial, f"{creds.ssid},{creds.password}\n".encode())
         return {"status": "ok"}
     except Exception as exc:  # pragma: no cover
         return {"error": str(exc)}
 
 
+@router.get("/api/storage-stats")
+def storage_stats():
+    """Return the storage backend in use and background sync counters."""
+    sync = storage.get_sync()
+    return {"backend": type(storage.get_backend()).__name__, "sync": sync.stats() if sync else None}
+
+
 @router.get("/api/system-status")
 def system_status():
     """Return basic connection information."""
@@ -42,3 +58,15 @@ def system_status():
     except Exception:  # pragma: no cover
         return {"connected": False}
 
+
+@router.get("/health/ready")
+def readiness():
+    """Report whether the models are loaded and warmed up."""
+    ready = warmup.readiness()
+    return JSONResponse(ready, status_code=200 if ready["ready"] else 503)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Expose request and hot-path metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
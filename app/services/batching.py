@@ -0,0 +1,145 @@
+"""Dynamic micro-batching for model inference."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Group single inputs into batched calls on a worker thread.
+
+    Callers :meth:`submit` one array and receive a future for its row of the
+    output. The worker collects up to ``max_batch_size`` inputs, waiting at
+    most ``max_wait_ms`` after the first one arrives, combines them with
+    ``collate`` (``np.stack`` by default) and makes a single call to ``fn``.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "batcher",
+        collate: Callable[[list[np.ndarray]], np.ndarray] = np.stack,
+    ) -> None:
+        self.fn = fn
+        self.collate = collate
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.last_batch_size = 0
+        self.last_latency_ms = 0.0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.size_counts: dict[int, int] = {}
+
+    def start(self) -> None:
+        """Start the worker thread if it is not running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Finish queued work and stop the worker thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, item: np.ndarray) -> Future:
+        """Queue one input and return a future resolving to its output row."""
+        if self._thread is None:
+            self.start()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self, first) -> tuple[list, bool]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            entry = self._queue.get()
+            if entry is _STOP:
+                break
+            batch, stopping = self._collect(entry)
+            self._process(batch)
+        # Drain anything submitted before the stop marker.
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                self._process([entry])
+
+    def _process(self, batch: list) -> None:
+        live = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        start = time.perf_counter()
+        try:
+            outputs, error = self.fn(self.collate([item for item, _ in live])), None
+        except Exception as exc:
+            outputs, error = None, exc
+            logging.error("%s: batch of %d failed: %s", self.name, len(live), exc)
+        self._record(len(live), (time.perf_counter() - start) * 1000)
+        for i, (_, future) in enumerate(live):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(outputs[i])
+
+    def _record(self, size: int, elapsed: float) -> None:
+        self.batches += 1
+        self.items += size
+        self.last_batch_size = size
+        self.last_latency_ms = elapsed
+        self.total_latency_ms += elapsed
+        self.max_latency_ms = max(self.max_latency_ms, elapsed)
+        self.size_counts[size] = self.size_counts.get(size, 0) + 1
+
+    def stats(self) -> dict:
+        """Return batch size and latency counters."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "last_latency_ms": round(self.last_latency_ms, 2),
+            "avg_latency_ms": round(self.total_latency_ms / self.batches, 2) if self.batches else 0.0,
+            "max_latency_ms": round(self.max_latency_ms, 2),
+            "batch_sizes": dict(sorted(self.size_counts.items())),
+        }
@@ -0,0 +1,187 @@
+"""Read-through caches for recent table rows and computed results."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, Awaitable, Callable, Hashable
+
+from ..utils import storage
+from ..utils.executor import run_db
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "10"))
+SENSOR_CACHE_SIZE = int(os.getenv("SENSOR_CACHE_SIZE", "200"))
+WATERING_CACHE_SIZE = int(os.getenv("WATERING_CACHE_SIZE", "200"))
+DIAGNOSTIC_CACHE_SIZE = int(os.getenv("DIAGNOSTIC_CACHE_SIZE", "100"))
+DIAGNOSIS_RESULT_CACHE_SIZE = int(os.getenv("DIAGNOSIS_RESULT_CACHE_SIZE", "256"))
+
+
+def _storage_loader(table: str) -> Callable[[int], list[dict]]:
+    def load(limit: int) -> list[dict]:
+        return storage.get_backend().recent(table, limit)
+
+    return load
+
+
+class RecentRows:
+    """Ring buffer with the newest ``capacity`` rows of a table, newest first.
+
+    The buffer is primed from the database on a miss and then kept current
+    by :meth:`add` from the ingestion paths. After ``ttl`` seconds it is
+    reloaded so writes made by other workers become visible. Requests for
+    more rows than the buffer holds go to the database.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        capacity: int,
+        ttl: float = CACHE_TTL,
+        loader: Callable[[int], list[dict]] | None = None,
+    ) -> None:
+        self.table = table
+        self.capacity = capacity
+        self.ttl = ttl
+        self._loader = loader or _storage_loader(table)
+        self._rows: deque[dict] = deque(maxlen=capacity)
+        self._loaded_at: float | None = None
+        self._complete = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, limit: int) -> list[dict] | None:
+        """Return the newest ``limit`` rows, or ``None`` on a cache miss."""
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+            if fresh and (limit <= len(self._rows) or self._complete):
+                self.hits += 1
+                return list(islice(self._rows, max(limit, 0)))
+            self.misses += 1
+            return None
+
+    def load(self, limit: int) -> list[dict]:
+        """Fetch from the database and prime the buffer with the result."""
+        fetch = max(limit, self.capacity)
+        rows = self._loader(fetch)
+        with self._lock:
+            self._rows = deque(rows, maxlen=self.capacity)
+            self._complete = len(rows) < fetch
+            self._loaded_at = time.monotonic()
+        return rows[: max(limit, 0)]
+
+    def get(self, limit: int) -> list[dict]:
+        """Return the newest ``limit`` rows, loading them on a miss."""
+        rows = self.read(limit)
+        return rows if rows is not None else self.load(limit)
+
+    async def aget(self, limit: int) -> list[dict]:
+        """Like :meth:`get`, loading on the database pool."""
+        rows = self.read(limit)
+        return rows if rows is not None else await run_db(self.load, limit)
+
+    def add(self, rows: list[dict]) -> None:
+        """Record newly inserted rows, given oldest first."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for row in rows:
+                if self._complete and len(self._rows) == self.capacity:
+                    self._complete = False
+                self._rows.appendleft(row)
+
+    def update(self, row: dict) -> None:
+        """Replace a cached row that has the same ``id``."""
+        with self._lock:
+            for i, cached in enumerate(self._rows):
+                if cached.get("id") == row.get("id"):
+                    self._rows[i] = row
+                    break
+
+    def stats(self) -> dict:
+        """Return buffer size and hit/miss counters."""
+        total = self.hits + self.misses
+        return {
+            "table": self.table,
+            "size": len(self._rows),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class ResultCache:
+    """Bounded LRU of computed results with in-flight deduplication.
+
+    Concurrent callers asking for a key that is being computed await the
+    same computation instead of starting their own. Use from the event loop.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        key_of: Callable[[Any], Hashable] | None = None,
+    ) -> tuple[Any, bool]:
+        """Return ``(value, cached)``; ``cached`` is false only for the computing caller.
+
+        ``key_of`` gives the key a computed value is stored under when it
+        can differ from ``key``, e.g. for a result of a newer model version.
+        """
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key], True
+        if key in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key]), True
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(value)
+        self._items[key if key_of is None else key_of(value)] = value
+        if len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+        return value, False
+
+    def stats(self) -> dict:
+        """Return size and hit/miss counters."""
+        total = self.hits + self.coalesced + self.misses
+        return {
+            "size": len(self._items),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.coalesced) / total, 3) if total else 0.0,
+        }
+
+
+sensor_logs = RecentRows("sensor_logs", SENSOR_CACHE_SIZE)
+watering_logs = RecentRows("watering_logs", WATERING_CACHE_SIZE)
+diagnostic_logs = RecentRows("diagnostic_logs", DIAGNOSTIC_CACHE_SIZE)
+
+diagnosis_results = ResultCache(DIAGNOSIS_RESULT_CACHE_SIZE)
+"""Predictions keyed by image content hash and model version."""
@@ -0,0 +1,218 @@
+"""Per-device command queues for manual control."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+
+from ..utils.executor import run_db
+
+COMMAND_BACKEND = os.getenv("COMMAND_BACKEND", "memory")
+COMMAND_DB_PATH = os.getenv("COMMAND_DB_PATH", "commands.db")
+COMMAND_POLL_INTERVAL = float(os.getenv("COMMAND_POLL_INTERVAL", "0.2"))
+COMMAND_RETENTION = float(os.getenv("COMMAND_RETENTION", "86400"))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _cutoff() -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=COMMAND_RETENTION)).isoformat()
+
+
+def _command(device_id: str, type: str, payload: dict | None, command_id: str | None) -> dict:
+    return {
+        "id": command_id or uuid.uuid4().hex,
+        "device_id": device_id,
+        "type": type,
+        "payload": payload or {},
+        "created_at": _now(),
+        "acked_at": None,
+    }
+
+
+class CommandBackend(ABC):
+    """Storage for device commands.
+
+    ``enqueue`` and ``ack`` are idempotent: repeating them with the same
+    command id returns the stored command without creating a duplicate.
+    """
+
+    shared = False
+    """Whether other processes can write to this backend."""
+
+    @abstractmethod
+    def enqueue(self, device_id: str, type: str, payload: dict | None = None, command_id: str | None = None) -> dict:
+        """Store a command, or return the stored one with the same id."""
+
+    @abstractmethod
+    def pending(self, device_id: str) -> list[dict]:
+        """Return unacknowledged commands, oldest first."""
+
+    @abstractmethod
+    def ack(self, device_id: str, command_id: str) -> dict | None:
+        """Mark a command executed and return it, or ``None`` if unknown."""
+
+
+class MemoryCommandBackend(CommandBackend):
+    """Commands kept in this process only."""
+
+    def __init__(self) -> None:
+        self._commands: dict[str, dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, device_id, type, payload=None, command_id=None):
+        with self._lock:
+            commands = self._commands.setdefault(device_id, {})
+            if command_id in commands:
+                return commands[command_id]
+            cutoff = _cutoff()
+            for old in [c for c in commands.values() if c["acked_at"] and c["acked_at"] < cutoff]:
+                del commands[old["id"]]
+            command = _command(device_id, type, payload, command_id)
+            commands[command["id"]] = command
+            return command
+
+    def pending(self, device_id):
+        with self._lock:
+            return [c for c in self._commands.get(device_id, {}).values() if c["acked_at"] is None]
+
+    def ack(self, device_id, command_id):
+        with self._lock:
+            command = self._commands.get(device_id, {}).get(command_id)
+            if command is not None and command["acked_at"] is None:
+                command["acked_at"] = _now()
+            return command
+
+
+class SQLiteCommandBackend(CommandBackend):
+    """Commands in a SQLite file shared by all workers on a host."""
+
+    shared = True
+
+    def __init__(self, path: str = COMMAND_DB_PATH) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS commands ("
+                "device_id TEXT NOT NULL, id TEXT NOT NULL, type TEXT NOT NULL, payload TEXT, "
+                "created_at TEXT NOT NULL, acked_at TEXT, PRIMARY KEY (device_id, id))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS commands_pending ON commands (device_id, acked_at, created_at)"
+            )
+
+    @staticmethod
+    def _row(row: sqlite3.Row | None) -> dict | None:
+        if row is None:
+            return None
+        command = dict(row)
+        command["payload"] = json.loads(command["payload"] or "{}")
+        return command
+
+    def _get(self, device_id: str, command_id: str) -> dict | None:
+        row = self._conn.execute(
+            "SELECT * FROM commands WHERE device_id = ? AND id = ?", (device_id, command_id)
+        ).fetchone()
+        return self._row(row)
+
+    def enqueue(self, device_id, type, payload=None, command_id=None):
+        command = _command(device_id, type, payload, command_id)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM commands WHERE device_id = ? AND acked_at < ?", (device_id, _cutoff())
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO commands VALUES (?, ?, ?, ?, ?, NULL)",
+                (device_id, command["id"], type, json.dumps(command["payload"]), command["created_at"]),
+            )
+            return self._get(device_id, command["id"])
+
+    def pending(self, device_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM commands WHERE device_id = ? AND acked_at IS NULL ORDER BY created_at",
+                (device_id,),
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def ack(self, device_id, command_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE commands SET acked_at = ? WHERE device_id = ? AND id = ? AND acked_at IS NULL",
+                (_now(), device_id, command_id),
+            )
+            return self._get(device_id, command_id)
+
+
+class CommandQueue:
+    """Command backend with wake-ups for devices waiting on new commands.
+
+    Waiters in this process are woken as soon as a command is queued here.
+    With a shared backend they also re-check every ``poll_interval`` seconds
+    to pick up commands queued by other workers. Backend calls run on the
+    database pool.
+    """
+
+    def __init__(self, backend: CommandBackend, poll_interval: float = COMMAND_POLL_INTERVAL) -> None:
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self._events: dict[str, asyncio.Event] = {}
+
+    async def enqueue(
+        self, device_id: str, type: str, payload: dict | None = None, command_id: str | None = None
+    ) -> dict:
+        """Queue a command and wake the device's waiters."""
+        command = await run_db(self.backend.enqueue, device_id, type, payload, command_id)
+        event = self._events.pop(device_id, None)
+        if event is not None:
+            event.set()
+        return command
+
+    async def pending(self, device_id: str) -> list[dict]:
+        return await run_db(self.backend.pending, device_id)
+
+    async def ack(self, device_id: str, command_id: str) -> dict | None:
+        return await run_db(self.backend.ack, device_id, command_id)
+
+    async def wait(self, device_id: str, timeout: float, exclude: set[str] | None = None) -> list[dict]:
+        """Return pending commands, waiting up to ``timeout`` seconds for one.
+
+        Commands whose ids are in ``exclude`` are ignored.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            # Register before querying so a command queued while the query
+            # runs still wakes this waiter.
+            event = self._events.setdefault(device_id, asyncio.Event())
+            commands = [c for c in await self.pending(device_id) if not exclude or c["id"] not in exclude]
+            remaining = deadline - loop.time()
+            if commands or remaining <= 0:
+                return commands
+            if self.backend.shared:
+                remaining = min(remaining, self.poll_interval)
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _make_backend() -> CommandBackend:
+    if COMMAND_BACKEND == "sqlite":
+        return SQLiteCommandBackend(COMMAND_DB_PATH)
+    return MemoryCommandBackend()
+
+
+command_queue = CommandQueue(_make_backend())
+"""Command queue used by the manual control endpoints."""
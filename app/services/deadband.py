@@ -0,0 +1,182 @@
+"""Dead-band reporting: sparse device updates and series reconstruction.
+
+Devices sample on ``sample_s`` but only report when a metric moves by at
+least its threshold (a *delta*, carrying just the changed metrics) or when
+``heartbeat_s`` has passed since the last report (a full *heartbeat*).
+Deltas are completed from the device's latest reading, in memory or, after
+a restart or on another worker, from storage, so a stored value holds until
+the next row; a gap longer than ``STALE_FACTOR`` heartbeats means the
+device was offline.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from . import state
+from .rollups import METRICS, to_epoch
+from ..utils import metrics, storage
+from ..utils.executor import run_db
+
+THRESHOLDS = {
+    "soil_moisture": float(os.getenv("DEADBAND_SOIL_MOISTURE", "2")),
+    "temperature": float(os.getenv("DEADBAND_TEMPERATURE", "0.5")),
+    "air_humidity": float(os.getenv("DEADBAND_AIR_HUMIDITY", "3")),
+    "light": float(os.getenv("DEADBAND_LIGHT", "200")),
+}
+HEARTBEAT_S = int(os.getenv("DEADBAND_HEARTBEAT_S", "900"))
+SAMPLE_S = int(os.getenv("DEADBAND_SAMPLE_S", "60"))
+OVERRIDES_PATH = os.getenv("DEADBAND_OVERRIDES_PATH", "artifacts/deadband_overrides.json")
+STALE_FACTOR = 1.5
+NEAR_THRESHOLD = 5.0
+"""Soil moisture distance from the watering threshold that halves its dead band."""
+
+
+class ReportingConfig:
+    """Per-device reporting parameters with optional overrides.
+
+    With a ``path`` the overrides are kept in a JSON file, so they survive
+    restarts and every worker on the host sees changes made by the others.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path else None
+        self._overrides: dict[str, dict] = {}
+        self._mtime: int | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """Reread the overrides file if it changed since the last read.
+
+        An unreadable or corrupt file is logged once and the last good
+        overrides stay in use until the file changes again.
+        """
+        if self.path is None:
+            return
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        except OSError as exc:
+            logging.error("Reading reporting overrides %s failed: %s", self.path, exc)
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            overrides = json.loads(self.path.read_text())
+        except (OSError, ValueError) as exc:
+            logging.error("Reading reporting overrides %s failed: %s", self.path, exc)
+            return
+        if not isinstance(overrides, dict):
+            logging.error("Ignoring reporting overrides %s: not a JSON object", self.path)
+            return
+        self._overrides = overrides
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._overrides, indent=2))
+        os.replace(tmp, self.path)
+        self._mtime = self.path.stat().st_mtime_ns
+
+    def set(self, device_id: str | None, thresholds: dict | None = None, heartbeat_s: int | None = None, sample_s: int | None = None) -> dict:
+        """Override parameters for one device; ``None`` keeps the current value."""
+        key = state.device_key(device_id)
+        with self._lock:
+            self._load()
+            current = self._overrides.setdefault(key, {})
+            if thresholds:
+                current["thresholds"] = {**current.get("thresholds", {}), **{k: v for k, v in thresholds.items() if k in METRICS}}
+            if heartbeat_s is not None:
+                current["heartbeat_s"] = heartbeat_s
+            if sample_s is not None:
+                current["sample_s"] = sample_s
+            self._save()
+        return self.params(device_id)
+
+    def params(self, device_id: str | None, soil_moisture: float | None = None, soil_threshold: float | None = None) -> dict:
+        """Return the parameters a device should use for its next reports.
+
+        The soil moisture dead band is halved while the reading is within
+        :data:`NEAR_THRESHOLD` of the watering threshold.
+        """
+        with self._lock:
+            self._load()
+            override = self._overrides.get(state.device_key(device_id), {})
+        thresholds = {**THRESHOLDS, **override.get("thresholds", {})}
+        if soil_moisture is not None and soil_threshold is not None and abs(soil_moisture - soil_threshold) <= NEAR_THRESHOLD:
+            thresholds["soil_moisture"] /= 2
+        return {
+            "mode": "deadband",
+            "thresholds": thresholds,
+            "heartbeat_s": override.get("heartbeat_s", HEARTBEAT_S),
+            "sample_s": override.get("sample_s", SAMPLE_S),
+        }
+
+
+reporting = ReportingConfig(OVERRIDES_PATH)
+"""Reporting parameters returned to devices."""
+
+
+def _stored_latest(device_id: str | None) -> dict | None:
+    if device_id is None:
+        return None
+    rows = storage.get_backend().recent("sensor_logs", 1, device_id)
+    return rows[0] if rows else None
+
+
+async def merge_delta(data: dict) -> dict:
+    """Fill metrics missing from a delta report with the device's latest values.
+
+    The in-memory index only knows readings this worker received since it
+    started; otherwise the device's newest stored row is used.
+    """
+    kind = "delta" if data.get("delta") else "heartbeat" if data.get("heartbeat") else "full"
+    metrics.inc("smartplant_sensor_reports_total", kind=kind)
+    if kind != "delta":
+        return data
+    device_id = data.get("device_id")
+    latest = state.latest.get(device_id) or await run_db(_stored_latest, device_id) or {}
+    merged = dict(data)
+    for name in METRICS:
+        if name not in merged:
+            merged[name] = latest.get(name)
+    if "plant_type" not in merged:
+        merged["plant_type"] = latest.get("plant_type")
+    return merged
+
+
+def reconstruct(rows: list[dict], start: float, end: float, step: float, heartbeat_s: float = HEARTBEAT_S) -> dict:
+    """Resample sparse rows onto a regular grid by carrying values forward.
+
+    Grid points before the first row or more than ``STALE_FACTOR *
+    heartbeat_s`` after the row they would carry are NaN.
+    """
+    grid = np.arange(start, end, step)
+    series: dict = {"timestamps": grid}
+    if not rows:
+        idx = np.full(len(grid), -1)
+        times = np.empty(0)
+    else:
+        times = np.array([to_epoch(row["timestamp"]) for row in rows])
+        order = np.argsort(times, kind="stable")
+        times = times[order]
+        rows = [rows[i] for i in order]
+        idx = np.searchsorted(times, grid, side="right") - 1
+    valid = idx >= 0
+    valid[valid] &= grid[valid] - times[idx[valid]] <= STALE_FACTOR * heartbeat_s
+    for name in METRICS:
+        column = np.array([np.nan if row.get(name) is None else row[name] for row in rows], dtype=float)
+        values = np.full(len(grid), np.nan)
+        values[valid] = column[idx[valid]]
+        series[name] = values
+    return series
@@ -0,0 +1,216 @@
+"""Per-device watering decisions answered inside the ingestion request."""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from . import watering
+from .state import device_key
+from ..models.schemas import PredictRequest
+from ..utils.executor import worker_pool
+from ..utils.features import PREDICTION_ENABLED
+from ..utils.loaders import PlantCatalog, plant_catalog
+
+DEFAULT_THRESHOLD = float(os.getenv("DECISION_DEFAULT_THRESHOLD", "35"))
+MOISTURE_DELTA = float(os.getenv("DECISION_MOISTURE_DELTA", "3"))
+TEMPERATURE_DELTA = float(os.getenv("DECISION_TEMPERATURE_DELTA", "2"))
+PREDICTION_TTL = float(os.getenv("DECISION_PREDICTION_TTL", "900"))
+PREDICTION_CACHE_SIZE = int(os.getenv("DECISION_PREDICTION_CACHE_SIZE", "1024"))
+ADJUSTMENT_MIN_DAYS = 1.0
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def moisture_bounds(info: dict | None) -> tuple[float, float | None]:
+    """Parse ``watering.idealMoisture`` ("60-80%") into lower and upper bounds."""
+    text = ((info or {}).get("watering") or {}).get("idealMoisture") or ""
+    numbers = [float(n) for n in _NUMBER.findall(str(text))]
+    if not numbers:
+        return DEFAULT_THRESHOLD, None
+    return numbers[0], numbers[1] if len(numbers) > 1 else None
+
+
+class DeviceState:
+    """What the engine remembers about one device."""
+
+    __slots__ = ("last_watered", "prediction", "predicted_at", "features", "adjustment", "refreshing")
+
+    def __init__(self) -> None:
+        self.last_watered: float | None = None
+        self.prediction: tuple[float, float] | None = None
+        self.predicted_at = 0.0
+        self.features: tuple | None = None
+        self.adjustment: dict | None = None
+        self.refreshing = False
+
+
+class DecisionEngine:
+    """Decide ``water_now`` from per-plant thresholds and cached predictions.
+
+    Thresholds are derived once per catalog version from the lower bound of
+    each plant's ideal moisture range. Decisions only read in-memory state;
+    the watering model runs on the worker pool when a device's readings move
+    by more than the configured deltas or its prediction gets stale, and
+    recent predictions are memoized by plant type and rounded features.
+    """
+
+    def __init__(self, catalog: PlantCatalog = plant_catalog, predict=None) -> None:
+        self.catalog = catalog
+        self._predict = predict or watering.predict
+        self._devices: dict[str, DeviceState] = {}
+        self._catalog_data: dict | None = None
+        self._bounds: dict[str | None, tuple[float, float | None]] = {}
+        self._predictions: OrderedDict[tuple, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"decisions": 0, "refreshes": 0, "cache_hits": 0, "model_calls": 0, "model_errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def device(self, device_id: str | None) -> DeviceState:
+        key = device_key(device_id)
+        state = self._devices.get(key)
+        if state is None:
+            state = self._devices[key] = DeviceState()
+        return state
+
+    def bounds(self, plant_type: str | None) -> tuple[float, float | None]:
+        """Return the ideal moisture bounds for a plant type."""
+        data = self.catalog.get()
+        if data is not self._catalog_data:
+            self._catalog_data = data
+            self._bounds = {}
+        bounds = self._bounds.get(plant_type)
+        if bounds is None:
+            info = self.catalog.get(plant_type) if plant_type else None
+            bounds = self._bounds[plant_type] = moisture_bounds(info)
+        return bounds
+
+    def decide(self, row: dict) -> dict:
+        """Return the watering decision for a freshly ingested sensor row."""
+        now = time.time()
+        self._count("decisions")
+        state = self.device(row.get("device_id"))
+        soil = row.get("soil_moisture")
+        if soil is None:
+            return {"water_now": False, "reason": "no soil moisture reading"}
+
+        plant_type = row.get("plant_type")
+        threshold, upper = self.bounds(plant_type)
+        adjustment = state.adjustment
+        if adjustment is not None and adjustment["expires"] <= now:
+            adjustment = state.adjustment = None
+        adjust_days = adjustment["adjust_days"] if adjustment else 0
+
+        reason = f"soil {soil:g} < {threshold:g}"
+        water_now = soil < threshold
+        if adjust_days < 0 and upper is not None and not water_now and soil < upper:
+            water_now, reason = True, f"{adjustment['predicted_class']}: soil {soil:g} < {upper:g}"
+        elif adjust_days > 0 and water_now and state.last_watered is not None:
+            if now - state.last_watered < adjust_days * 86400 and soil >= threshold / 2:
+                water_now, reason = False, f"{adjustment['predicted_class']}: holding for {adjust_days:g} days"
+
+        if state.prediction is not None and state.last_watered is not None and not water_now:
+            due = state.last_watered + (state.prediction[1] + adjust_days) * 86400
+            if now >= due and (upper is None or soil < upper):
+                water_now, reason = True, "model schedule due"
+
+        water_ml = None
+        if state.prediction is not None:
+            water_ml = state.prediction[0] / 2 if adjustment and adjustment["reduce_ml"] else state.prediction[0]
+            water_ml = round(max(water_ml, 0.0), 1)
+        if water_now:
+            state.last_watered = now
+
+        self._maybe_refresh(state, row, plant_type, now)
+        return {"water_now": water_now, "water_ml": water_ml, "reason": reason}
+
+    def _maybe_refresh(self, state: DeviceState, row: dict, plant_type: str | None, now: float) -> None:
+        if not PREDICTION_ENABLED or state.refreshing or plant_type is None:
+            return
+        features = (
+            row.get("soil_moisture"),
+            row.get("temperature"),
+            row.get("air_humidity"),
+            row.get("light"),
+        )
+        if any(value is None for value in features):
+            return
+        previous = state.features
+        stale = (
+            previous is None
+            or now - state.predicted_at > PREDICTION_TTL
+            or previous[4] != plant_type
+            or abs(previous[0] - features[0]) >= MOISTURE_DELTA
+            or abs(previous[1] - features[1]) >= TEMPERATURE_DELTA
+        )
+        if not stale:
+            return
+        state.refreshing = True
+        self._count("refreshes")
+        last_days = (now - state.last_watered) / 86400 if state.last_watered is not None else 1.0
+        prev = state.prediction[0] if state.prediction else 0.0
+        worker_pool.submit(self._refresh, state, features, plant_type, last_days, prev)
+
+    def _refresh(self, state: DeviceState, features: tuple, plant_type: str, last_days: float, prev: float) -> None:
+        soil, temperature, humidity, light = features
+        key = (plant_type, round(soil), round(temperature), round(humidity), round(light, -1), round(last_days, 1))
+        try:
+            with self._lock:
+                cached = self._predictions.get(key)
+                if cached is not None:
+                    self._predictions.move_to_end(key)
+                    self._stats["cache_hits"] += 1
+            if cached is None:
+                request = PredictRequest(
+                    soil_moisture=soil,
+                    temperature=temperature,
+                    air_humidity=humidity,
+                    light=light,
+                    last_watered_days=last_days,
+                    ml_prediction_prev=prev,
+                    plant_type=plant_type,
+                )
+                cached = self._predict(request)
+                with self._lock:
+                    self._stats["model_calls"] += 1
+                    self._predictions[key] = cached
+                    if len(self._predictions) > PREDICTION_CACHE_SIZE:
+                        self._predictions.popitem(last=False)
+            state.prediction = cached
+            state.predicted_at = time.time()
+            # Recorded only on success, so a failed prediction is retried on the next reading.
+            state.features = (*features, plant_type)
+        except Exception as exc:
+            self._count("model_errors")
+            logging.error("Watering prediction for decision failed: %s", exc)
+        finally:
+            state.refreshing = False
+
+    def apply_diagnosis(self, device_id: str | None, predicted_class: str, mapping: dict) -> None:
+        """Adjust a device's watering according to a photo diagnosis."""
+        state = self.device(device_id)
+        adjust_days = float(mapping.get("adjust_watering_days") or 0)
+        if not adjust_days and not mapping.get("reduce_water_ml"):
+            state.adjustment = None
+            return
+        state.adjustment = {
+            "predicted_class": predicted_class,
+            "adjust_days": adjust_days,
+            "reduce_ml": bool(mapping.get("reduce_water_ml")),
+            "expires": time.time() + max(abs(adjust_days), ADJUSTMENT_MIN_DAYS) * 86400,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "devices": len(self._devices), "cached_predictions": len(self._predictions)}
+
+
+engine = DecisionEngine()
+"""Decision engine shared by the ingestion and diagnosis endpoints."""
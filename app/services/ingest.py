@@ -0,0 +1,201 @@
+"""Write-behind buffering for sensor readings."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable
+
+from . import cache
+from ..utils import storage
+from ..utils.executor import run_db
+
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))
+FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "1.0"))
+MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", "10000"))
+PUT_TIMEOUT = float(os.getenv("INGEST_PUT_TIMEOUT", "2.0"))
+MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "3"))
+
+
+class BufferFullError(RuntimeError):
+    """Raised when rows cannot be queued before the put timeout."""
+
+
+def _storage_insert(table: str) -> Callable[[list[dict]], list[dict] | None]:
+    def insert(rows: list[dict]) -> list[dict] | None:
+        return storage.get_backend().insert(table, rows)
+
+    return insert
+
+
+class WriteBehindBuffer:
+    """Coalesce single-row writes into multi-row inserts.
+
+    Rows are queued in memory and flushed by a background task once
+    ``batch_size`` rows are pending or ``flush_interval`` seconds have passed.
+    When the queue holds ``max_queue`` rows, producers wait up to
+    ``put_timeout`` seconds for space before :class:`BufferFullError` is
+    raised. If the flusher is not running, rows are written straight through.
+    ``on_flush`` receives the stored rows after every successful insert.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        insert: Callable[[list[dict]], list[dict] | None] | None = None,
+        on_flush: Callable[[list[dict]], None] | None = None,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_queue: int = MAX_QUEUE,
+        put_timeout: float = PUT_TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+    ) -> None:
+        self.table = table
+        self._insert = insert or _storage_insert(table)
+        self._on_flush = on_flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+
+        self._pending: list[dict] = []
+        self._retry: tuple[list[dict], int] | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._space: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.rejected_rows = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self) -> int:
+        retry = len(self._retry[0]) if self._retry else 0
+        return len(self._pending) + retry
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self.depth:
+            logging.error("%s: %d rows lost on shutdown", self.table, self.depth)
+
+    async def put(self, rows: list[dict]) -> None:
+        """Queue rows for insertion, waiting for space if the queue is full."""
+        if not rows:
+            return
+        if not self.running:
+            stored = await run_db(self._insert, rows)
+            self.flushed_rows += len(rows)
+            self._flushed(stored or rows)
+            return
+        if len(rows) > self.max_queue:
+            self.rejected_rows += len(rows)
+            raise BufferFullError(f"Batch of {len(rows)} rows exceeds queue size")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.put_timeout
+        while self.depth + len(rows) > self.max_queue:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.rejected_rows += len(rows)
+                raise BufferFullError(f"{self.table} write queue is full")
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+        self._pending.extend(rows)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Insert all queued rows in batches of ``batch_size``."""
+        while self._retry or self._pending:
+            if self._retry:
+                batch, attempts = self._retry
+                self._retry = None
+            else:
+                batch, attempts = self._pending[: self.batch_size], 0
+                del self._pending[: self.batch_size]
+
+            start = time.perf_counter()
+            try:
+                stored = await run_db(self._insert, batch)
+            except Exception as exc:
+                if attempts < self.max_retries:
+                    self._retry = (batch, attempts + 1)
+                    logging.error("%s flush failed, will retry: %s", self.table, exc)
+                    return
+                self.failed_rows += len(batch)
+                logging.error("%s flush dropped %d rows: %s", self.table, len(batch), exc)
+            else:
+                self.flushed_rows += len(batch)
+                self._flushed(stored or batch)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                self.flushes += 1
+                self.last_flush_ms = elapsed
+                self.total_flush_ms += elapsed
+                if self._space is not None:
+                    self._space.set()
+
+    def _flushed(self, rows: list[dict]) -> None:
+        if self._on_flush is not None:
+            try:
+                self._on_flush(rows)
+            except Exception as exc:  # pragma: no cover - callback errors
+                logging.error("%s on_flush failed: %s", self.table, exc)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        """Return queue depth and flush counters."""
+        return {
+            "table": self.table,
+            "running": self.running,
+            "queue_depth": self.depth,
+            "max_queue": self.max_queue,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "rejected_rows": self.rejected_rows,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+sensor_buffer = WriteBehindBuffer("sensor_logs", on_flush=cache.sensor_logs.add)
+"""Buffer used by the sensor ingestion endpoints."""
@@ -2,53 +2,404 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import io
 import json
 import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Tuple
 
 import numpy as np
-import tensorflow as tf
-from PIL import Image
 
-MODEL_PATH = Path("plant_diagnosis_final.keras")
-LABEL_MAP_PATH = Path("label_map.json")
+from .batching import MicroBatcher
+from ..utils import metrics
+from ..utils.executor import run_blocking
+from ..utils.features import DIAGNOSIS_ENABLED
+
+MODEL_PATH = Path(os.getenv("ML_MODEL_PATH", "plant_diagnosis_final.keras"))
+TFLITE_MODEL_PATH = Path(os.getenv("ML_TFLITE_PATH", "plant_diagnosis_final.tflite"))
+BACKEND = os.getenv("ML_BACKEND", "keras")
+TFLITE_THREADS = int(os.getenv("ML_TFLITE_THREADS", "0")) or None
+LABEL_MAP_PATH = Path(os.getenv("ML_LABEL_MAP_PATH", "label_map.json"))
+MODEL_DIR = Path(os.getenv("ML_MODEL_DIR", "artifacts/diagnosis"))
+"""Versioned artifacts written by retraining; ``CURRENT`` names the one to serve."""
+RELOAD_INTERVAL = float(os.getenv("ML_RELOAD_INTERVAL", "30"))
+IMAGE_DIR = Path(os.getenv("ML_IMAGE_DIR", "artifacts/diagnosis_images"))
+SAVE_IMAGES = os.getenv("ML_SAVE_IMAGES", "false").lower() == "true"
+IMAGE_MAX_AGE_DAYS = float(os.getenv("ML_IMAGE_MAX_AGE_DAYS", "90"))
+"""Stored uploads older than this are deleted by :func:`prune_images`; ``0`` keeps them."""
 IMG_SIZE = (224, 224)
+MAX_BATCH_SIZE = int(os.getenv("ML_MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.getenv("ML_MAX_WAIT_MS", "10"))
+MAX_IMAGE_BYTES = int(os.getenv("ML_MAX_IMAGE_BYTES", str(15 * 1024 * 1024)))
+
+_SCALE = np.float32(1 / 255)
 
-_model: tf.keras.Model | None = None
+_backend: InferenceBackend | None = None
 _index_to_class: dict[int, str] | None = None
+_loaded_version: str | None = None
+_last_check = 0.0
+_swapping = False
+_batch_buffer: np.ndarray | None = None
+_load_lock = threading.Lock()
+
+
+class ImageTooLargeError(ValueError):
+    """Raised for uploads above ``MAX_IMAGE_BYTES``."""
+
+
+class InferenceBackend(ABC):
+    """Runs a float32 image batch through the diagnosis model."""
+
+    name = "base"
+    version = "unknown"
+    """Identifies the loaded weights, e.g. for keying cached results."""
+
+    @abstractmethod
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """Return class probabilities with one row per image."""
+
+
+class KerasBackend(InferenceBackend):
+    """Full ``tf.keras`` model."""
+
+    name = "keras"
 
+    def __init__(self, path: Path = MODEL_PATH) -> None:
+        import tensorflow as tf
 
-def load_model() -> tuple[tf.keras.Model | None, dict[int, str] | None]:
-    """Load the visual ML model lazily."""
-    global _model, _index_to_class
-    if _model is not None and _index_to_class is not None:
-        return _model, _index_to_class
+        self.model = tf.keras.models.load_model(path)
+        self.version = f"keras:{path.parent.name}/{path.name}:{path.stat().st_mtime_ns}"
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+def _tflite_interpreter():
+    """Return the lightest available TFLite interpreter class."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def convert_to_tflite(keras_path: Path = MODEL_PATH, tflite_path: Path = TFLITE_MODEL_PATH, quantize: bool = True) -> Path:
+    """Convert the Keras model to TFLite, with dynamic-range int8 weights if ``quantize``.
+
+    The file is written under a unique name and moved into place, so
+    workers converting at the same time never load a partial model.
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(keras_path))
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    tmp = tflite_path.with_name(f"{tflite_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
     try:
-        _model = tf.keras.models.load_model(MODEL_PATH)
-        with LABEL_MAP_PATH.open() as f:
-            label_map = json.load(f)
-        _index_to_class = {v: k for k, v in label_map.items()}
-        logging.info("Loaded visual model")
-    except Exception as exc:  # pragma: no cover - runtime errors
-        logging.error("Failed loading model: %s", exc)
-        _model, _index_to_class = None, None
-    return _model, _index_to_class
-
-
-def predict(image_bytes: bytes) -> Tuple[str, float, dict[str, float]]:
-    """Predict plant symptom from an uploaded image."""
-    model, idx_to_class = load_model()
-    if model is None or idx_to_class is None:
+        tmp.write_bytes(converter.convert())
+        os.replace(tmp, tflite_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    logging.info("Wrote TFLite model to %s", tflite_path)
+    return tflite_path
+
+
+class TFLiteBackend(InferenceBackend):
+    """Quantized TFLite model run by the standalone interpreter.
+
+    The Keras model at ``keras_path`` is converted on first use if ``path``
+    does not exist. The interpreter is resized whenever the batch size
+    changes.
+    """
+
+    name = "tflite"
+
+    def __init__(
+        self, path: Path = TFLITE_MODEL_PATH, num_threads: int | None = TFLITE_THREADS, keras_path: Path = MODEL_PATH
+    ) -> None:
+        if not path.exists():
+            convert_to_tflite(keras_path, path)
+        self.interpreter = _tflite_interpreter()(model_path=str(path), num_threads=num_threads)
+        self.version = f"tflite:{path.parent.name}/{path.name}:{path.stat().st_mtime_ns}"
+        self._input = self.interpreter.get_input_details()[0]["index"]
+        self._output = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = 0
+        self._lock = threading.Lock()
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input, batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self.interpreter.set_tensor(self._input, np.ascontiguousarray(batch, dtype=np.float32))
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output).copy()
+
+
+BACKENDS: dict[str, type[InferenceBackend]] = {
+    "keras": KerasBackend,
+    "tflite": TFLiteBackend,
+}
+
+
+def current_version() -> str | None:
+    """Return the artifact version named by ``MODEL_DIR/CURRENT``, if any."""
+    try:
+        return (MODEL_DIR / "CURRENT").read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def artifact_paths(version: str | None) -> tuple[Path, Path, Path]:
+    """Return the Keras, TFLite and label map paths of a version.
+
+    ``None`` stands for the model configured by ``ML_MODEL_PATH``.
+    """
+    if version is None:
+        return MODEL_PATH, TFLITE_MODEL_PATH, LABEL_MAP_PATH
+    directory = MODEL_DIR / version
+    return directory / "model.keras", directory / "model.tflite", directory / "label_map.json"
+
+
+def _load(version: str | None) -> tuple[InferenceBackend, dict[int, str]]:
+    """Load a published artifact version, or the configured paths for ``None``."""
+    model_path, tflite_path, label_map_path = artifact_paths(version)
+    if BACKEND == "tflite":
+        backend = TFLiteBackend(tflite_path, keras_path=model_path)
+    else:
+        backend = BACKENDS[BACKEND](model_path)
+    with label_map_path.open() as f:
+        label_map = json.load(f)
+    return backend, {v: k for k, v in label_map.items()}
+
+
+def _swap(version: str | None) -> None:
+    """Load and warm a new version in the background, then switch to it."""
+    global _backend, _index_to_class, _loaded_version, _swapping
+    try:
+        backend, index_to_class = _load(version)
+        backend.predict(np.zeros((1, *IMG_SIZE, 3), dtype=np.float32))
+        with _load_lock:
+            _backend, _index_to_class, _loaded_version = backend, index_to_class, version
+        logging.info("Switched visual model to version %s", version)
+    except Exception as exc:
+        logging.error("Loading model version %s failed: %s", version, exc)
+    finally:
+        _swapping = False
+
+
+def check_for_update(force: bool = False) -> bool:
+    """Start a background swap if ``CURRENT`` names a version not yet loaded.
+
+    The pointer is read at most every ``RELOAD_INTERVAL`` seconds unless
+    ``force`` is set, so each worker picks up a newly published model
+    without a restart while requests keep using the old one.
+    """
+    global _last_check, _swapping
+    now = time.monotonic()
+    if not force and now - _last_check < RELOAD_INTERVAL:
+        return False
+    _last_check = now
+    version = current_version()
+    with _load_lock:
+        if _swapping or _backend is None or version == _loaded_version:
+            return False
+        _swapping = True
+    threading.Thread(target=_swap, args=(version,), name="model-swap", daemon=True).start()
+    return True
+
+
+def load_model() -> tuple[InferenceBackend | None, dict[int, str] | None]:
+    """Load the configured backend once, even when called from several threads.
+
+    A version published under ``MODEL_DIR`` takes precedence over
+    ``MODEL_PATH``; later versions are swapped in by :func:`check_for_update`.
+    """
+    global _backend, _index_to_class, _loaded_version, _last_check
+    if _backend is not None and _index_to_class is not None:
+        check_for_update()
+        return _backend, _index_to_class
+    if not DIAGNOSIS_ENABLED:
+        raise RuntimeError("Diagnosis is disabled")
+    with _load_lock:
+        if _backend is not None and _index_to_class is not None:
+            return _backend, _index_to_class
+        try:
+            version = current_version()
+            _backend, _index_to_class = _load(version)
+            _loaded_version, _last_check = version, time.monotonic()
+            logging.info("Loaded visual model with %s backend (version %s)", _backend.name, version)
+        except Exception as exc:  # pragma: no cover - runtime errors
+            logging.error("Failed loading model: %s", exc)
+            _backend, _index_to_class = None, None
+    return _backend, _index_to_class
+
+
+def is_loaded() -> bool:
+    """Whether a model is loaded in this process."""
+    return _backend is not None
+
+
+def warm_up() -> dict[str, float]:
+    """Load the model and run dummy batches so graphs are traced before traffic."""
+    start = time.perf_counter()
+    backend, _ = load_model()
+    if backend is None:
+        raise RuntimeError("Model not available")
+    loaded = time.perf_counter()
+    for size in sorted({1, batcher.max_batch_size}):
+        _forward(np.zeros((size, *IMG_SIZE, 3), dtype=np.float32))
+    return {
+        "backend": backend.name,
+        "load_ms": round((loaded - start) * 1000, 1),
+        "warmup_ms": round((time.perf_counter() - loaded) * 1000, 1),
+    }
+
+
+def model_version() -> str:
+    """Return the version of the loaded backend, loading it if needed."""
+    backend, _ = load_model()
+    return backend.version if backend is not None else "none"
+
+
+def _snapshot() -> tuple[InferenceBackend, dict[int, str]]:
+    """Return the loaded backend and its class map as one consistent pair."""
+    load_model()
+    with _load_lock:
+        backend, index_to_class = _backend, _index_to_class
+    if backend is None or index_to_class is None:
         raise RuntimeError("Model not available")
+    return backend, index_to_class
+
+
+def _forward(batch: np.ndarray) -> list[tuple[np.ndarray, dict[int, str], str]]:
+    """Run one batched forward pass through the loaded model.
+
+    Each row comes back with the class map and version of the model that
+    produced it, so a swap during the batch cannot mislabel it.
+    """
+    backend, index_to_class = _snapshot()
+    with metrics.timer("ml.predict"):
+        preds = backend.predict(batch)
+    return [(row, index_to_class, backend.version) for row in preds]
+
+
+def _collate(images: list[np.ndarray]) -> np.ndarray:
+    """Scale uint8 images straight into a reused float32 batch buffer."""
+    global _batch_buffer
+    if _batch_buffer is None or len(_batch_buffer) < len(images):
+        _batch_buffer = np.empty((max(len(images), MAX_BATCH_SIZE), *IMG_SIZE, 3), dtype=np.float32)
+    batch = _batch_buffer[: len(images)]
+    for i, image in enumerate(images):
+        np.multiply(image, _SCALE, out=batch[i], dtype=np.float32)
+    return batch
+
+
+batcher = MicroBatcher(_forward, MAX_BATCH_SIZE, MAX_WAIT_MS, name="ml-batcher", collate=_collate)
+"""Batches concurrent diagnosis requests into single forward passes."""
 
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB").resize(IMG_SIZE)
-    img_array = np.expand_dims(np.array(img) / 255.0, axis=0)
-    preds = model.predict(img_array)
+
+@metrics.timed("ml.decode")
+def _preprocess(image_bytes: bytes) -> np.ndarray:
+    """Decode an upload to a 224x224 RGB uint8 array.
+
+    JPEGs are decoded in draft mode, letting libjpeg downscale by up to 8x
+    while decoding instead of materializing the full-resolution image.
+    """
+    from PIL import Image
+
+    if len(image_bytes) > MAX_IMAGE_BYTES:
+        raise ImageTooLargeError(f"Image larger than {MAX_IMAGE_BYTES} bytes")
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft("RGB", IMG_SIZE)
+    img = img.convert("RGB")
+    if img.size != IMG_SIZE:
+        img = img.resize(IMG_SIZE, reducing_gap=3.0)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def image_hash(image_bytes: bytes) -> str:
+    """Content hash identifying an uploaded image."""
+    return hashlib.blake2b(image_bytes, digest_size=20).hexdigest()
+
+
+def result_key(image_bytes: bytes) -> str:
+    """Key a prediction by the model version and a hash of the image bytes."""
+    return f"{model_version()}:{image_hash(image_bytes)}"
+
+
+def save_image(image_bytes: bytes, digest: str) -> None:
+    """Keep an upload under ``IMAGE_DIR`` by its hash so feedback can be trained on."""
+    if not SAVE_IMAGES:
+        return
+    path = IMAGE_DIR / digest[:2] / f"{digest}.img"
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # One temp file per writer: concurrent first uploads of the same image
+    # must not write into each other's file.
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(image_bytes)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def prune_images(max_age_days: float = IMAGE_MAX_AGE_DAYS) -> int:
+    """Delete stored uploads older than ``max_age_days`` and return how many."""
+    if max_age_days <= 0:
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for path in IMAGE_DIR.glob("*/*.img"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def _decode(preds: np.ndarray, idx_to_class: dict[int, str]) -> Tuple[str, float, dict[str, float]]:
     pred_index = int(np.argmax(preds))
     confidence = float(np.max(preds))
     predicted_class = idx_to_class[pred_index]
-    scores = {idx_to_class[i]: float(score) for i, score in enumerate(preds[0])}
+    scores = {idx_to_class[i]: float(score) for i, score in enumerate(preds)}
     return predicted_class, confidence, scores
 
+
+def predict(image_bytes: bytes) -> Tuple[str, float, dict[str, float], str]:
+    """Predict plant symptom from an uploaded image.
+
+    Returns the class, its confidence, all scores and the version of the
+    model that made the prediction.
+    """
+    backend, idx_to_class = load_model()
+    if backend is None or idx_to_class is None:
+        raise RuntimeError("Model not available")
+    preds, idx_to_class, version = batcher.submit(_preprocess(image_bytes)).result()
+    return (*_decode(preds, idx_to_class), version)
+
+
+async def predict_async(image_bytes: bytes) -> Tuple[str, float, dict[str, float], str]:
+    """Like :func:`predict`, awaiting the batched result without blocking the loop."""
+    backend, idx_to_class = load_model() if _backend is not None else await run_blocking(load_model)
+    if backend is None or idx_to_class is None:
+        raise RuntimeError("Model not available")
+    image = await run_blocking(_preprocess, image_bytes)
+    preds, idx_to_class, version = await asyncio.wrap_future(batcher.submit(image))
+    return (*_decode(preds, idx_to_class), version)
@@ -0,0 +1,149 @@
+"""Streaming clean-up of sensor readings before they are stored."""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import deque
+
+from .rollups import to_epoch
+from .sensor_codec import BOUNDS, METRICS
+from .state import device_key
+from ..utils import metrics
+
+DEDUP_WINDOW = float(os.getenv("QUALITY_DEDUP_WINDOW", "30"))
+WINDOW_SIZE = int(os.getenv("QUALITY_WINDOW_SIZE", "16"))
+MIN_SAMPLES = int(os.getenv("QUALITY_MIN_SAMPLES", "5"))
+SPIKE_K = float(os.getenv("QUALITY_SPIKE_K", "6"))
+EWMA_ALPHA = float(os.getenv("QUALITY_EWMA_ALPHA", "0.2"))
+SENTINELS = {float(v) for v in os.getenv("QUALITY_SENTINELS", "-999,-127").split(",") if v}
+
+TOLERANCE = {"soil_moisture": 0.5, "temperature": 0.2, "air_humidity": 0.5, "light": 5.0}
+"""Largest change per metric that still counts as a near-duplicate."""
+
+MIN_SPIKE = {"soil_moisture": 10.0, "temperature": 5.0, "air_humidity": 15.0, "light": 500.0}
+"""Smallest deviation from the median that can be called a spike."""
+
+
+def _median(values) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+class _DeviceWindow:
+    """Last accepted reading and fixed-size windows of recent values for one device."""
+
+    __slots__ = ("last_time", "last_values", "recent", "ewma")
+
+    def __init__(self) -> None:
+        self.last_time: float | None = None
+        self.last_values: tuple | None = None
+        self.recent = [deque(maxlen=WINDOW_SIZE) for _ in METRICS]
+        self.ewma = [math.nan] * len(METRICS)
+
+    def push(self, values: list) -> None:
+        for i, value in enumerate(values):
+            if value is not None:
+                self.recent[i].append(value)
+                prev = self.ewma[i]
+                self.ewma[i] = value if math.isnan(prev) else prev + EWMA_ALPHA * (value - prev)
+
+
+class ReadingFilter:
+    """Drop duplicate readings and blank out broken or spiking values.
+
+    A reading is a duplicate when it repeats the device's previous
+    timestamp, or arrives within ``DEDUP_WINDOW`` seconds with every metric
+    within :data:`TOLERANCE`. Values that are missing, NaN, a known sentinel
+    or outside the ``models.SensorLog`` bounds are set to ``None``, as are
+    values further than ``SPIKE_K`` scaled MADs from the median of the
+    device's last ``WINDOW_SIZE`` readings. Spikes still enter the window, so
+    a genuine level shift is accepted once it persists. Rows without any
+    usable metric are dropped.
+    """
+
+    def __init__(self) -> None:
+        self._devices: dict[str, _DeviceWindow] = {}
+        self._lock = threading.Lock()
+        self._stats = {"accepted": 0, "duplicates": 0, "invalid_values": 0, "spikes": 0, "dropped": 0}
+
+    def _count(self, outcome: str, n: int = 1) -> None:
+        self._stats[outcome] += n
+        metrics.inc("smartplant_sensor_readings_total", n, outcome=outcome)
+
+    def process(self, rows: list[dict]) -> list[dict]:
+        """Return the rows worth storing, with unusable values set to ``None``."""
+        kept = []
+        with self._lock:
+            for row in rows:
+                cleaned = self._process(row)
+                if cleaned is not None:
+                    kept.append(cleaned)
+        return kept
+
+    def _process(self, row: dict) -> dict | None:
+        key = device_key(row.get("device_id"))
+        window = self._devices.get(key)
+        if window is None:
+            window = self._devices[key] = _DeviceWindow()
+
+        values = []
+        for name in METRICS:
+            value = row.get(name)
+            low, high = BOUNDS[name]
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                value = None
+            elif math.isnan(value) or value in SENTINELS or not low <= value <= high:
+                self._count("invalid_values")
+                value = None
+            values.append(value)
+
+        ts = to_epoch(row["timestamp"])
+        if window.last_values is not None and (
+            ts == window.last_time
+            or (
+                abs(ts - window.last_time) <= DEDUP_WINDOW
+                and all(
+                    (a is None and b is None) or (a is not None and b is not None and abs(a - b) <= TOLERANCE[name])
+                    for name, a, b in zip(METRICS, values, window.last_values)
+                )
+            )
+        ):
+            self._count("duplicates")
+            return None
+
+        checked = list(values)
+        for i, name in enumerate(METRICS):
+            value, recent = values[i], window.recent[i]
+            if value is None or len(recent) < MIN_SAMPLES:
+                continue
+            median = _median(recent)
+            mad = _median(abs(v - median) for v in recent) * 1.4826
+            if abs(value - median) > max(SPIKE_K * mad, MIN_SPIKE[name]):
+                self._count("spikes")
+                checked[i] = None
+        window.push(values)
+
+        if all(value is None for value in checked):
+            self._count("dropped")
+            return None
+        window.last_time = ts
+        window.last_values = tuple(values)
+        self._count("accepted")
+        return {**row, **dict(zip(METRICS, checked))}
+
+    def smoothed(self, device_id: str | None) -> dict | None:
+        """Return the EWMA of each metric for a device."""
+        window = self._devices.get(device_key(device_id))
+        if window is None:
+            return None
+        return {name: None if math.isnan(v) else round(v, 2) for name, v in zip(METRICS, window.ewma)}
+
+    def stats(self) -> dict:
+        return {**self._stats, "devices": len(self._devices)}
+
+
+reading_filter = ReadingFilter()
+"""Filter applied by the sensor ingestion endpoints."""
@@ -0,0 +1,187 @@
+"""Incrementally maintained min/max/mean rollups of sensor readings."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .state import DEFAULT_DEVICE, device_key, to_epoch
+from ..utils import storage
+from ..utils.executor import run_db
+
+METRICS = ("soil_moisture", "temperature", "air_humidity", "light")
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+"""Bucket width in seconds per resolution."""
+
+RETENTION = {"minute": 2 * 86400, "hour": 90 * 86400, "day": 5 * 365 * 86400}
+"""How far back buckets are kept per resolution, in seconds."""
+
+BACKFILL_PAGE = 1000
+
+
+def aggregate(timestamps: np.ndarray, values: np.ndarray, step: int) -> dict[int, list]:
+    """Bucket readings into ``step``-second windows with NumPy.
+
+    Returns ``{bucket_start: [count, sum, min, max]}``; NaNs are ignored.
+    """
+    values = np.asarray(values, dtype=float)
+    timestamps = np.asarray(timestamps, dtype=float)
+    keep = np.isfinite(values) & np.isfinite(timestamps)
+    if not keep.any():
+        return {}
+    buckets = (timestamps[keep] // step).astype(np.int64) * step
+    values = values[keep]
+    order = np.argsort(buckets, kind="stable")
+    buckets, values = buckets[order], values[order]
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(buckets)])
+    sums = np.add.reduceat(values, starts)
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    return {
+        int(b): [int(c), float(s), float(lo), float(hi)]
+        for b, c, s, lo, hi in zip(buckets[starts], counts, sums, mins, maxs)
+    }
+
+
+class Rollups:
+    """Per-device, per-metric aggregates at minute, hour and day resolution.
+
+    Rows ingested by this process are added as they arrive. Older ranges
+    are backfilled from ``sensor_logs`` the first time they are queried;
+    late rows that fall in a range not backfilled yet are left to that
+    backfill, which reads them from storage, so they are not counted twice.
+    Each worker keeps its own rollups, so run ingestion on the worker that
+    serves the stats or rely on backfill.
+    """
+
+    def __init__(self) -> None:
+        self.covered_since = time.time()
+        self._buckets: dict[tuple[str, str, str], dict[int, list]] = {}
+        self._backfilled_from: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._backfill_locks: dict[str, asyncio.Lock] = {}
+
+    def _series(self, device: str, metric: str, resolution: str) -> dict[int, list]:
+        return self._buckets.setdefault((device, metric, resolution), {})
+
+    def add_rows(self, rows: list[dict]) -> None:
+        """Fold freshly ingested rows into the rollups."""
+        with self._lock:
+            for row in rows:
+                ts = to_epoch(row["timestamp"])
+                device = device_key(row.get("device_id"))
+                if ts < self._backfilled_from.get(device, self.covered_since):
+                    continue
+                for metric in METRICS:
+                    value = row.get(metric)
+                    if not isinstance(value, (int, float)) or not math.isfinite(value):
+                        continue
+                    for resolution, step in RESOLUTIONS.items():
+                        series = self._series(device, metric, resolution)
+                        bucket = int(ts // step) * step
+                        cell = series.get(bucket)
+                        if cell is None:
+                            series[bucket] = [1, value, value, value]
+                            self._prune(series, resolution, bucket)
+                        else:
+                            cell[0] += 1
+                            cell[1] += value
+                            cell[2] = min(cell[2], value)
+                            cell[3] = max(cell[3], value)
+
+    @staticmethod
+    def _prune(series: dict[int, list], resolution: str, newest: int) -> None:
+        # Late rows add buckets out of order, so select by key rather than
+        # relying on insertion order.
+        cutoff = newest - RETENTION[resolution]
+        for bucket in [b for b in series if b < cutoff]:
+            del series[bucket]
+
+    def merge(self, device: str, metric: str, resolution: str, buckets: dict[int, list]) -> None:
+        """Merge pre-aggregated buckets, e.g. from :func:`aggregate`."""
+        with self._lock:
+            series = self._series(device, metric, resolution)
+            for bucket, (count, total, lo, hi) in buckets.items():
+                cell = series.get(bucket)
+                if cell is None:
+                    series[bucket] = [count, total, lo, hi]
+                else:
+                    cell[0] += count
+                    cell[1] += total
+                    cell[2] = min(cell[2], lo)
+                    cell[3] = max(cell[3], hi)
+            self._buckets[(device, metric, resolution)] = dict(sorted(series.items()))
+
+    def backfill_rows(self, device: str, rows: list[dict]) -> None:
+        """Aggregate raw rows for one device at every resolution."""
+        if not rows:
+            return
+        timestamps = np.array([to_epoch(row["timestamp"]) for row in rows])
+        for metric in METRICS:
+            values = np.array([row.get(metric) for row in rows], dtype=float)
+            for resolution, step in RESOLUTIONS.items():
+                self.merge(device, metric, resolution, aggregate(timestamps, values, step))
+
+    def needs_backfill(self, device: str, start: float) -> tuple[float, float] | None:
+        """Return the raw-row range still missing for a query starting at ``start``."""
+        end = self._backfilled_from.get(device, self.covered_since)
+        return (start, end) if start < end else None
+
+    def mark_backfilled(self, device: str, start: float) -> None:
+        with self._lock:
+            self._backfilled_from[device] = min(start, self._backfilled_from.get(device, self.covered_since))
+
+    async def ensure_covered(self, device: str, start: float) -> None:
+        """Backfill raw rows older than what the rollups already cover."""
+        async with self._backfill_locks.setdefault(device, asyncio.Lock()):
+            missing = self.needs_backfill(device, start)
+            if missing is None:
+                return
+            rows = await run_db(fetch_raw, device, *missing)
+            self.backfill_rows(device, rows)
+            self.mark_backfilled(device, start)
+
+    def query(self, device: str, metric: str, resolution: str, start: float, end: float) -> list[dict]:
+        """Return buckets in ``[start, end)`` with count, min, max and mean."""
+        step = RESOLUTIONS[resolution]
+        first = int(start // step) * step
+        with self._lock:
+            series = self._buckets.get((device, metric, resolution), {})
+            cells = [(b, c) for b, c in series.items() if first <= b < end]
+        return [
+            {
+                "bucket": datetime.fromtimestamp(b, timezone.utc).isoformat(),
+                "count": count,
+                "min": lo,
+                "max": hi,
+                "mean": total / count,
+            }
+            for b, (count, total, lo, hi) in sorted(cells)
+        ]
+
+
+def fetch_raw(device: str, start: float, end: float) -> list[dict]:
+    """Load raw ``sensor_logs`` rows for one device key in ``[start, end)``."""
+    backend = storage.get_backend()
+    device_id = None if device == DEFAULT_DEVICE else device
+    start_iso = datetime.fromtimestamp(start, timezone.utc).isoformat()
+    end_iso = datetime.fromtimestamp(end, timezone.utc).isoformat()
+    rows: list[dict] = []
+    while True:
+        page = backend.between(
+            "sensor_logs", device_id, start_iso, end_iso, len(rows), BACKFILL_PAGE, ("timestamp",) + METRICS
+        )
+        rows.extend(page)
+        if len(page) < BACKFILL_PAGE:
+            return rows
+
+
+store = Rollups()
+"""Rollups shared by the ingestion and stats endpoints."""
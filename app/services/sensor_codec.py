@@ -0,0 +1,113 @@
+"""Compact binary batches of sensor readings.
+
+Layout (little-endian)::
+
+    b"SPB1"  uint16 count  uint8 device_id_len  uint8 plant_type_len
+    device_id bytes  plant_type bytes
+    count x {uint32 timestamp, float32 soil_moisture, float32 temperature,
+             float32 air_humidity, float32 light}
+
+A timestamp of 0 means "stamp on arrival". Records are decoded in place
+with ``numpy.frombuffer`` and validated against the ranges on
+``models.SensorLog``.
+"""
+
+from __future__ import annotations
+
+import struct
+import time
+
+import numpy as np
+
+from models import SensorLog
+
+MAGIC = b"SPB1"
+HEADER = struct.Struct("<4sHBB")
+RECORD = np.dtype(
+    [
+        ("timestamp", "<u4"),
+        ("soil_moisture", "<f4"),
+        ("temperature", "<f4"),
+        ("air_humidity", "<f4"),
+        ("light", "<f4"),
+    ]
+)
+METRICS = RECORD.names[1:]
+MAX_CLOCK_SKEW = 300
+"""Seconds a device clock may run ahead before a reading counts as future."""
+
+
+class PayloadError(ValueError):
+    """Raised when a binary payload is malformed."""
+
+
+def _field_bounds(model) -> dict[str, tuple[float, float]]:
+    """Collect ``ge``/``le`` constraints from a pydantic model's fields."""
+    bounds = {}
+    for name in METRICS:
+        low, high = -np.inf, np.inf
+        for constraint in model.model_fields[name].metadata:
+            low = getattr(constraint, "ge", low)
+            high = getattr(constraint, "le", high)
+        bounds[name] = (low, high)
+    return bounds
+
+
+BOUNDS = _field_bounds(SensorLog)
+
+
+def encode(records: list[dict], device_id: str = "", plant_type: str = "") -> bytes:
+    """Build a binary payload; the inverse of :func:`decode`, used by tests and tools."""
+    device, plant = device_id.encode(), plant_type.encode()
+    body = np.zeros(len(records), dtype=RECORD)
+    for name in RECORD.names:
+        body[name] = [r.get(name, 0) or 0 for r in records]
+    return HEADER.pack(MAGIC, len(records), len(device), len(plant)) + device + plant + body.tobytes()
+
+
+def decode(payload: bytes) -> tuple[str | None, str | None, np.ndarray]:
+    """Return ``(device_id, plant_type, records)`` without copying the records."""
+    view = memoryview(payload)
+    if len(view) < HEADER.size:
+        raise PayloadError("Payload shorter than header")
+    magic, count, device_len, plant_len = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise PayloadError("Unknown payload format")
+    offset = HEADER.size + device_len + plant_len
+    if len(view) != offset + count * RECORD.itemsize:
+        raise PayloadError("Payload length does not match record count")
+    try:
+        device_id = bytes(view[HEADER.size : HEADER.size + device_len]).decode() or None
+        plant_type = bytes(view[HEADER.size + device_len : offset]).decode() or None
+    except UnicodeDecodeError as exc:
+        raise PayloadError("Invalid header strings") from exc
+    return device_id, plant_type, np.frombuffer(view, dtype=RECORD, count=count, offset=offset)
+
+
+def validate(records: np.ndarray, now: float | None = None) -> np.ndarray:
+    """Return a boolean mask of records that satisfy the ``SensorLog`` ranges."""
+    now = time.time() if now is None else now
+    valid = records["timestamp"] <= now + MAX_CLOCK_SKEW
+    for name, (low, high) in BOUNDS.items():
+        column = records[name]
+        valid &= np.isfinite(column) & (column >= low) & (column <= high)
+    return valid
+
+
+def to_rows(device_id: str | None, plant_type: str | None, records: np.ndarray, now: float | None = None) -> list[dict]:
+    """Convert decoded records into ``sensor_logs`` rows."""
+    if not len(records):
+        return []
+    now = int(time.time() if now is None else now)
+    seconds = np.where(records["timestamp"] == 0, now, records["timestamp"]).astype("datetime64[s]")
+    timestamps = np.char.add(np.datetime_as_string(seconds, unit="s"), "+00:00").tolist()
+    columns = {name: np.round(records[name].astype(float), 2).tolist() for name in METRICS}
+    return [
+        {
+            "device_id": device_id,
+            "timestamp": timestamps[i],
+            "plant_type": plant_type,
+            **{name: columns[name][i] for name in METRICS},
+        }
+        for i in range(len(records))
+    ]
@@ -0,0 +1,66 @@
+"""In-memory index of the latest reading per device."""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+
+DEFAULT_DEVICE = "default"
+"""Key used for readings that do not carry a ``device_id``."""
+
+
+def device_key(device_id: str | None) -> str:
+    """Return the index key for a possibly missing device id."""
+    return device_id or DEFAULT_DEVICE
+
+
+def to_epoch(value) -> float:
+    """Convert an ISO string, datetime or epoch number to epoch seconds.
+
+    Naive datetimes are taken as UTC and numbers above ``1e11`` as
+    milliseconds.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value / 1000 if value > 1e11 else float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class LatestStateIndex:
+    """Map each device to its newest sensor row.
+
+    Rows are compared by their ``timestamp`` as epoch seconds, so late or
+    replayed readings never overwrite a newer state whatever offset or
+    precision they were written with.
+    """
+
+    def __init__(self) -> None:
+        self._latest: dict[str, dict] = {}
+        self._times: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def update(self, rows: list[dict]) -> None:
+        """Record rows, keeping only the newest one per device."""
+        with self._lock:
+            for row in rows:
+                key = device_key(row.get("device_id"))
+                ts = to_epoch(row["timestamp"]) if row.get("timestamp") else float("-inf")
+                if key not in self._latest or ts >= self._times[key]:
+                    self._latest[key] = row
+                    self._times[key] = ts
+
+    def get(self, device_id: str | None) -> dict | None:
+        """Return the newest row for a device, if known."""
+        return self._latest.get(device_key(device_id))
+
+    def devices(self) -> dict[str, dict]:
+        """Return a snapshot of the newest row for every known device."""
+        with self._lock:
+            return dict(self._latest)
+
+
+latest = LatestStateIndex()
+"""Latest sensor state shared by the ingestion and read endpoints."""
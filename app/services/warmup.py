@@ -0,0 +1,88 @@
+"""Eager model loading at startup and readiness tracking."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+from . import ml, watering
+from ..utils.features import DIAGNOSIS_ENABLED, PREDICTION_ENABLED
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+WARMUP_RETRY_MIN = float(os.getenv("WARMUP_RETRY_MIN", "5"))
+WARMUP_RETRY_MAX = float(os.getenv("WARMUP_RETRY_MAX", "300"))
+
+status: dict = {"ready": False, "started": False, "duration_ms": None, "models": {}}
+"""Progress of the last warm-up pass; ``/health/ready`` reports :func:`readiness`."""
+
+_lock = threading.Lock()
+
+
+def _models() -> tuple:
+    return (
+        ("diagnosis", ml.warm_up, ml.is_loaded, DIAGNOSIS_ENABLED),
+        ("watering", watering.warm_up, watering.is_loaded, PREDICTION_ENABLED),
+    )
+
+
+def warm_up(only_failed: bool = False) -> dict:
+    """Load and warm every enabled model, recording per-model durations.
+
+    With ``only_failed`` models that already warmed up are skipped.
+    """
+    start = time.perf_counter()
+    models = dict(status["models"]) if only_failed else {}
+    for name, fn, _, enabled in _models():
+        if not enabled or models.get(name, {}).get("ok"):
+            continue
+        try:
+            models[name] = {"ok": True, **fn()}
+        except Exception as exc:
+            logging.error("Warm-up of %s model failed: %s", name, exc)
+            models[name] = {"ok": False, "error": str(exc)}
+        else:
+            logging.info("Warmed up %s model: %s", name, models[name])
+    status["models"] = models
+    status["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    status["ready"] = all(model["ok"] for model in models.values())
+    return status
+
+
+def readiness() -> dict:
+    """Return the warm-up status with readiness derived from the models now loaded.
+
+    A model whose warm-up failed counts as ready once it has been loaded
+    since, e.g. lazily by a request.
+    """
+    models = {}
+    for name, _, loaded, enabled in _models():
+        if not enabled:
+            continue
+        entry = status["models"].get(name, {"ok": False})
+        if not entry["ok"] and loaded():
+            entry = {"ok": True, "loaded_lazily": True}
+        models[name] = entry
+    return {**status, "models": models, "ready": all(model["ok"] for model in models.values())}
+
+
+def _run() -> None:
+    warm_up()
+    delay = WARMUP_RETRY_MIN
+    while not readiness()["ready"]:
+        time.sleep(delay)
+        delay = min(delay * 2, WARMUP_RETRY_MAX)
+        warm_up(only_failed=True)
+
+
+def start() -> None:
+    """Warm up models on a background thread, once per process.
+
+    Failed models are retried with exponential backoff until all are ready.
+    """
+    with _lock:
+        if status["started"]:
+            return
+        status["started"] = True
+    threading.Thread(target=_run, name="warmup", daemon=True).start()
@@ -2,46 +2,166 @@
 
 from __future__ import annotations
 
-import joblib
-import pandas as pd
+import copy
+import os
+import threading
+import time
+from typing import Sequence
+
+import numpy as np
 
 from ..models.schemas import PredictRequest
+from ..utils import metrics
+from ..utils.features import PREDICTION_ENABLED
+
+MODEL_PATH = os.getenv("WATERING_MODEL_PATH", "smartplant_rf_model.joblib")
+ENCODER_PATH = os.getenv("PLANT_TYPE_ENCODER_PATH", "plant_type_encoder.joblib")
+
+NUMERIC_FEATURES = [
+    "soil_moisture",
+    "temperature",
+    "air_humidity",
+    "light",
+    "last_watered_days",
+    "ml_prediction_prev",
+]
 
 multi_rf = None
 plant_type_encoder = None
+_layout: _FeatureLayout | None = None
+_load_lock = threading.Lock()
+
+
+def _without_feature_names(estimator):
+    """Shallow copy of a fitted estimator that accepts plain arrays.
+
+    Estimators fitted on a DataFrame warn when given an ndarray. The layout
+    already puts columns in the fitted order, so the copy drops
+    ``feature_names_in_`` (also from sub-estimators) instead of having a
+    DataFrame built for every call. Fitted trees are shared, not copied.
+    """
+    clone = copy.copy(estimator)
+    clone.__dict__.pop("feature_names_in_", None)
+    if isinstance(getattr(clone, "estimators_", None), list):
+        clone.estimators_ = [_without_feature_names(e) for e in clone.estimators_]
+    return clone
+
+
+class _FeatureLayout:
+    """Column order and one-hot rows precomputed from the fitted models."""
+
+    def __init__(self, model, encoder) -> None:
+        import pandas as pd
+
+        self.model = model
+        self.encoder = encoder
+        categories = list(encoder.categories_[0])
+        encoded = encoder.transform(pd.DataFrame({"plant_type": categories}))
+        if hasattr(encoded, "toarray"):
+            encoded = encoded.toarray()
+        self.onehot = {c: np.asarray(row, dtype=float) for c, row in zip(categories, encoded)}
+        width = encoded.shape[1]
+        ignore = getattr(encoder, "handle_unknown", "error") != "error"
+        self.unknown = np.zeros(width) if ignore else None
+        self.columns = NUMERIC_FEATURES + list(encoder.get_feature_names_out(["plant_type"]))
+        # Permutation from our layout to the order the model was fitted with.
+        fitted = getattr(model, "feature_names_in_", None)
+        self.order = None
+        if fitted is not None and list(fitted) != self.columns:
+            position = {name: i for i, name in enumerate(self.columns)}
+            self.order = np.array([position[name] for name in fitted])
+        self.predictor = model if fitted is None else _without_feature_names(model)
+
+    def encode(self, plant_type: str) -> np.ndarray:
+        row = self.onehot.get(plant_type, self.unknown)
+        if row is None:
+            raise ValueError(f"Unknown plant_type: {plant_type}")
+        return row
+
+    def matrix(self, requests: Sequence[PredictRequest]) -> np.ndarray:
+        n_numeric = len(NUMERIC_FEATURES)
+        features = np.empty((len(requests), len(self.columns)))
+        for i, r in enumerate(requests):
+            features[i, :n_numeric] = (
+                r.soil_moisture,
+                r.temperature,
+                r.air_humidity,
+                r.light,
+                r.last_watered_days,
+                r.ml_prediction_prev,
+            )
+            features[i, n_numeric:] = self.encode(r.plant_type)
+        if self.order is not None:
+            features = features[:, self.order]
+        return features
 
 
 def _load_models() -> None:
     """Load sklearn models if not already loaded."""
     global multi_rf, plant_type_encoder
-    if multi_rf is None or plant_type_encoder is None:
-        multi_rf = joblib.load("smartplant_rf_model.joblib")
-        plant_type_encoder = joblib.load("plant_type_encoder.joblib")
+    if multi_rf is not None and plant_type_encoder is not None:
+        return
+    if not PREDICTION_ENABLED:
+        raise RuntimeError("Watering prediction is disabled")
+    with _load_lock:
+        if multi_rf is None or plant_type_encoder is None:
+            import joblib
 
+            model = joblib.load(MODEL_PATH)
+            plant_type_encoder = joblib.load(ENCODER_PATH)
+            multi_rf = model
 
-def predict(request: PredictRequest) -> tuple[float, float]:
-    """Return water volume and next watering days using ML model."""
+
+def _get_layout() -> _FeatureLayout:
+    global _layout
     _load_models()
-    plant_onehot = plant_type_encoder.transform(
-        pd.DataFrame([[request.plant_type]], columns=["plant_type"])
+    if _layout is None or _layout.model is not multi_rf or _layout.encoder is not plant_type_encoder:
+        _layout = _FeatureLayout(multi_rf, plant_type_encoder)
+    return _layout
+
+
+def predict_many(requests: Sequence[PredictRequest]) -> list[tuple[float, float]]:
+    """Return water volume and next watering days for many requests at once."""
+    if not requests:
+        return []
+    layout = _get_layout()
+    with metrics.timer("watering.features"):
+        features = layout.matrix(requests)
+    with metrics.timer("watering.predict"):
+        preds = layout.predictor.predict(features)
+    return [(float(water_ml), float(next_days)) for water_ml, next_days in preds]
+
+
+def is_loaded() -> bool:
+    """Whether the watering models are loaded in this process."""
+    return multi_rf is not None and plant_type_encoder is not None
+
+
+def warm_up() -> dict[str, float]:
+    """Load the models and score one dummy request."""
+    start = time.perf_counter()
+    layout = _get_layout()
+    loaded = time.perf_counter()
+    plant_type = next(iter(layout.onehot), "")
+    predict_many(
+        [
+            PredictRequest(
+                soil_moisture=50,
+                temperature=20,
+                air_humidity=50,
+                light=0,
+                last_watered_days=1,
+                ml_prediction_prev=0,
+                plant_type=plant_type,
+            )
+        ]
     )
-    input_features = [
-        request.soil_moisture,
-        request.temperature,
-        request.air_humidity,
-        request.light,
-        request.last_watered_days,
-        request.ml_prediction_prev,
-    ] + list(plant_onehot[0])
-    columns = [
-        "soil_moisture",
-        "temperature",
-        "air_humidity",
-        "light",
-        "last_watered_days",
-        "ml_prediction_prev",
-    ] + list(plant_type_encoder.get_feature_names_out(["plant_type"]))
-    input_df = pd.DataFrame([input_features], columns=columns)
-    water_given_ml, next_watering_days = multi_rf.predict(input_df)[0]
-    return float(water_given_ml), float(next_watering_days)
+    return {
+        "load_ms": round((loaded - start) * 1000, 1),
+        "warmup_ms": round((time.perf_counter() - loaded) * 1000, 1),
+    }
 
+
+def predict(request: PredictRequest) -> tuple[float, float]:
+    """Return water volume and next watering days using ML model."""
+    return predict_many([request])[0]
@@ -1,12 +1,39 @@
 import os
+import threading
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
-from supabase import Client, create_client
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
 
-client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-"""Supabase client used across the application."""
+_client: "Client | None" = None
+_lock = threading.Lock()
+
+
+def get_client() -> "Client":
+    """Create the Supabase client on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from supabase import create_client
+
+                _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _client
 
+
+class _LazyClient:
+    """Proxy that defers importing and creating the client until it is used."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_client(), name)
+
+
+client: "Client" = _LazyClient()  # type: ignore[assignment]
+"""Supabase client used across the application."""
@@ -0,0 +1,33 @@
+"""Thread pools for running blocking calls off the event loop."""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+
+db_pool = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+"""Pool for network-bound data access such as Supabase requests."""
+
+worker_pool = ThreadPoolExecutor(max_workers=WORKER_POOL_SIZE, thread_name_prefix="worker")
+"""Pool for CPU-bound or device I/O work such as image decoding and serial writes."""
+
+
+async def run_in_pool(pool: ThreadPoolExecutor, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run ``fn`` on ``pool`` and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+
+async def run_db(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking data access call on the database pool."""
+    return await run_in_pool(db_pool, fn, *args, **kwargs)
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call on the worker pool."""
+    return await run_in_pool(worker_pool, fn, *args, **kwargs)
+
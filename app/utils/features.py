@@ -0,0 +1,9 @@
+"""Feature switches read from the environment."""
+
+import os
+
+DIAGNOSIS_ENABLED = os.getenv("ENABLE_DIAGNOSIS", "true").lower() == "true"
+"""Serve photo diagnosis; when off TensorFlow is never imported."""
+
+PREDICTION_ENABLED = os.getenv("ENABLE_PREDICTION", "true").lower() == "true"
+"""Use the watering model; when off /predict answers with the heuristic."""
@@ -1,18 +1,107 @@
+import hashlib
 import json
 import logging
+import os
+import threading
+import time
+import unicodedata
 from pathlib import Path
 
 PLANT_INFO_PATH = Path("plant_info.json")
+PLANT_INFO_CHECK_INTERVAL = float(os.getenv("PLANT_INFO_CHECK_INTERVAL", "1.0"))
+
+
+def _normalize(key: str) -> str:
+    """Lowercase and strip diacritics so "Roșie" matches "rosie"."""
+    decomposed = unicodedata.normalize("NFKD", key.strip().lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _serialize(value) -> tuple[bytes, str]:
+    body = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class PlantCatalog:
+    """In-memory view of ``plant_info.json`` reloaded when the file changes.
+
+    Entries are indexed by their key plus the display and scientific names,
+    and each entry keeps its pre-serialized JSON body and ETag. The file is
+    stat'ed at most once per ``check_interval`` seconds.
+    """
+
+    def __init__(self, path: Path = PLANT_INFO_PATH, check_interval: float = PLANT_INFO_CHECK_INTERVAL) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature: tuple[int, int] | None = None
+        self._checked_at = 0.0
+        self._data: dict = {}
+        self._index: dict[str, str] = {}
+        self._entries: dict[str, tuple[bytes, str]] = {}
+        self._all: tuple[bytes, str] | None = None
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._signature is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if signature == self._signature:
+                    return
+                with self.path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as exc:  # pragma: no cover - file reading errors
+                logging.error("Error loading %s: %s", self.path, exc)
+                return
+            self._load(data)
+            self._signature = signature
+
+    def _load(self, data: dict) -> None:
+        index: dict[str, str] = {}
+        for key, info in data.items():
+            aliases = [key]
+            if isinstance(info, dict):
+                aliases += [info.get("name") or "", info.get("scientificName") or ""]
+            for alias in aliases:
+                if alias:
+                    index.setdefault(_normalize(alias), key)
+        self._entries = {key: _serialize(info) for key, info in data.items()}
+        self._all = _serialize(data)
+        self._index = index
+        self._data = data
+
+    def resolve(self, plant_type: str) -> str | None:
+        """Return the catalog key for a plant type or one of its aliases."""
+        self._refresh()
+        return self._index.get(_normalize(plant_type))
+
+    def get(self, plant_type: str | None = None) -> dict | None:
+        """Return info for one plant, or the whole catalog if no type is given."""
+        self._refresh()
+        if not plant_type:
+            return self._data if self._all is not None else None
+        key = self.resolve(plant_type)
+        return self._data.get(key) if key else None
+
+    def serialized(self, plant_type: str | None = None) -> tuple[bytes, str] | None:
+        """Return the JSON body and ETag for :meth:`get`'s result."""
+        self._refresh()
+        if not plant_type:
+            return self._all
+        key = self.resolve(plant_type)
+        return self._entries.get(key) if key else None
+
+
+plant_catalog = PlantCatalog()
+"""Shared catalog used by the plant endpoints."""
 
 
 def load_plant_info(plant_type: str | None = None) -> dict | None:
-    """Load plant info from JSON file."""
-    try:
-        with PLANT_INFO_PATH.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if plant_type:
-            return data.get(plant_type.lower())
-        return data
-    except Exception as exc:  # pragma: no cover - file reading errors
-        logging.error("Error loading plant_info.json: %s", exc)
-        return None
+    """Load plant info from the cached catalog."""
+    return plant_catalog.get(plant_type)
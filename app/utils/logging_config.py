@@ -1,12 +1,69 @@
-"""Logging helpers with rotation."""
+"""Logging helpers with rotation and a background writer thread."""
 
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line.
+
+    Structured values passed as ``extra={"fields": {...}}`` are merged into
+    the object.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """Queue records with their message merged but their fields intact.
+
+    The stock ``prepare`` formats the traceback into the message and drops
+    ``exc_info``; here the traceback is rendered into ``exc_text`` so the
+    writer's formatter can still emit it as a separate field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
 
 
 def setup_logging(log_file: str = "logs/api.log", level: int = logging.INFO) -> None:
-    """Configure root logger with rotation for info and error messages."""
+    """Configure root logger with rotation for info and error messages.
+
+    Records are put on a queue by the calling thread and written to the
+    rotating files by a :class:`QueueListener` thread, so request handlers
+    never block on file I/O.
+    """
+    global _listener
+    if _listener is not None:
+        return
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
     info_handler = RotatingFileHandler(log_file, maxBytes=1_048_576, backupCount=3)
     error_handler = RotatingFileHandler(
@@ -14,7 +71,24 @@ def setup_logging(log_file: str = "logs/api.log", level: int = logging.INFO) ->
     )
     info_handler.setLevel(level)
     error_handler.setLevel(logging.ERROR)
-    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    if LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
     info_handler.setFormatter(formatter)
     error_handler.setFormatter(formatter)
-    logging.basicConfig(level=level, handlers=[info_handler, error_handler])
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, info_handler, error_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    queue_handler = StructuredQueueHandler(log_queue)
+    logging.basicConfig(level=level, handlers=[queue_handler])
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,231 @@
+"""Low-overhead counters and latency histograms in Prometheus text format.
+
+Every thread records into its own shard, so the hot path takes no lock;
+shards are only summed when metrics are read. With several uvicorn workers,
+set ``METRICS_DIR`` to a directory shared by the workers: each one
+periodically writes its totals there and ``/metrics`` sums the files of all
+live workers.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "smartplant_http_requests_total": ("counter", "HTTP requests by route, method and status."),
+    "smartplant_http_request_duration_seconds": ("histogram", "HTTP request latency by route."),
+    "smartplant_operation_duration_seconds": ("histogram", "Latency of instrumented hot-path operations."),
+    "smartplant_sensor_readings_total": ("counter", "Sensor readings by quality filter outcome."),
+    "smartplant_sensor_reports_total": ("counter", "Sensor reports by kind (full, delta or heartbeat)."),
+}
+
+_local = threading.local()
+_shards: list[tuple[dict, dict]] = []
+_shards_lock = threading.Lock()
+_writer: threading.Thread | None = None
+_stop = threading.Event()
+
+
+def _shard() -> tuple[dict, dict]:
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = ({}, {})
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Add ``value`` to a counter."""
+    counters = _shard()[0]
+    key = (name, _labels(labels))
+    counters[key] = counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Record one observation in a histogram."""
+    _observe((name, _labels(labels)), seconds)
+
+
+def _observe(key: tuple, seconds: float) -> None:
+    histograms = _shard()[1]
+    entry = histograms.get(key)
+    if entry is None:
+        entry = histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+    entry[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+    entry[1] += seconds
+
+
+class timer:
+    """Time a block as ``smartplant_operation_duration_seconds{op=...}``."""
+
+    __slots__ = ("key", "start")
+
+    def __init__(self, op: str) -> None:
+        self.key = ("smartplant_operation_duration_seconds", (("op", op),))
+
+    def __enter__(self) -> "timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _observe(self.key, time.perf_counter() - self.start)
+
+
+def timed(op: str):
+    """Decorator form of :func:`timer`."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(op):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def snapshot() -> dict:
+    """Sum all shards of this process into JSON-friendly lists."""
+    counters: dict[tuple, float] = {}
+    histograms: dict[tuple, list] = {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard_counters, shard_histograms in shards:
+        for key, value in list(shard_counters.items()):
+            counters[key] = counters.get(key, 0) + value
+        for key, (buckets, total) in list(shard_histograms.items()):
+            merged = histograms.setdefault(key, [[0] * (len(BUCKETS) + 1), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+    return {
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(labels), buckets, total] for (name, labels), (buckets, total) in histograms.items()],
+    }
+
+
+def _merge(snapshots: list[dict]) -> tuple[dict, dict]:
+    counters: dict[tuple, float] = {}
+    histograms: dict[tuple, list] = {}
+    for snap in snapshots:
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, total in snap["histograms"]:
+            key = (name, tuple(tuple(label) for label in labels))
+            merged = histograms.setdefault(key, [[0] * (len(BUCKETS) + 1), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+    return counters, histograms
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_snapshot(directory: str = METRICS_DIR) -> None:
+    """Write this worker's totals to ``<directory>/<pid>.json``."""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    tmp = path / f".{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(snapshot()))
+    os.replace(tmp, path / f"{os.getpid()}.json")
+
+
+def collect(directory: str = METRICS_DIR) -> list[dict]:
+    """Return snapshots of every live worker, or only this one without a directory."""
+    if not directory:
+        return [snapshot()]
+    write_snapshot(directory)
+    snapshots = []
+    for file in Path(directory).glob("*.json"):
+        try:
+            pid = int(file.stem)
+            if not _pid_alive(pid):
+                file.unlink(missing_ok=True)
+                continue
+            snapshots.append(json.loads(file.read_text()))
+        except (ValueError, OSError) as exc:
+            logging.error("Skipping metrics file %s: %s", file, exc)
+    return snapshots
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render(snapshots: list[dict] | None = None) -> str:
+    """Render metrics in the Prometheus text exposition format."""
+    counters, histograms = _merge(snapshots if snapshots is not None else collect())
+    lines = []
+    names = sorted({name for name, _ in counters} | {name for name, _ in histograms})
+    for name in names:
+        kind, text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (metric, labels), (buckets, total) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def start() -> None:
+    """Periodically write this worker's snapshot when ``METRICS_DIR`` is set."""
+    global _writer
+    if not METRICS_DIR or (_writer is not None and _writer.is_alive()):
+        return
+    _stop.clear()
+
+    def run() -> None:
+        while not _stop.wait(METRICS_FLUSH_INTERVAL):
+            try:
+                write_snapshot()
+            except OSError as exc:
+                logging.error("Writing metrics snapshot failed: %s", exc)
+
+    _writer = threading.Thread(target=run, name="metrics", daemon=True)
+    _writer.start()
+
+
+def stop() -> None:
+    """Stop the snapshot writer and remove this worker's file."""
+    _stop.set()
+    if METRICS_DIR:
+        (Path(METRICS_DIR) / f"{os.getpid()}.json").unlink(missing_ok=True)
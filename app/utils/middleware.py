@@ -1,15 +1,98 @@
 """Custom middleware utilities."""
 
 import logging
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+import os
+import random
+import time
 
+from . import metrics
 
-class RequestLoggerMiddleware(BaseHTTPMiddleware):
-    """Log each incoming request path and status code."""
+LOG_SAMPLED_PATHS = tuple(p for p in os.getenv("LOG_SAMPLED_PATHS", "/api/sensor-data").split(",") if p)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        logging.info("%s %s -> %s", request.method, request.url.path, response.status_code)
-        return response
+logger = logging.getLogger("smartplant.requests")
 
+
+class RequestLoggerMiddleware:
+    """Log method, path, status code and latency of each HTTP request.
+
+    Implemented as plain ASGI so responses, including streaming ones, pass
+    through untouched. Successful requests to ``sampled_paths`` prefixes
+    are logged with probability ``sample_rate``; errors are always logged.
+    """
+
+    def __init__(self, app, sampled_paths: tuple[str, ...] = LOG_SAMPLED_PATHS, sample_rate: float = LOG_SAMPLE_RATE) -> None:
+        self.app = app
+        self.sampled_paths = sampled_paths
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._log(scope, status_code, (time.perf_counter() - start) * 1000)
+
+    def _log(self, scope, status_code: int, duration_ms: float) -> None:
+        path = scope["path"]
+        rate = 1.0
+        if status_code < 400 and path.startswith(self.sampled_paths):
+            rate = self.sample_rate
+            if rate < 1.0 and random.random() >= rate:
+                return
+        logger.info(
+            "%s %s -> %s",
+            scope["method"],
+            path,
+            status_code,
+            extra={
+                "fields": {
+                    "method": scope["method"],
+                    "path": path,
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "sample_rate": rate,
+                }
+            },
+        )
+
+
+class MetricsMiddleware:
+    """Count requests and record latency per route template for ``/metrics``."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            metrics.inc("smartplant_http_requests_total", route=path, method=scope["method"], status=status_code)
+            metrics.observe("smartplant_http_request_duration_seconds", time.perf_counter() - start, route=path)
@@ -0,0 +1,401 @@
+"""Storage backends for the sensor, watering and diagnostic log tables."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+from . import metrics
+from .db import SUPABASE_KEY, SUPABASE_URL, client as supabase
+from .executor import run_db
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+STORAGE_DB_PATH = os.getenv("STORAGE_DB_PATH", "smartplant.db")
+SYNC_INTERVAL = float(os.getenv("STORAGE_SYNC_INTERVAL", "30"))
+SYNC_BATCH_SIZE = int(os.getenv("STORAGE_SYNC_BATCH_SIZE", "500"))
+
+TABLES = ("sensor_logs", "watering_logs", "diagnostic_logs")
+COLUMNS = {
+    "sensor_logs": {
+        "device_id": "text",
+        "plant_type": "text",
+        "soil_moisture": "double precision",
+        "temperature": "double precision",
+        "air_humidity": "double precision",
+        "light": "double precision",
+    },
+    "watering_logs": {},
+    "diagnostic_logs": {
+        "plant_type": "text",
+        "predicted_class": "text",
+        "confidence": "double precision",
+        "action_message": "text",
+        "adjust_days": "bigint",
+        "reduce_ml": "boolean",
+        "all_scores": "jsonb",
+        "decision_reason": "text",
+        "image_hash": "text",
+        "model_version": "text",
+        "user_feedback": "text",
+    },
+}
+"""Postgres types of the columns the app writes, besides ``id`` and ``timestamp``."""
+
+
+class StorageBackend(ABC):
+    """Row storage keyed by table name.
+
+    Rows are plain dicts. ``recent`` returns the newest rows first and
+    ``between`` returns rows in ``[start, end)`` by ISO timestamp, oldest
+    first. A ``device_id`` of ``None`` selects rows without a device.
+    ``scan`` pages through a whole table by ``id`` and ``page_after``
+    by ``(timestamp, id)``, resuming after the ``last`` row it is given.
+    ``upsert`` inserts rows or updates the ones whose ``key`` column
+    already exists, so repeating it does not create duplicates.
+    """
+
+    @abstractmethod
+    def insert(self, table: str, rows: list[dict]) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def recent(self, table: str, limit: int, device_id: str | None = None) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def between(
+        self, table: str, device_id: str | None, start: str, end: str, offset: int, limit: int, columns: tuple = ()
+    ) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def scan(self, table: str, after_id=None, limit: int = 1000, columns: tuple = ()) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def page_after(self, table: str, last: dict | None, limit: int) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def upsert(self, table: str, rows: list[dict], key: str) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def update(self, table: str, row_id, values: dict) -> list[dict]:
+        ...
+
+
+class SupabaseStorage(StorageBackend):
+    """Tables in the configured Supabase project."""
+
+    @metrics.timed("supabase.insert")
+    def insert(self, table, rows):
+        return supabase.table(table).insert(rows).execute().data
+
+    @metrics.timed("supabase.recent")
+    def recent(self, table, limit, device_id=None):
+        query = supabase.table(table).select("*")
+        if device_id is not None:
+            query = query.eq("device_id", device_id)
+        return query.order("timestamp", desc=True).limit(limit).execute().data
+
+    @metrics.timed("supabase.between")
+    def between(self, table, device_id, start, end, offset, limit, columns=()):
+        query = supabase.table(table).select(",".join(columns) or "*").gte("timestamp", start).lt("timestamp", end)
+        query = query.is_("device_id", "null") if device_id is None else query.eq("device_id", device_id)
+        return query.order("timestamp").range(offset, offset + limit - 1).execute().data
+
+    @metrics.timed("supabase.scan")
+    def scan(self, table, after_id=None, limit=1000, columns=()):
+        query = supabase.table(table).select(",".join(columns) or "*")
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        return query.order("id").limit(limit).execute().data
+
+    @metrics.timed("supabase.page_after")
+    def page_after(self, table, last, limit):
+        query = supabase.table(table).select("*").order("timestamp").order("id").limit(limit)
+        if last is not None:
+            ts, row_id = last["timestamp"], last["id"]
+            query = query.or_(f'timestamp.gt."{ts}",and(timestamp.eq."{ts}",id.gt."{row_id}")')
+        return query.execute().data
+
+    @metrics.timed("supabase.upsert")
+    def upsert(self, table, rows, key):
+        return supabase.table(table).upsert(rows, on_conflict=key).execute().data
+
+    @metrics.timed("supabase.update")
+    def update(self, table, row_id, values):
+        return supabase.table(table).update(values).eq("id", row_id).execute().data
+
+
+class SQLiteStorage(StorageBackend):
+    """Local SQLite file in WAL mode, usable without network access.
+
+    Each row is stored as JSON next to indexed ``device_id`` and
+    ``timestamp`` columns. ``remote_id`` and ``synced`` track what
+    :class:`SupabaseSync` has already pushed upstream; ``sync_key`` is a
+    client-generated key that identifies the row remotely, and ``version``
+    is bumped on every update so a push never hides a concurrent change.
+    """
+
+    def __init__(self, path: str = STORAGE_DB_PATH) -> None:
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            for table in TABLES:
+                conn.execute(
+                    f"""CREATE TABLE IF NOT EXISTS {table} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        device_id TEXT,
+                        timestamp TEXT NOT NULL,
+                        data TEXT NOT NULL,
+                        remote_id TEXT,
+                        synced INTEGER NOT NULL DEFAULT 0,
+                        version INTEGER NOT NULL DEFAULT 0,
+                        sync_key TEXT
+                    )"""
+                )
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if "version" not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                if "sync_key" not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN sync_key TEXT")
+                    conn.execute(f"UPDATE {table} SET sync_key = lower(hex(randomblob(16)))")
+                conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_sync_key ON {table} (sync_key)")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_device_ts ON {table} (device_id, timestamp)")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_ts ON {table} (timestamp)")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_unsynced ON {table} (id) WHERE synced = 0")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _table(table: str) -> str:
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        return table
+
+    @staticmethod
+    def _row(row_id: int, timestamp: str, data: str) -> dict:
+        return {**json.loads(data), "id": row_id, "timestamp": timestamp}
+
+    @metrics.timed("sqlite.insert")
+    def insert(self, table, rows):
+        table = self._table(table)
+        now = datetime.now(timezone.utc).isoformat()
+        stored = []
+        with self._connect() as conn:
+            for row in rows:
+                timestamp = row.get("timestamp") or now
+                data = json.dumps({k: v for k, v in row.items() if k not in ("id", "timestamp", "sync_key")})
+                cursor = conn.execute(
+                    f"INSERT INTO {table} (device_id, timestamp, data, sync_key) VALUES (?, ?, ?, ?)",
+                    (row.get("device_id"), timestamp, data, row.get("sync_key") or uuid.uuid4().hex),
+                )
+                stored.append(self._row(cursor.lastrowid, timestamp, data))
+        return stored
+
+    @metrics.timed("sqlite.upsert")
+    def upsert(self, table, rows, key):
+        table = self._table(table)
+        if key != "sync_key":
+            raise ValueError("SQLite storage only upserts on sync_key")
+        stored = []
+        for row in rows:
+            found = self._connect().execute(f"SELECT id FROM {table} WHERE sync_key = ?", (row.get(key),)).fetchone()
+            if found is None:
+                stored.extend(self.insert(table, [row]))
+            else:
+                values = {k: v for k, v in row.items() if k not in ("id", "timestamp", "sync_key")}
+                stored.extend(self.update(table, found[0], values))
+        return stored
+
+    @metrics.timed("sqlite.recent")
+    def recent(self, table, limit, device_id=None):
+        table = self._table(table)
+        if device_id is None:
+            sql = f"SELECT id, timestamp, data FROM {table} ORDER BY timestamp DESC, id DESC LIMIT ?"
+            params = (limit,)
+        else:
+            sql = f"SELECT id, timestamp, data FROM {table} WHERE device_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?"
+            params = (device_id, limit)
+        return [self._row(*r) for r in self._connect().execute(sql, params)]
+
+    @metrics.timed("sqlite.between")
+    def between(self, table, device_id, start, end, offset, limit, columns=()):
+        table = self._table(table)
+        device_clause = "device_id IS NULL" if device_id is None else "device_id = ?"
+        params = ([] if device_id is None else [device_id]) + [start, end, limit, offset]
+        sql = (
+            f"SELECT id, timestamp, data FROM {table} WHERE {device_clause} "
+            "AND timestamp >= ? AND timestamp < ? ORDER BY timestamp, id LIMIT ? OFFSET ?"
+        )
+        return [self._row(*r) for r in self._connect().execute(sql, params)]
+
+    @metrics.timed("sqlite.scan")
+    def scan(self, table, after_id=None, limit=1000, columns=()):
+        table = self._table(table)
+        sql = f"SELECT id, timestamp, data FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+        return [self._row(*r) for r in self._connect().execute(sql, (-1 if after_id is None else int(after_id), limit))]
+
+    @metrics.timed("sqlite.page_after")
+    def page_after(self, table, last, limit):
+        table = self._table(table)
+        if last is None:
+            sql, params = f"SELECT id, timestamp, data FROM {table} ORDER BY timestamp, id LIMIT ?", (limit,)
+        else:
+            sql = (
+                f"SELECT id, timestamp, data FROM {table} WHERE timestamp > ? OR (timestamp = ? AND id > ?) "
+                "ORDER BY timestamp, id LIMIT ?"
+            )
+            params = (last["timestamp"], last["timestamp"], int(last["id"]), limit)
+        return [self._row(*r) for r in self._connect().execute(sql, params)]
+
+    @metrics.timed("sqlite.update")
+    def update(self, table, row_id, values):
+        table = self._table(table)
+        try:
+            row_id = int(row_id)
+        except (TypeError, ValueError):
+            return []
+        with self._connect() as conn:
+            found = conn.execute(f"SELECT timestamp, data FROM {table} WHERE id = ?", (row_id,)).fetchone()
+            if found is None:
+                return []
+            data = json.dumps({**json.loads(found[1]), **values})
+            conn.execute(f"UPDATE {table} SET data = ?, synced = 0, version = version + 1 WHERE id = ?", (data, row_id))
+        return [self._row(row_id, found[0], data)]
+
+    def unsynced(self, table: str, limit: int) -> list[tuple[int, str | None, int, dict]]:
+        """Return ``(local id, remote id, version, row)`` for rows not yet pushed upstream.
+
+        ``row`` carries its ``sync_key``.
+        """
+        table = self._table(table)
+        sql = (
+            f"SELECT id, remote_id, version, sync_key, timestamp, data FROM {table} "
+            "WHERE synced = 0 ORDER BY id LIMIT ?"
+        )
+        return [
+            (row_id, remote_id, version, {**json.loads(data), "timestamp": timestamp, "sync_key": sync_key})
+            for row_id, remote_id, version, sync_key, timestamp, data in self._connect().execute(sql, (limit,))
+        ]
+
+    def mark_synced(self, table: str, pushed: list[tuple[int, int]], remote_ids: list | None = None) -> int:
+        """Mark ``(local id, version)`` pairs as pushed and return how many were.
+
+        A row updated since the push has a newer version and stays
+        unsynced; its remote id is still recorded.
+        """
+        table = self._table(table)
+        with self._connect() as conn:
+            if remote_ids is not None:
+                conn.executemany(
+                    f"UPDATE {table} SET remote_id = ? WHERE id = ?",
+                    [(str(r), i) for r, (i, _) in zip(remote_ids, pushed)],
+                )
+            return conn.executemany(f"UPDATE {table} SET synced = 1 WHERE id = ? AND version = ?", pushed).rowcount
+
+
+class SupabaseSync:
+    """Push rows written to a :class:`SQLiteStorage` up to Supabase in batches.
+
+    New rows are upserted in batches of ``batch_size`` on their
+    ``sync_key``, so a retried batch never creates duplicates; rows changed
+    after they were pushed are updated by their remote id. Failures are
+    logged and retried on the next pass.
+    """
+
+    def __init__(self, local: SQLiteStorage, remote: StorageBackend, interval: float = SYNC_INTERVAL, batch_size: int = SYNC_BATCH_SIZE) -> None:
+        self.local = local
+        self.remote = remote
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+        self.synced_rows = 0
+        self.failures = 0
+
+    def sync_once(self) -> int:
+        """Push one batch per table and return how many rows were marked synced."""
+        total = 0
+        for table in TABLES:
+            pending = self.local.unsynced(table, self.batch_size)
+            new = [(i, version, row) for i, remote_id, version, row in pending if remote_id is None]
+            changed = [(i, remote_id, version, row) for i, remote_id, version, row in pending if remote_id is not None]
+            if new:
+                stored = self.remote.upsert(table, [row for _, _, row in new], "sync_key") or []
+                by_key = {r.get("sync_key"): r.get("id") for r in stored}
+                # Rows missing from the response stay unsynced and are upserted again.
+                matched = [(i, version, by_key[row["sync_key"]]) for i, version, row in new if by_key.get(row["sync_key"]) is not None]
+                total += self.local.mark_synced(table, [(i, v) for i, v, _ in matched], [r for _, _, r in matched])
+            for i, remote_id, version, row in changed:
+                self.remote.update(table, remote_id, {k: v for k, v in row.items() if k not in ("timestamp", "sync_key")})
+                total += self.local.mark_synced(table, [(i, version)])
+        self.synced_rows += total
+        return total
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Keep going while full batches are synced; a pass that marks
+                # fewer rows (or none, when the upsert returns no rows) waits.
+                while await run_db(self.sync_once) >= self.batch_size:
+                    pass
+            except Exception as exc:
+                self.failures += 1
+                logging.error("Supabase sync failed: %s", exc)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None and not self._task.done(), "synced_rows": self.synced_rows, "failures": self.failures}
+
+
+_backend: StorageBackend | None = None
+_sync: SupabaseSync | None = None
+_lock = threading.Lock()
+
+
+def get_backend() -> StorageBackend:
+    """Return the backend selected by ``STORAGE_BACKEND``."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = SQLiteStorage() if STORAGE_BACKEND == "sqlite" else SupabaseStorage()
+    return _backend
+
+
+def get_sync() -> SupabaseSync | None:
+    """Return the background sync when a local backend and Supabase are both configured."""
+    global _sync
+    backend = get_backend()
+    if _sync is None and isinstance(backend, SQLiteStorage) and SUPABASE_URL and SUPABASE_KEY:
+        _sync = SupabaseSync(backend, SupabaseStorage())
+    return _sync
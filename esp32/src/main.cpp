@@ -142,6 +142,38 @@ void tryConnectWiFi() {
   }
 }
 
+// === DEAD-BAND REPORTING ===
+// The server answers each reading with the dead bands to use: a metric is
+// only reported once it moves past its threshold from the value last sent,
+// and a full reading is sent at least every heartbeat. Until the server sends parameters every
+// sample is reported in full.
+struct ReportingParams {
+  float soil_moisture;
+  float temperature;
+  float air_humidity;
+  float light;
+  unsigned long heartbeatMs;
+  unsigned long sampleMs;
+  bool enabled;
+};
+
+ReportingParams reporting = {2.0, 0.5, 3.0, 200.0, 900000UL, 60000UL, false};
+
+void applyReporting(const String& body) {
+  StaticJsonDocument<512> doc;
+  if (deserializeJson(doc, body)) return;
+  JsonObject r = doc["reporting"];
+  if (r.isNull()) return;
+  JsonObject t = r["thresholds"];
+  reporting.soil_moisture = t["soil_moisture"] | reporting.soil_moisture;
+  reporting.temperature = t["temperature"] | reporting.temperature;
+  reporting.air_humidity = t["air_humidity"] | reporting.air_humidity;
+  reporting.light = t["light"] | reporting.light;
+  reporting.heartbeatMs = (r["heartbeat_s"] | reporting.heartbeatMs / 1000UL) * 1000UL;
+  reporting.sampleMs = (r["sample_s"] | reporting.sampleMs / 1000UL) * 1000UL;
+  reporting.enabled = true;
+}
+
 // === BUFFER ===
 void saveToBuffer(const String& payload) {
   File file = SPIFFS.open("/buffer.json", FILE_APPEND);
@@ -158,8 +190,10 @@ bool sendToServer(const String& payload) {
   http.begin(backend_url);
   http.addHeader("Content-Type", "application/json");
   int code = http.POST(payload);
+  String body = code == 200 ? http.getString() : String();
   http.end();
   Serial.printf("🌐 POST status: %d\n", code);
+  if (code == 200) applyReporting(body);
   return code == 200;
 }
 
@@ -186,25 +220,148 @@ void flushBufferToServer() {
 // Read all sensors and return JSON payload
 
 // === SENSORS ===
-String collectSensorJSON() {
-  float soil_percent = readSoilMoisture(SOIL_MOISTURE_AO_PIN);
-  float light_value = readLight(LIGHT_AO_PIN);
-  float temp = readTemperature(dht);
-  float humidity = readHumidity(dht);
+// Same layout as one record of the server's SPB1 binary format.
+struct __attribute__((packed)) SensorRecord {
+  uint32_t timestamp;  // 0 = stamped by the server
+  float soil_moisture;
+  float temperature;
+  float air_humidity;
+  float light;
+};
+
+const char* plant_type = "rosie";
+
+SensorRecord readSensorRecord() {
+  SensorRecord record;
+  time_t now = time(nullptr);
+  record.timestamp = now > 1600000000 ? (uint32_t)now : 0;
+  record.soil_moisture = readSoilMoisture(SOIL_MOISTURE_AO_PIN);
+  record.light = readLight(LIGHT_AO_PIN);
+  record.temperature = readTemperature(dht);
+  record.air_humidity = readHumidity(dht);
+  Serial.printf("🌱 %.1f%% | ☀️ %.0f | 🌡️ %.1f°C | 💧 %.1f%%\n", record.soil_moisture, record.light, record.temperature, record.air_humidity);
+  return record;
+}
 
+String recordToJSON(const SensorRecord& record) {
   StaticJsonDocument<256> doc;
-  doc["plant_type"] = "rosie";
-  doc["soil_moisture"] = soil_percent;
-  doc["temperature"] = temp;
-  doc["air_humidity"] = humidity;
-  doc["light"] = light_value;
+  doc["device_id"] = WiFi.macAddress();
+  doc["plant_type"] = plant_type;
+  doc["soil_moisture"] = record.soil_moisture;
+  doc["temperature"] = record.temperature;
+  doc["air_humidity"] = record.air_humidity;
+  doc["light"] = record.light;
+
+  String payload;
+  serializeJson(doc, payload);
+  return payload;
+}
+
+// Bits of the metrics carried by a report, so only those count as sent.
+const uint8_t SENT_SOIL_MOISTURE = 1 << 0;
+const uint8_t SENT_TEMPERATURE = 1 << 1;
+const uint8_t SENT_AIR_HUMIDITY = 1 << 2;
+const uint8_t SENT_LIGHT = 1 << 3;
+const uint8_t SENT_ALL = SENT_SOIL_MOISTURE | SENT_TEMPERATURE | SENT_AIR_HUMIDITY | SENT_LIGHT;
+
+SensorRecord lastSent;
+unsigned long lastFullAt = 0;
+bool haveLastSent = false;
+
+// Return the payload to report for this sample, or "" when every metric is
+// still inside its dead band and no heartbeat is due. `sent` gets the
+// metrics the payload carries.
+String buildReport(const SensorRecord& record, uint8_t& sent) {
+  sent = SENT_ALL;
+  if (!reporting.enabled || !haveLastSent || millis() - lastFullAt >= reporting.heartbeatMs) {
+    if (!reporting.enabled || !haveLastSent) return recordToJSON(record);
+    StaticJsonDocument<256> doc;
+    deserializeJson(doc, recordToJSON(record));
+    doc["heartbeat"] = true;
+    String payload;
+    serializeJson(doc, payload);
+    return payload;
+  }
+
+  StaticJsonDocument<256> doc;
+  sent = 0;
+  if (fabs(record.soil_moisture - lastSent.soil_moisture) >= reporting.soil_moisture) {
+    doc["soil_moisture"] = record.soil_moisture;
+    sent |= SENT_SOIL_MOISTURE;
+  }
+  if (fabs(record.temperature - lastSent.temperature) >= reporting.temperature) {
+    doc["temperature"] = record.temperature;
+    sent |= SENT_TEMPERATURE;
+  }
+  if (fabs(record.air_humidity - lastSent.air_humidity) >= reporting.air_humidity) {
+    doc["air_humidity"] = record.air_humidity;
+    sent |= SENT_AIR_HUMIDITY;
+  }
+  if (fabs(record.light - lastSent.light) >= reporting.light) {
+    doc["light"] = record.light;
+    sent |= SENT_LIGHT;
+  }
+  if (!sent) return String();
 
+  doc["device_id"] = WiFi.macAddress();
+  doc["delta"] = true;
   String payload;
   serializeJson(doc, payload);
-  Serial.printf("🌱 %.1f%% | ☀️ %.0f | 🌡️ %.1f°C | 💧 %.1f%%\n", soil_percent, light_value, temp, humidity);
   return payload;
 }
 
+// Remember the values the server now has. A delta only updates the metrics
+// it carried, so a slow drift in the others still crosses its dead band;
+// full and heartbeat reports replace the whole record and restart the
+// heartbeat.
+void markSent(const SensorRecord& record, uint8_t sent) {
+  if (sent == SENT_ALL) {
+    lastSent = record;
+    lastFullAt = millis();
+    haveLastSent = true;
+    return;
+  }
+  if (sent & SENT_SOIL_MOISTURE) lastSent.soil_moisture = record.soil_moisture;
+  if (sent & SENT_TEMPERATURE) lastSent.temperature = record.temperature;
+  if (sent & SENT_AIR_HUMIDITY) lastSent.air_humidity = record.air_humidity;
+  if (sent & SENT_LIGHT) lastSent.light = record.light;
+}
+
+String collectSensorJSON() {
+  return recordToJSON(readSensorRecord());
+}
+
+// Build with -DUSE_BINARY_PAYLOAD to upload readings in the compact format.
+#ifdef USE_BINARY_PAYLOAD
+const char* backend_binary_url = "http://192.168.1.137:8000/api/sensor-data/binary";
+
+bool sendBinaryRecord(const SensorRecord& record) {
+  if (WiFi.status() != WL_CONNECTED) return false;
+  String device = WiFi.macAddress();
+  uint8_t deviceLen = device.length();
+  uint8_t plantLen = strlen(plant_type);
+  uint16_t count = 1;
+
+  uint8_t buf[8 + 255 + 255 + sizeof(SensorRecord)];
+  size_t n = 0;
+  memcpy(buf + n, "SPB1", 4); n += 4;
+  memcpy(buf + n, &count, 2); n += 2;  // ESP32 is little-endian, as the format expects
+  buf[n++] = deviceLen;
+  buf[n++] = plantLen;
+  memcpy(buf + n, device.c_str(), deviceLen); n += deviceLen;
+  memcpy(buf + n, plant_type, plantLen); n += plantLen;
+  memcpy(buf + n, &record, sizeof(SensorRecord)); n += sizeof(SensorRecord);
+
+  HTTPClient http;
+  http.begin(backend_binary_url);
+  http.addHeader("Content-Type", "application/octet-stream");
+  int code = http.POST(buf, n);
+  http.end();
+  Serial.printf("🌐 POST binar status: %d\n", code);
+  return code == 200;
+}
+#endif
+
 // === MAIN ===
 void setup() {
   Serial.begin(115200);
@@ -226,10 +383,26 @@ void loop() {
     return;
   }
 
-  String payload = collectSensorJSON();
+#ifdef USE_BINARY_PAYLOAD
+  SensorRecord record = readSensorRecord();
+  String payload = recordToJSON(record);
+  bool sent = sendBinaryRecord(record);
+#else
+  SensorRecord record = readSensorRecord();
+  String payload = recordToJSON(record);  // buffered readings are always full
+  uint8_t sentMetrics;
+  String report = buildReport(record, sentMetrics);
+  if (report.isEmpty()) {
+    Serial.println("💤 Fără schimbări peste prag");
+    delay(reporting.sampleMs);
+    return;
+  }
+  bool sent = sendToServer(report);
+  if (sent) markSent(record, sentMetrics);
+#endif
 
   if (WiFi.status() == WL_CONNECTED) {
-    if (sendToServer(payload)) {
+    if (sent) {
       Serial.println("✅ Date trimise");
       flushBufferToServer();
     } else {
@@ -241,5 +414,5 @@ void loop() {
     saveToBuffer(payload);
   }
 
-  delay(60000); // 1 minut
+  delay(reporting.sampleMs);
 }
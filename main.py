@@ -1,5 +1,7 @@
 """FastAPI application entry-point."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -10,12 +12,33 @@ from app.routers import (
     manual_router,
     system_router,
 )
+from app.services import ingest, ml, warmup
+from app.utils import metrics, storage
 from app.utils.logging_config import setup_logging
-from app.utils.middleware import RequestLoggerMiddleware
+from app.utils.middleware import MetricsMiddleware, RequestLoggerMiddleware
 
 setup_logging()
 
-app = FastAPI(title="SmartPlant API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers and drain them on shutdown."""
+    ingest.sensor_buffer.start()
+    metrics.start()
+    sync = storage.get_sync()
+    if sync is not None:
+        sync.start()
+    if warmup.WARMUP_ON_STARTUP:
+        warmup.start()
+    yield
+    await ingest.sensor_buffer.stop()
+    if sync is not None:
+        await sync.stop()
+    ml.batcher.stop()
+    metrics.stop()
+
+
+app = FastAPI(title="SmartPlant API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +48,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(RequestLoggerMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(plant_router)
 app.include_router(sensor_router)
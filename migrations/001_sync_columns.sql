@@ -0,0 +1,39 @@
+-- Columns and indexes the backend needs in the Supabase tables.
+-- Safe to run more than once. Keep in sync with app.utils.storage.COLUMNS.
+
+alter table sensor_logs add column if not exists timestamp timestamptz not null default now();
+alter table sensor_logs add column if not exists device_id text;
+alter table sensor_logs add column if not exists plant_type text;
+alter table sensor_logs add column if not exists soil_moisture double precision;
+alter table sensor_logs add column if not exists temperature double precision;
+alter table sensor_logs add column if not exists air_humidity double precision;
+alter table sensor_logs add column if not exists light double precision;
+
+alter table watering_logs add column if not exists timestamp timestamptz not null default now();
+
+alter table diagnostic_logs add column if not exists timestamp timestamptz not null default now();
+alter table diagnostic_logs add column if not exists plant_type text;
+alter table diagnostic_logs add column if not exists predicted_class text;
+alter table diagnostic_logs add column if not exists confidence double precision;
+alter table diagnostic_logs add column if not exists action_message text;
+alter table diagnostic_logs add column if not exists adjust_days bigint;
+alter table diagnostic_logs add column if not exists reduce_ml boolean;
+alter table diagnostic_logs add column if not exists all_scores jsonb;
+alter table diagnostic_logs add column if not exists decision_reason text;
+alter table diagnostic_logs add column if not exists image_hash text;
+alter table diagnostic_logs add column if not exists model_version text;
+alter table diagnostic_logs add column if not exists user_feedback text;
+
+-- Client-generated key that SQLite storage upserts on (SupabaseSync).
+alter table sensor_logs add column if not exists sync_key text;
+alter table watering_logs add column if not exists sync_key text;
+alter table diagnostic_logs add column if not exists sync_key text;
+create unique index if not exists sensor_logs_sync_key on sensor_logs (sync_key);
+create unique index if not exists watering_logs_sync_key on watering_logs (sync_key);
+create unique index if not exists diagnostic_logs_sync_key on diagnostic_logs (sync_key);
+
+-- Per-device history, rollup backfills and keyset export paging.
+create index if not exists sensor_logs_device_ts on sensor_logs (device_id, timestamp);
+create index if not exists sensor_logs_ts_id on sensor_logs (timestamp, id);
+create index if not exists watering_logs_ts_id on watering_logs (timestamp, id);
+create index if not exists diagnostic_logs_ts_id on diagnostic_logs (timestamp, id);
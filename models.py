@@ -3,6 +3,7 @@ from datetime import datetime
 
 class SensorLog(BaseModel):
     timestamp: datetime
+    device_id: str | None = None  # ex: adresa MAC a ESP32
 
     soil_moisture: float = Field(..., ge=0, le=100)
     temperature: float = Field(..., ge=-20, le=60)
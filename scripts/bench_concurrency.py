@@ -0,0 +1,70 @@
+"""Compare request throughput of inline vs pooled blocking calls.
+
+A stand-in for a Supabase request sleeps for ``--latency`` milliseconds.
+The ``inline`` route calls it directly from an ``async def`` handler, as the
+routers used to; the ``pooled`` route awaits it through ``run_db``. Each
+route is hit by ``--concurrency`` clients in-process.
+
+    python -m scripts.bench_concurrency --latency 50 --requests 400
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.utils import executor
+
+
+def build_app(latency: float) -> FastAPI:
+    app = FastAPI()
+
+    def fake_query() -> list[dict]:
+        time.sleep(latency)
+        return [{"soil_moisture": 42}]
+
+    @app.get("/inline")
+    async def inline():
+        return fake_query()
+
+    @app.get("/pooled")
+    async def pooled():
+        return await executor.run_db(fake_query)
+
+    return app
+
+
+async def hammer(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker() -> None:
+            for _ in remaining:
+                resp = await client.get(path)
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=50.0, help="simulated query latency in ms")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    app = build_app(args.latency / 1000)
+    print(f"db pool size {executor.DB_POOL_SIZE}, latency {args.latency:.0f} ms, concurrency {args.concurrency}")
+    for path in ("/inline", "/pooled"):
+        elapsed = asyncio.run(hammer(app, path, args.requests, args.concurrency))
+        print(f"{path:8} {args.requests} requests in {elapsed:6.2f}s -> {args.requests / elapsed:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare parsing throughput of JSON and binary sensor uploads.
+
+Builds the same batch of readings in both formats and times the work the
+ingestion endpoints do before queueing: parsing (plus ``SensorLog``
+validation for JSON, to match the checks the binary path applies) and
+turning readings into ``sensor_logs`` rows.
+
+    python -m scripts.bench_payloads --readings 1000 --repeat 50
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.routers.sensor import _sensor_row
+from app.services import sensor_codec
+from models import SensorLog
+
+
+def make_readings(n: int) -> list[dict]:
+    rng = np.random.default_rng(0)
+    now = int(time.time()) - n * 60
+    return [
+        {
+            "timestamp": now + i * 60,
+            "soil_moisture": round(float(rng.uniform(10, 90)), 1),
+            "temperature": round(float(rng.uniform(5, 35)), 1),
+            "air_humidity": round(float(rng.uniform(20, 90)), 1),
+            "light": round(float(rng.uniform(0, 4000))),
+        }
+        for i in range(n)
+    ]
+
+
+def parse_json(body: bytes) -> list[dict]:
+    return [_sensor_row(data) for data in json.loads(body)]
+
+
+def parse_json_validated(body: bytes) -> list[dict]:
+    rows = []
+    for data in json.loads(body):
+        SensorLog(**data, last_watered_days=0, ml_prediction_prev=0)
+        rows.append(_sensor_row(data))
+    return rows
+
+
+def parse_binary(body: bytes) -> list[dict]:
+    device_id, plant_type, records = sensor_codec.decode(body)
+    return sensor_codec.to_rows(device_id, plant_type, records[sensor_codec.validate(records)])
+
+
+def parse_binary_decode_only(body: bytes):
+    _, _, records = sensor_codec.decode(body)
+    return records[sensor_codec.validate(records)]
+
+
+def timed(fn, body: bytes, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(body)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readings", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    readings = make_readings(args.readings)
+    device = {"device_id": "AA:BB:CC:DD:EE:FF", "plant_type": "rosie"}
+    json_body = json.dumps([{**device, **r} for r in readings]).encode()
+    binary_body = sensor_codec.encode(readings, **device)
+    print(f"payload: json {len(json_body)} B, binary {len(binary_body)} B")
+
+    for name, fn, body in (
+        ("json", parse_json, json_body),
+        ("json + SensorLog", parse_json_validated, json_body),
+        ("binary decode+validate", parse_binary_decode_only, binary_body),
+        ("binary to rows", parse_binary, binary_body),
+    ):
+        seconds = timed(fn, body, args.repeat)
+        print(f"{name:24} {seconds * 1000:8.2f} ms/batch  {args.readings / seconds:12,.0f} readings/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark image preprocessing for the diagnosis model.
+
+Compares the original pipeline (full decode, resize, float64 scaling and
+``expand_dims``) with the draft-mode decode into the float32 batch buffer
+used by ``app.services.ml``, over synthetic JPEGs of common camera sizes.
+
+    python -m scripts.bench_preprocess --repeat 20
+"""
+
+import argparse
+import io
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from app.services import ml
+
+SIZES = [(640, 480), (1920, 1080), (3024, 4032), (4000, 3000)]
+
+
+def make_jpeg(size: tuple[int, int]) -> bytes:
+    rng = np.random.default_rng(0)
+    w, h = size
+    gradient = np.linspace(0, 255, w, dtype=np.uint8)[None, :, None]
+    noise = rng.integers(0, 64, (h, w, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(np.broadcast_to(gradient, (h, w, 3)) // 2 + noise).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def legacy(image_bytes: bytes) -> np.ndarray:
+    img = Image.open(io.BytesIO(image_bytes)).convert("RGB").resize(ml.IMG_SIZE)
+    return np.expand_dims(np.array(img) / 255.0, axis=0)
+
+
+def fast(image_bytes: bytes) -> np.ndarray:
+    return ml._collate([ml._preprocess(image_bytes)])
+
+
+def measure(fn, image_bytes: bytes, repeat: int) -> tuple[float, float]:
+    fn(image_bytes)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(image_bytes)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    tracemalloc.start()
+    fn(image_bytes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'size':>11} {'jpeg KB':>8} {'legacy ms':>10} {'fast ms':>8} {'legacy MB':>10} {'fast MB':>8}")
+    for size in SIZES:
+        data = make_jpeg(size)
+        legacy_ms, legacy_mb = measure(legacy, data, args.repeat)
+        fast_ms, fast_mb = measure(fast, data, args.repeat)
+        print(
+            f"{size[0]:>5}x{size[1]:<5} {len(data) / 1024:8.0f} {legacy_ms:10.1f} {fast_ms:8.1f} "
+            f"{legacy_mb:10.1f} {fast_mb:8.1f}"
+        )
+    print("MB columns are peak Python/NumPy allocations traced per image.")
+
+
+if __name__ == "__main__":
+    main()
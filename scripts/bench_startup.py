@@ -0,0 +1,85 @@
+"""Measure API import time and baseline memory per worker.
+
+Each scenario imports ``main`` in a fresh interpreter, optionally followed
+by a first use of the diagnosis and watering features, and reports wall
+time, peak RSS and which heavy dependencies ended up imported. Results can
+be saved with ``--save`` and compared against a previous run with
+``--compare``.
+
+    python -m scripts.bench_startup --save benchmarks/startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+HEAVY = ["tensorflow", "pandas", "sklearn", "joblib", "serial", "supabase", "PIL"]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+for feature in sys.argv[1:]:
+    if feature == "diagnosis":
+        from app.services import ml
+        ml.load_model()
+    elif feature == "prediction":
+        from app.services import watering
+        try:
+            watering.warm_up()
+        except Exception:
+            pass
+print(json.dumps({
+    "import_s": round(elapsed, 3),
+    "total_s": round(time.perf_counter() - start, 3),
+    "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY,)
+
+SCENARIOS = {
+    "import only": ({}, []),
+    "diagnosis disabled": ({"ENABLE_DIAGNOSIS": "false", "ENABLE_PREDICTION": "false"}, []),
+    "first diagnosis": ({}, ["diagnosis"]),
+    "first prediction": ({}, ["prediction"]),
+}
+
+
+def run(env: dict, features: list[str]) -> dict:
+    full_env = {**os.environ, "WARMUP_ON_STARTUP": "false", **env}
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, *features],
+        env=full_env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", type=Path, help="write results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="previous results to diff against")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else {}
+    results = {}
+    for name, (env, features) in SCENARIOS.items():
+        result = results[name] = run(env, features)
+        line = f"{name:20} import {result['import_s']:6.2f}s  total {result['total_s']:6.2f}s  rss {result['max_rss_mb']:7.1f} MB"
+        if name in baseline:
+            line += f"  (was {baseline[name]['total_s']:.2f}s, {baseline[name]['max_rss_mb']:.1f} MB)"
+        print(f"{line}  loaded: {', '.join(result['loaded']) or '-'}")
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Check accuracy parity, latency and memory of the diagnosis backends.
+
+Runs the same images through the Keras model and its quantized TFLite
+conversion, reports top-1 agreement and the largest probability difference,
+per-batch latency for each backend and peak RSS of a worker that only loads
+that backend. Exits non-zero when agreement drops below ``--min-agreement``.
+
+    python -m scripts.compare_backends --images samples/ --batch-sizes 1 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services import ml
+
+MEMORY_PROBE = """
+import json, resource
+from app.services import ml
+ml.warm_up()
+print(json.dumps(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+"""
+
+
+def load_images(directory: Path | None, samples: int) -> np.ndarray:
+    """Preprocess images from ``directory`` or make random ones."""
+    if directory is None:
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, (*ml.IMG_SIZE, 3), dtype=np.uint8) for _ in range(samples)]
+    else:
+        paths = sorted(p for p in directory.iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png"})
+        images = [ml._preprocess(p.read_bytes()) for p in paths[:samples]]
+    return np.stack(images).astype(np.float32) / 255
+
+
+def run_all(backend: ml.InferenceBackend, images: np.ndarray, batch_size: int) -> tuple[np.ndarray, float]:
+    outputs = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        outputs.append(backend.predict(images[i : i + batch_size]))
+    batches = -(-len(images) // batch_size)
+    return np.concatenate(outputs), (time.perf_counter() - start) * 1000 / batches
+
+
+def peak_rss(backend: str, tflite_path: Path) -> float:
+    env = {**os.environ, "ML_BACKEND": backend, "ML_TFLITE_PATH": str(tflite_path)}
+    out = subprocess.run([sys.executable, "-c", MEMORY_PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", type=Path, default=ml.MODEL_PATH)
+    parser.add_argument("--tflite", type=Path, help="existing TFLite artifact; converted if omitted")
+    parser.add_argument("--images", type=Path, help="directory of sample photos")
+    parser.add_argument("--samples", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, ml.MAX_BATCH_SIZE])
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    parser.add_argument("--skip-memory", action="store_true")
+    args = parser.parse_args()
+
+    tflite_path = args.tflite or Path(tempfile.mkdtemp()) / "model.tflite"
+    if not tflite_path.exists():
+        ml.convert_to_tflite(args.model, tflite_path)
+    print(f"keras {args.model.stat().st_size / 1e6:.1f} MB, tflite {tflite_path.stat().st_size / 1e6:.1f} MB")
+
+    images = load_images(args.images, args.samples)
+    keras = ml.KerasBackend(args.model)
+    tflite = ml.TFLiteBackend(tflite_path)
+
+    reference = None
+    for batch_size in args.batch_sizes:
+        keras_out, keras_ms = run_all(keras, images, batch_size)
+        tflite_out, tflite_ms = run_all(tflite, images, batch_size)
+        reference = (keras_out, tflite_out)
+        print(f"batch {batch_size:3}: keras {keras_ms:8.1f} ms/batch   tflite {tflite_ms:8.1f} ms/batch")
+
+    keras_out, tflite_out = reference
+    agreement = float(np.mean(keras_out.argmax(1) == tflite_out.argmax(1)))
+    print(f"top-1 agreement {agreement:.3f}, max |p diff| {np.abs(keras_out - tflite_out).max():.4f}")
+
+    if not args.skip_memory and args.model == ml.MODEL_PATH:
+        for name in ("keras", "tflite"):
+            print(f"peak RSS with {name} backend: {peak_rss(name, tflite_path):.0f} MB")
+
+    if agreement < args.min_agreement:
+        sys.exit(f"agreement {agreement:.3f} below {args.min_agreement}")
+
+
+if __name__ == "__main__":
+    main()
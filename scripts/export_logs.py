@@ -1,38 +1,228 @@
-"""Export logs from Supabase tables to CSV."""
+"""Export logs from the storage backend's tables to CSV or Parquet.
 
+Rows are fetched page by page in (timestamp, id) order and written as they
+arrive, so memory use does not grow with table size. With ``--incremental``
+only rows newer than the last exported one are fetched; the position of
+each table is kept in ``backup/checkpoints.json``. The tables are read
+from the backend selected by ``STORAGE_BACKEND``.
+
+    python -m scripts.export_logs --format csv.gz --incremental
+"""
+
+import argparse
 import csv
-import os
+import gzip
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterable, Iterator
 
-from dotenv import load_dotenv
-from supabase import create_client
+from app.utils import storage
 
-load_dotenv()
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+BACKUP_DIR = Path("backup")
+CHECKPOINT_FILE = BACKUP_DIR / "checkpoints.json"
 
-client = create_client(SUPABASE_URL, SUPABASE_KEY)
+TABLES = ["watering_logs", "sensor_logs", "diagnostic_logs"]
+FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+PAGE_SIZE = 1000
+ARROW_TYPES = {"text": "string", "double precision": "float64", "bigint": "int64", "boolean": "bool_", "jsonb": "string"}
+"""Arrow type for each Postgres type in ``storage.COLUMNS``; JSON is written as text."""
 
-BACKUP_DIR = Path("backup")
-BACKUP_DIR.mkdir(exist_ok=True)
+_checkpoint_lock = threading.Lock()
 
 
-def export_table(table: str, filename: str) -> None:
-    """Export a Supabase table to CSV."""
-    data = client.table(table).select("*").execute().data
-    if not data:
-        return
-    with open(BACKUP_DIR / filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=data[0].keys())
+def iter_pages(
+    table: str,
+    since: dict | None = None,
+    page_size: int = PAGE_SIZE,
+    backend: storage.StorageBackend | None = None,
+) -> Iterator[list[dict]]:
+    """Yield pages of rows ordered by (timestamp, id), after ``since`` if given."""
+    backend = backend or storage.get_backend()
+    last = since
+    while True:
+        page = backend.page_after(table, last, page_size)
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last = {"timestamp": page[-1]["timestamp"], "id": page[-1]["id"]}
+
+
+def iter_rows(pages: Iterable[list[dict]]) -> Iterator[dict]:
+    """Flatten pages into single rows."""
+    for page in pages:
+        yield from page
+
+
+def _fieldnames(first: dict, columns: Iterable[str]) -> list[str]:
+    """The table's known columns, then any other column of the first row.
+
+    Rows from the SQLite backend only carry the keys they were written
+    with, so the first row alone may miss columns.
+    """
+    names = ["id", "timestamp", *columns]
+    return names + [name for name in first if name not in names]
+
+
+def write_csv(rows: Iterator[dict], path: Path, compress: bool = False, columns: Iterable[str] = ()) -> dict | None:
+    """Write rows to CSV as they arrive and return the last one.
+
+    A row with a column outside ``columns`` and the first row's keys raises
+    ``ValueError`` instead of being written without it.
+    """
+    first = next(rows, None)
+    if first is None:
+        return None
+    last = first
+    opener = gzip.open if compress else open
+    with opener(path, "wt", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=_fieldnames(first, columns))
         writer.writeheader()
-        writer.writerows(data)
+        writer.writerow(first)
+        for last in rows:
+            writer.writerow(last)
+    return last
+
+
+def write_parquet(
+    rows: Iterator[dict], path: Path, row_group: int = PAGE_SIZE, types: dict[str, str] | None = None
+) -> dict | None:
+    """Write rows to Parquet one row group at a time and return the last one.
+
+    ``types`` maps known columns to their Postgres type and fixes their
+    Parquet type up front, so a column that is empty in the first row group
+    still takes values later. Other columns are typed from the first row
+    group, as text when they are empty there.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Parquet export")
+    writer = None
+    last = None
+    batch: list[dict] = []
+    try:
+        for last in rows:
+            batch.append(last)
+            if len(batch) >= row_group:
+                writer = _write_row_group(writer, batch, path, types or {})
+                batch = []
+        if batch:
+            writer = _write_row_group(writer, batch, path, types or {})
+    finally:
+        if writer is not None:
+            writer.close()
+    return last
+
+
+def _schema(batch: list[dict], types: dict[str, str]):
+    fields = {name: getattr(pa, ARROW_TYPES[sql_type])() for name, sql_type in types.items()}
+    for field in pa.Table.from_pylist(batch).schema:
+        if field.name not in fields:
+            fields[field.name] = pa.string() if pa.types.is_null(field.type) else field.type
+    names = _fieldnames(batch[0], types)
+    names += [name for name in fields if name not in names]
+    return pa.schema([(name, fields[name]) for name in names if name in fields])
+
+
+def _parquet_value(value, type_):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if value is not None and pa.types.is_string(type_) and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def _write_row_group(writer, batch: list[dict], path: Path, types: dict[str, str]):
+    if writer is None:
+        writer = pq.ParquetWriter(path, _schema(batch, types), compression="zstd")
+    schema = writer.schema
+    unknown = {name for row in batch for name in row} - set(schema.names)
+    if unknown:
+        raise ValueError(f"columns {sorted(unknown)} first appear after the first row group")
+    rows = [{f.name: _parquet_value(row.get(f.name), f.type) for f in schema} for row in batch]
+    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+    return writer
+
+
+def load_checkpoints() -> dict:
+    if CHECKPOINT_FILE.exists():
+        return json.loads(CHECKPOINT_FILE.read_text(encoding="utf-8"))
+    return {}
+
+
+def save_checkpoint(table: str, last: dict) -> None:
+    with _checkpoint_lock:
+        checkpoints = load_checkpoints()
+        checkpoints[table] = {"timestamp": last["timestamp"], "id": last["id"]}
+        tmp = CHECKPOINT_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(checkpoints, indent=2), encoding="utf-8")
+        tmp.replace(CHECKPOINT_FILE)
+
+
+def export_table(
+    table: str,
+    filename: str,
+    fmt: str = "csv",
+    since: dict | None = None,
+    page_size: int = PAGE_SIZE,
+    backend: storage.StorageBackend | None = None,
+) -> dict | None:
+    """Stream a table to a file and return the last exported row."""
+    rows = iter_rows(iter_pages(table, since, page_size, backend))
+    BACKUP_DIR.mkdir(exist_ok=True)
+    path = BACKUP_DIR / filename
+    columns = storage.COLUMNS.get(table, {})
+    if fmt == "parquet":
+        last = write_parquet(rows, path, page_size, columns)
+    else:
+        last = write_csv(rows, path, compress=fmt == "csv.gz", columns=columns)
+    return last
+
+
+def export(
+    table: str, fmt: str, incremental: bool, page_size: int, backend: storage.StorageBackend | None = None
+) -> None:
+    """Export one table, resuming from its checkpoint when incremental."""
+    since = load_checkpoints().get(table) if incremental else None
+    suffix = FORMATS[fmt]
+    if incremental:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        filename = f"{table}_{stamp}{suffix}"
+    else:
+        filename = f"{table}{suffix}"
+    last = export_table(table, filename, fmt, since, page_size, backend)
+    if last is None:
+        print(f"{table}: nothing to export")
+        return
+    save_checkpoint(table, last)
+    print(f"{table}: exported to {BACKUP_DIR / filename}")
 
 
 def main() -> None:
     """Export critical tables."""
-    export_table("watering_logs", "watering_logs.csv")
-    export_table("sensor_logs", "sensor_logs.csv")
+    parser = argparse.ArgumentParser(description="Export log tables.")
+    parser.add_argument("--tables", nargs="+", default=TABLES[:2], choices=TABLES)
+    parser.add_argument("--format", default="csv", choices=FORMATS)
+    parser.add_argument("--incremental", action="store_true", help="only rows after the last checkpoint")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+
+    with ThreadPoolExecutor(max_workers=len(args.tables)) as pool:
+        futures = [
+            pool.submit(export, table, args.format, args.incremental, args.page_size)
+            for table in args.tables
+        ]
+        for future in futures:
+            future.result()
 
 
 if __name__ == "__main__":
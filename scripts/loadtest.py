@@ -0,0 +1,289 @@
+"""Replay traffic mixes against the API in-process and report latency per route.
+
+The app runs on an ``httpx.ASGITransport`` with the SQLite storage backend
+standing in for Supabase and small stub models generated into a temporary
+directory, so no network access or trained artifacts are needed. Each mix
+weights ESP32 uploads, dashboard polling and bursts of predictions and
+photo diagnoses. Throughput and p50/p95/p99 latency are reported per route.
+
+Every run is checked against the committed baseline in
+``benchmarks/loadtest_baseline.json`` (or another file given with
+``--baseline``; ``--no-baseline`` skips the check) and exits non-zero when a
+route's p95 grows or the overall throughput drops by more than
+``--tolerance``. Absolute numbers depend on the machine, so refresh the
+baseline with ``--save`` when moving to other hardware or after an
+intended change:
+
+    python -m scripts.loadtest --mix mixed
+    python -m scripts.loadtest --mix mixed --requests 3000 --save benchmarks/loadtest_baseline.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+PLANT_TYPES = ["rosie", "busuioc", "ficus", "cactus"]
+CLASSES = ["healthy", "spots_mold", "wilting", "yellow_leaves"]
+BASELINE = Path(__file__).resolve().parents[1] / "benchmarks" / "loadtest_baseline.json"
+
+MIXES = {
+    "ingest": {"sensor-data": 90, "history": 5, "sensors": 5},
+    "dashboard": {"sensor-data": 30, "history": 35, "sensors": 30, "sensor-stats": 5},
+    "mixed": {"sensor-data": 60, "history": 12, "sensors": 12, "predict": 10, "diagnose": 6},
+    "burst": {"sensor-data": 20, "predict": 50, "diagnose": 30},
+}
+
+
+def stub_env(directory: Path) -> dict[str, str]:
+    """Environment that points the model loaders at the stub artifacts."""
+    return {
+        "ML_MODEL_PATH": str(directory / "diagnosis.keras"),
+        "ML_LABEL_MAP_PATH": str(directory / "label_map.json"),
+        "ML_BACKEND": "keras",
+        "WATERING_MODEL_PATH": str(directory / "rf.joblib"),
+        "PLANT_TYPE_ENCODER_PATH": str(directory / "encoder.joblib"),
+    }
+
+
+def make_stub_artifacts(directory: Path) -> None:
+    """Write tiny diagnosis and watering models into ``directory``."""
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import OneHotEncoder
+
+    from app.services import ml
+    from app.services.watering import NUMERIC_FEATURES
+
+    import keras
+
+    model = keras.Sequential(
+        [
+            keras.Input((*ml.IMG_SIZE, 3)),
+            keras.layers.AveragePooling2D(8),
+            keras.layers.Conv2D(4, 3, activation="relu"),
+            keras.layers.GlobalAveragePooling2D(),
+            keras.layers.Dense(len(CLASSES), activation="softmax"),
+        ]
+    )
+    model.save(directory / "diagnosis.keras")
+    (directory / "label_map.json").write_text(json.dumps({c: i for i, c in enumerate(CLASSES)}))
+
+    encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=False)
+    encoder.fit(pd.DataFrame({"plant_type": PLANT_TYPES}))
+    rng = np.random.default_rng(0)
+    features = np.hstack([rng.uniform(0, 100, (400, len(NUMERIC_FEATURES))), np.eye(len(PLANT_TYPES))[rng.integers(0, 4, 400)]])
+    targets = np.c_[rng.uniform(0, 300, 400), rng.uniform(0, 7, 400)]
+    joblib.dump(RandomForestRegressor(n_estimators=50, max_depth=8, random_state=0).fit(features, targets), directory / "rf.joblib")
+    joblib.dump(encoder, directory / "encoder.joblib")
+
+
+def make_photos(count: int) -> list[bytes]:
+    from PIL import Image
+
+    rng = np.random.default_rng(1)
+    photos = []
+    for _ in range(count):
+        buf = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)).save(buf, "JPEG", quality=85)
+        photos.append(buf.getvalue())
+    return photos
+
+
+class Traffic:
+    """Build requests for each route of a mix."""
+
+    def __init__(self, devices: int, api_key: str, photos: list[bytes]) -> None:
+        self.devices = [f"esp32-{i:03}" for i in range(devices)]
+        self.headers = {"x-api-key": api_key}
+        self.photos = photos
+
+    def request(self, route: str, device: str | None = None) -> tuple[str, str, dict]:
+        device = device or random.choice(self.devices)
+        if route == "sensor-data":
+            return "POST", "/api/sensor-data", {
+                "json": {
+                    "device_id": device,
+                    "plant_type": PLANT_TYPES[int(device[-3:]) % len(PLANT_TYPES)],
+                    "soil_moisture": round(random.uniform(10, 90), 1),
+                    "temperature": round(random.uniform(10, 35), 1),
+                    "air_humidity": round(random.uniform(20, 90), 1),
+                    "light": round(random.uniform(0, 4000)),
+                }
+            }
+        if route == "history":
+            return "GET", "/history", {"params": {"limit": 20}}
+        if route == "sensors":
+            return "GET", "/api/sensors", {"params": {"device_id": device}, "headers": self.headers}
+        if route == "sensor-stats":
+            return "GET", "/api/sensor-stats", {"params": {"device_id": device, "resolution": "minute"}}
+        if route == "predict":
+            return "POST", "/predict", {
+                "headers": self.headers,
+                "json": {
+                    "soil_moisture": random.uniform(10, 90),
+                    "temperature": random.uniform(10, 35),
+                    "air_humidity": random.uniform(20, 90),
+                    "light": random.uniform(0, 4000),
+                    "last_watered_days": random.uniform(0, 5),
+                    "ml_prediction_prev": random.uniform(0, 200),
+                    "plant_type": random.choice(PLANT_TYPES),
+                },
+            }
+        if route == "diagnose":
+            photo = random.choice(self.photos)
+            return "POST", "/api/diagnose-photo", {
+                "headers": self.headers,
+                "params": {"device_id": device},
+                "files": {"file": ("leaf.jpg", photo, "image/jpeg")},
+            }
+        raise ValueError(route)
+
+
+async def run_mix(app, traffic: Traffic, mix: dict[str, int], requests: int, concurrency: int) -> dict:
+    import httpx
+
+    routes, weights = list(mix), list(mix.values())
+    plan = iter(random.choices(routes, weights, k=requests))
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+
+        async def worker() -> None:
+            for route in plan:
+                method, url, kwargs = traffic.request(route)
+                start = time.perf_counter()
+                resp = await client.request(method, url, **kwargs)
+                latencies[route].append((time.perf_counter() - start) * 1000)
+                if resp.status_code >= 400:
+                    errors[route] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    report = {"requests": requests, "elapsed_s": round(elapsed, 3), "rps": round(requests / elapsed, 1), "routes": {}}
+    for route, values in sorted(latencies.items()):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        report["routes"][route] = {
+            "count": len(values),
+            "errors": errors[route],
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+        }
+    return report
+
+
+async def seed(app, traffic: Traffic) -> None:
+    """Post one reading per device so dashboard routes find data."""
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest") as client:
+        for device in traffic.devices:
+            method, url, kwargs = traffic.request("sensor-data", device)
+            (await client.request(method, url, **kwargs)).raise_for_status()
+
+
+async def run(args) -> dict:
+    import main
+    from app.utils.security import API_SECRET
+
+    traffic = Traffic(args.devices, API_SECRET, make_photos(8))
+    async with main.app.router.lifespan_context(main.app):
+        await seed(main.app, traffic)
+        if args.warmup:
+            await run_mix(main.app, traffic, MIXES[args.mix], args.warmup, args.concurrency)
+        return await run_mix(main.app, traffic, MIXES[args.mix], args.requests, args.concurrency)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every regression beyond ``tolerance``."""
+    failures = []
+    if report["rps"] < baseline["rps"] * (1 - tolerance):
+        failures.append(f"throughput {report['rps']} req/s < baseline {baseline['rps']} req/s")
+    for route, stats in report["routes"].items():
+        old = baseline["routes"].get(route)
+        if old and stats["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            failures.append(f"{route}: p95 {stats['p95_ms']} ms > baseline {old['p95_ms']} ms")
+        if stats["errors"]:
+            failures.append(f"{route}: {stats['errors']} error responses")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--warmup", type=int, default=100, help="requests sent before measuring")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, help="write the report to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help="report to compare against")
+    parser.add_argument("--no-baseline", action="store_true", help="do not compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    baseline = None
+    if not args.no_baseline:
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text()).get(args.mix)
+            if baseline is None and not args.save:
+                sys.exit(f"no baseline for mix {args.mix} in {args.baseline}; record one with --save")
+        elif args.baseline != BASELINE:
+            sys.exit(f"baseline {args.baseline} not found")
+
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    env = {
+        "STORAGE_BACKEND": "sqlite",
+        "STORAGE_DB_PATH": str(workdir / "loadtest.db"),
+        "SUPABASE_URL": "",
+        "COMMAND_BACKEND": "memory",
+        "WARMUP_ON_STARTUP": "true",
+        "ENABLE_DIAGNOSIS": "true",
+        "ENABLE_PREDICTION": "true",
+        **stub_env(workdir),
+    }
+    # Settings are read at import time, so the environment has to be in
+    # place before any app module is imported.
+    os.environ.update(env)
+    make_stub_artifacts(workdir)
+    report = asyncio.run(run(args))
+    report["mix"] = args.mix
+
+    print(f"mix {args.mix}: {report['requests']} requests in {report['elapsed_s']}s -> {report['rps']} req/s")
+    for route, stats in report["routes"].items():
+        print(
+            f"  {route:13} n={stats['count']:5}  err={stats['errors']:3}  {stats['rps']:8.1f} req/s"
+            f"  p50 {stats['p50_ms']:8.2f}  p95 {stats['p95_ms']:8.2f}  p99 {stats['p99_ms']:8.2f} ms"
+        )
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        saved = json.loads(args.save.read_text()) if args.save.exists() else {}
+        saved[args.mix] = report
+        args.save.write_text(json.dumps(saved, indent=2))
+
+    if baseline is not None:
+        failures = compare(report, baseline, args.tolerance)
+        if failures:
+            sys.exit("regressions:\n  " + "\n  ".join(failures))
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
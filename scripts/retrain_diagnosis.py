@@ -0,0 +1,39 @@
+"""Retrain the diagnosis model from user feedback and publish a new version.
+
+Feedback-labeled diagnostic logs are read page by page from the configured
+storage backend; only images not embedded by an earlier run are processed.
+A new version is published under ``ML_MODEL_DIR`` when it matches or beats
+the served model on held-out images, and running workers switch to it
+within ``ML_RELOAD_INTERVAL`` seconds. Run it from cron or by hand:
+
+    python -m scripts.retrain_diagnosis --dry-run
+    python -m scripts.retrain_diagnosis --epochs 50
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from app.ml import retrain
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--min-class-examples", type=int, default=retrain.MIN_CLASS_EXAMPLES)
+    parser.add_argument("--dry-run", action="store_true", help="train and evaluate without publishing")
+    parser.add_argument("--force", action="store_true", help="publish even without a held-out improvement")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    report = retrain.retrain(
+        epochs=args.epochs, min_examples=args.min_class_examples, force=args.force, dry_run=args.dry_run
+    )
+    print(json.dumps(report, indent=2))
+    if report["published"] is None and not args.dry_run and report.get("reason") != "no labeled images":
+        sys.exit(f"not published: {report['reason']}")
+
+
+if __name__ == "__main__":
+    main()
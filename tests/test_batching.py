@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from app.services.batching import MicroBatcher
+
+
+def test_concurrent_inputs_share_a_forward_pass():
+    calls = []
+
+    def double(batch):
+        calls.append(len(batch))
+        return batch * 2
+
+    batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(np.full(3, i, dtype=float)) for i in range(6)]
+    results = [f.result(timeout=5) for f in futures]
+    batcher.stop()
+
+    assert [r[0] for r in results] == [0, 2, 4, 6, 8, 10]
+    assert sum(calls) == 6
+    assert max(calls) == 4
+    assert batcher.stats()["items"] == 6
+
+
+def test_errors_reach_every_caller():
+    def fail(batch):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(fail, max_batch_size=2, max_wait_ms=50)
+    futures = [batcher.submit(np.zeros(1)) for _ in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    batcher.stop()
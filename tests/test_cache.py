@@ -0,0 +1,79 @@
+from app.services.cache import RecentRows
+
+
+def _table(n):
+    return [{"id": i} for i in range(n, 0, -1)]
+
+
+def test_reads_are_served_from_buffer_after_priming():
+    loads = []
+
+    def loader(limit):
+        loads.append(limit)
+        return _table(10)[:limit]
+
+    rows = RecentRows("t", capacity=5, loader=loader)
+    assert rows.get(2) == [{"id": 10}, {"id": 9}]
+    assert rows.get(5) == _table(10)[:5]
+    assert loads == [5]
+    assert rows.get(8) == _table(10)[:8]
+    assert loads == [5, 8]
+    assert rows.stats()["hits"] == 1
+
+
+def test_ingested_rows_keep_buffer_current():
+    rows = RecentRows("t", capacity=3, loader=lambda limit: _table(2))
+    rows.get(1)
+    rows.add([{"id": 3}, {"id": 4}])
+    assert rows.read(10) is None
+    assert rows.read(3) == [{"id": 4}, {"id": 3}, {"id": 2}]
+    rows.update({"id": 3, "user_feedback": "ok"})
+    assert rows.read(2)[1]["user_feedback"] == "ok"
+
+
+def test_expired_buffer_misses():
+    rows = RecentRows("t", capacity=3, ttl=0, loader=lambda limit: _table(3))
+    rows.get(1)
+    assert rows.read(1) is None
+
+
+def test_result_cache_dedupes_concurrent_and_repeated_calls():
+    import asyncio
+
+    from app.services.cache import ResultCache
+
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "healthy"
+
+    async def run():
+        results = ResultCache(capacity=2)
+        first = await asyncio.gather(*(results.get_or_compute("img", compute) for _ in range(3)))
+        again = await results.get_or_compute("img", compute)
+        return results, first, again
+
+    results, first, again = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(cached for _, cached in first) == [False, True, True]
+    assert again == ("healthy", True)
+    assert results.stats()["hits"] == 1
+    assert results.stats()["coalesced"] == 2
+
+
+def test_result_is_stored_under_the_key_of_its_value():
+    import asyncio
+
+    from app.services.cache import ResultCache
+
+    async def compute():
+        return ("healthy", "v2")
+
+    async def run():
+        results = ResultCache(capacity=2)
+        await results.get_or_compute("v1:img", compute, key_of=lambda value: f"{value[1]}:img")
+        return await results.get_or_compute("v2:img", compute), "v1:img" in results._items
+
+    assert asyncio.run(run()) == ((("healthy", "v2"), True), False)
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.services.commands import CommandQueue, MemoryCommandBackend, SQLiteCommandBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteCommandBackend(str(tmp_path / "commands.db"))
+    return MemoryCommandBackend()
+
+
+def test_enqueue_and_ack_are_idempotent(backend):
+    first = backend.enqueue("esp", "water", command_id="c1")
+    again = backend.enqueue("esp", "water", command_id="c1")
+    assert first["id"] == again["id"] == "c1"
+    assert len(backend.pending("esp")) == 1
+    assert backend.pending("other") == []
+
+    acked = backend.ack("esp", "c1")
+    assert acked["acked_at"] is not None
+    assert backend.ack("esp", "c1")["acked_at"] == acked["acked_at"]
+    assert backend.pending("esp") == []
+
+
+def test_waiting_device_is_woken_by_new_command():
+    queue = CommandQueue(MemoryCommandBackend())
+
+    async def run():
+        waiter = asyncio.create_task(queue.wait("esp", timeout=5))
+        await asyncio.sleep(0.01)
+        await queue.enqueue("esp", "water")
+        return await asyncio.wait_for(waiter, 1)
+
+    commands = asyncio.run(run())
+    assert [c["type"] for c in commands] == ["water"]
+
+
+def test_command_queued_during_pending_query_wakes_waiter():
+    queue = CommandQueue(MemoryCommandBackend())
+    query = queue.pending
+
+    async def pending(device_id):
+        commands = await query(device_id)
+        if not commands and not queue.backend.pending(device_id):
+            await queue.enqueue(device_id, "water")
+        return commands
+
+    queue.pending = pending
+
+    async def run():
+        return await asyncio.wait_for(queue.wait("esp", timeout=5), 1)
+
+    commands = asyncio.run(run())
+    assert [c["type"] for c in commands] == ["water"]
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    from app.services.commands import CommandBackend
+
+    class NoAck(CommandBackend):
+        def enqueue(self, device_id, type, payload=None, command_id=None):
+            return {}
+
+        def pending(self, device_id):
+            return []
+
+    with pytest.raises(TypeError):
+        NoAck()
@@ -0,0 +1,99 @@
+import math
+import os
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from app.services import deadband, ingest, quality, rollups, state
+from app.utils import storage
+from main import app
+
+client = TestClient(app)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def test_delta_report_is_completed_from_latest_reading(monkeypatch):
+    stored = []
+    monkeypatch.setattr(ingest.sensor_buffer, "_insert", stored.extend)
+    monkeypatch.setattr(state, "latest", state.LatestStateIndex())
+    monkeypatch.setattr(quality, "reading_filter", quality.ReadingFilter())
+
+    full = {"device_id": "db1", "plant_type": "rosie", "soil_moisture": 70, "temperature": 21.0, "air_humidity": 50, "light": 900}
+    first = client.post("/api/sensor-data", json=full).json()
+    assert first["reporting"]["heartbeat_s"] == deadband.HEARTBEAT_S
+    client.post("/api/sensor-data", json={"device_id": "db1", "delta": True, "temperature": 24.0})
+
+    assert len(stored) == 2
+    assert stored[1]["temperature"] == 24.0
+    assert stored[1]["soil_moisture"] == 70 and stored[1]["plant_type"] == "rosie"
+
+
+def test_delta_report_after_restart_is_completed_from_storage(tmp_path, monkeypatch):
+    db = storage.SQLiteStorage(str(tmp_path / "local.db"))
+    db.insert("sensor_logs", [{"timestamp": _iso(1_700_000_000), "device_id": "db2", "plant_type": "ficus", "soil_moisture": 55, "light": 800}])
+    monkeypatch.setattr(storage, "_backend", db)
+    stored = []
+    monkeypatch.setattr(ingest.sensor_buffer, "_insert", stored.extend)
+    monkeypatch.setattr(state, "latest", state.LatestStateIndex())
+
+    client.post("/api/sensor-data", json={"device_id": "db2", "delta": True, "light": 1200})
+    assert stored[0]["light"] == 1200
+    assert stored[0]["soil_moisture"] == 55 and stored[0]["plant_type"] == "ficus"
+
+
+def test_reporting_overrides_and_tighter_soil_band_near_threshold():
+    config = deadband.ReportingConfig()
+    config.set("x", thresholds={"light": 50, "bogus": 1}, heartbeat_s=300)
+    params = config.params("x", soil_moisture=33, soil_threshold=35)
+    assert params["thresholds"]["light"] == 50 and "bogus" not in params["thresholds"]
+    assert params["thresholds"]["soil_moisture"] == deadband.THRESHOLDS["soil_moisture"] / 2
+    assert params["heartbeat_s"] == 300
+    assert config.params("y")["heartbeat_s"] == deadband.HEARTBEAT_S
+
+
+def test_reporting_overrides_are_shared_through_the_file(tmp_path):
+    path = tmp_path / "overrides.json"
+    deadband.ReportingConfig(path).set("x", heartbeat_s=300)
+    other = deadband.ReportingConfig(path)
+    assert other.params("x")["heartbeat_s"] == 300
+    other.set("x", sample_s=10)
+    params = deadband.ReportingConfig(path).params("x")
+    assert params["heartbeat_s"] == 300 and params["sample_s"] == 10
+
+
+def test_series_holds_values_until_next_report_and_marks_gaps(monkeypatch):
+    t0 = 1_700_000_000
+    rows = [
+        {"timestamp": _iso(t0), "soil_moisture": 40.0, "temperature": 20.0},
+        {"timestamp": _iso(t0 + 300), "soil_moisture": 36.0, "temperature": None},
+    ]
+    monkeypatch.setattr(rollups, "fetch_raw", lambda device, start, end: rows)
+    heartbeat = deadband.reporting.params("s1")["heartbeat_s"]
+    end = t0 + 300 + deadband.STALE_FACTOR * heartbeat + 120
+
+    resp = client.get("/api/sensor-series", params={"device_id": "s1", "start": _iso(t0 - 60), "end": _iso(end), "step": 60})
+    body = resp.json()
+    soil = body["soil_moisture"]
+    assert soil[0] is None
+    assert soil[1:6] == [40.0] * 5 and soil[6] == 36.0
+    assert body["temperature"][6] is None
+    assert soil[-1] is None
+
+    series = deadband.reconstruct([], t0, t0 + 600, 60)
+    assert all(math.isnan(v) for v in series["light"])
+    assert client.get("/api/sensor-series", params={"start": _iso(t0), "end": _iso(t0), "step": 60}).status_code == 400
+
+
+def test_corrupt_overrides_file_keeps_last_good_values(tmp_path, caplog):
+    path = tmp_path / "overrides.json"
+    config = deadband.ReportingConfig(path)
+    config.set("x", heartbeat_s=300)
+    path.write_text('{"x": {"heartbeat_s": ')
+    os.utime(path, ns=(0, 1))
+
+    assert config.params("x")["heartbeat_s"] == 300
+    assert deadband.ReportingConfig(path).params("x")["heartbeat_s"] == deadband.HEARTBEAT_S
+    assert "reporting overrides" in caplog.text
@@ -0,0 +1,73 @@
+import time
+
+from app.services import decision
+from utils.symptom_action_map import SYMPTOM_ACTION_MAP
+
+
+def _wait_idle(engine, device):
+    deadline = time.time() + 5
+    while engine.device(device).refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_thresholds_come_from_plant_info():
+    engine = decision.DecisionEngine(predict=lambda req: (100.0, 2.0))
+    assert engine.bounds("rosie") == (60.0, 80.0)
+    assert engine.bounds("Roșie") == (60.0, 80.0)
+    assert engine.bounds("unknown-plant") == (decision.DEFAULT_THRESHOLD, None)
+
+    assert engine.decide({"device_id": "a", "plant_type": "rosie", "soil_moisture": 55})["water_now"]
+    assert not engine.decide({"device_id": "b", "plant_type": "cactus", "soil_moisture": 55})["water_now"]
+    assert not engine.decide({"device_id": "c", "soil_moisture": 40})["water_now"]
+
+
+def test_model_runs_only_on_meaningful_changes(monkeypatch):
+    monkeypatch.setattr(decision, "PREDICTION_ENABLED", True)
+    calls = []
+    engine = decision.DecisionEngine(predict=lambda req: calls.append(req) or (120.0, 2.0))
+    row = {"device_id": "a", "plant_type": "ficus", "soil_moisture": 50, "temperature": 20, "air_humidity": 40, "light": 300}
+
+    engine.decide(row)
+    _wait_idle(engine, "a")
+    engine.decide({**row, "soil_moisture": 51})
+    _wait_idle(engine, "a")
+    assert len(calls) == 1
+    assert engine.decide({**row, "soil_moisture": 45})["water_ml"] == 120.0
+    _wait_idle(engine, "a")
+    assert len(calls) == 2
+
+
+def test_diagnosis_adjusts_decisions():
+    engine = decision.DecisionEngine(predict=lambda req: (100.0, 2.0))
+    row = {"device_id": "a", "plant_type": "ficus", "soil_moisture": 30}
+    assert engine.decide(row)["water_now"]
+
+    engine.apply_diagnosis("a", "spots_mold", SYMPTOM_ACTION_MAP["spots_mold"])
+    held = engine.decide(row)
+    assert not held["water_now"] and "spots_mold" in held["reason"]
+    assert engine.decide({**row, "soil_moisture": 15})["water_now"]
+
+    engine.apply_diagnosis("a", "wilting", SYMPTOM_ACTION_MAP["wilting"])
+    assert engine.decide({**row, "soil_moisture": 50})["water_now"]
+    engine.apply_diagnosis("a", "healthy", SYMPTOM_ACTION_MAP["healthy"])
+    assert not engine.decide({**row, "soil_moisture": 50})["water_now"]
+
+
+def test_failed_prediction_is_retried_on_next_reading(monkeypatch):
+    monkeypatch.setattr(decision, "PREDICTION_ENABLED", True)
+    results = [RuntimeError("model busy"), (90.0, 1.0)]
+
+    def predict(req):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    engine = decision.DecisionEngine(predict=predict)
+    row = {"device_id": "r", "plant_type": "ficus", "soil_moisture": 50, "temperature": 20, "air_humidity": 40, "light": 300}
+    engine.decide(row)
+    _wait_idle(engine, "r")
+    assert engine.stats()["model_errors"] == 1
+    engine.decide(row)
+    _wait_idle(engine, "r")
+    assert engine.decide(row)["water_ml"] == 90.0
@@ -0,0 +1,91 @@
+import csv
+import gzip
+
+import pytest
+
+from app.utils.storage import SQLiteStorage
+from scripts import export_logs
+
+
+def _db(tmp_path, rows=7):
+    db = SQLiteStorage(str(tmp_path / "local.db"))
+    # Pairs of rows share a timestamp so paging has to break ties by id.
+    db.insert(
+        "sensor_logs",
+        [{"timestamp": f"2026-01-01T00:0{i // 2}:00+00:00", "device_id": "a", "soil_moisture": i} for i in range(rows)],
+    )
+    return db
+
+
+@pytest.fixture
+def backup(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_logs, "BACKUP_DIR", tmp_path / "backup")
+    monkeypatch.setattr(export_logs, "CHECKPOINT_FILE", tmp_path / "backup" / "checkpoints.json")
+    return tmp_path / "backup"
+
+
+def test_keyset_pages_cover_every_row_once(tmp_path):
+    db = _db(tmp_path)
+    pages = list(export_logs.iter_pages("sensor_logs", page_size=3, backend=db))
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [row["soil_moisture"] for page in pages for row in page] == list(range(7))
+
+    since = {"timestamp": pages[0][-1]["timestamp"], "id": pages[0][-1]["id"]}
+    rest = export_logs.iter_rows(export_logs.iter_pages("sensor_logs", since, 3, db))
+    assert [row["soil_moisture"] for row in rest] == [3, 4, 5, 6]
+
+
+def test_checkpoint_resumes_after_last_exported_row(tmp_path, backup):
+    db = _db(tmp_path, rows=4)
+    last = export_logs.export_table("sensor_logs", "first.csv", page_size=3, backend=db)
+    export_logs.save_checkpoint("sensor_logs", last)
+    db.insert("sensor_logs", [{"timestamp": "2026-01-01T00:05:00+00:00", "device_id": "a", "soil_moisture": 9}])
+
+    since = export_logs.load_checkpoints()["sensor_logs"]
+    assert since == {"timestamp": last["timestamp"], "id": last["id"]}
+    last = export_logs.export_table("sensor_logs", "second.csv", since=since, page_size=3, backend=db)
+    with open(backup / "second.csv", newline="") as f:
+        assert [row["soil_moisture"] for row in csv.DictReader(f)] == ["9"]
+    export_logs.save_checkpoint("sensor_logs", last)
+    since = export_logs.load_checkpoints()["sensor_logs"]
+    assert export_logs.export_table("sensor_logs", "empty.csv", since=since, backend=db) is None
+
+
+@pytest.mark.parametrize("fmt", ["csv", "csv.gz", "parquet"])
+def test_writers_round_trip(tmp_path, backup, fmt):
+    if fmt == "parquet":
+        pq = pytest.importorskip("pyarrow.parquet")
+    db = _db(tmp_path)
+    filename = "sensor_logs" + export_logs.FORMATS[fmt]
+    last = export_logs.export_table("sensor_logs", filename, fmt, page_size=3, backend=db)
+    assert last["soil_moisture"] == 6
+
+    path = backup / filename
+    if fmt == "parquet":
+        values = pq.read_table(path).column("soil_moisture").to_pylist()
+    else:
+        opener = gzip.open if fmt == "csv.gz" else open
+        with opener(path, "rt", newline="") as f:
+            values = [int(row["soil_moisture"]) for row in csv.DictReader(f)]
+    assert values == list(range(7))
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_sparse_nullable_columns_are_kept(tmp_path, backup, fmt):
+    if fmt == "parquet":
+        pq = pytest.importorskip("pyarrow.parquet")
+    db = SQLiteStorage(str(tmp_path / "local.db"))
+    rows = [{"timestamp": f"2026-01-01T00:00:0{i}+00:00", "predicted_class": "healthy"} for i in range(3)]
+    rows[1]["user_feedback"] = None
+    rows.append({"timestamp": "2026-01-01T00:00:05+00:00", "user_feedback": "ok", "image_hash": "ab", "confidence": 1})
+    db.insert("diagnostic_logs", rows)
+
+    filename = "diagnostic_logs" + export_logs.FORMATS[fmt]
+    export_logs.export_table("diagnostic_logs", filename, fmt, page_size=3, backend=db)
+    if fmt == "parquet":
+        exported = pq.read_table(backup / filename).to_pylist()
+    else:
+        with open(backup / filename, newline="") as f:
+            exported = list(csv.DictReader(f))
+    assert [row["user_feedback"] or None for row in exported] == [None, None, None, "ok"]
+    assert exported[-1]["image_hash"] == "ab"
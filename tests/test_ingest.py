@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from app.services.ingest import BufferFullError, WriteBehindBuffer
+
+
+def test_rows_are_coalesced_into_batches():
+    batches = []
+
+    async def run():
+        buf = WriteBehindBuffer("t", insert=batches.append, batch_size=3, flush_interval=10)
+        buf.start()
+        for i in range(7):
+            await buf.put([{"i": i}])
+        await buf.stop()
+        return buf
+
+    buf = asyncio.run(run())
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert buf.stats()["flushed_rows"] == 7
+    assert buf.stats()["queue_depth"] == 0
+
+
+def test_full_queue_rejects_after_timeout():
+    async def run():
+        buf = WriteBehindBuffer("t", insert=lambda rows: None, batch_size=100, flush_interval=10, max_queue=2, put_timeout=0.01)
+        buf.start()
+        await buf.put([{"i": 1}, {"i": 2}])
+        with pytest.raises(BufferFullError):
+            await buf.put([{"i": 3}])
+        await buf.stop()
+        return buf
+
+    assert asyncio.run(run()).rejected_rows == 1
+
+
+def test_write_through_when_not_started():
+    batches = []
+    buf = WriteBehindBuffer("t", insert=batches.append)
+    asyncio.run(buf.put([{"i": 1}]))
+    assert batches == [[{"i": 1}]]
@@ -0,0 +1,51 @@
+import json
+import os
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.utils import metrics
+from main import app
+
+client = TestClient(app)
+
+
+def _value(text, line_prefix):
+    return sum(float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(line_prefix))
+
+
+def test_thread_shards_are_summed():
+    def work():
+        for _ in range(1000):
+            metrics.inc("test_shard_total", kind="a")
+            with metrics.timer("test.op"):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    text = metrics.render([metrics.snapshot()])
+    assert _value(text, 'test_shard_total{kind="a"}') == 4000
+    assert _value(text, 'smartplant_operation_duration_seconds_count{op="test.op"}') == 4000
+
+
+def test_metrics_endpoint_reports_route_templates():
+    client.get("/api/plant-info?plant_type=nope")
+    body = client.get("/metrics").text
+    assert 'smartplant_http_requests_total{method="GET",route="/api/plant-info",status="404"}' in body
+    assert 'smartplant_http_request_duration_seconds_bucket{route="/api/plant-info",le="+Inf"}' in body
+
+
+def test_snapshots_from_workers_are_aggregated(tmp_path):
+    other = {"counters": [["smartplant_http_requests_total", [["route", "/x"]], 5]], "histograms": []}
+    (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(other))
+    (tmp_path / "999999999.json").write_text(json.dumps(other))
+    metrics.inc("smartplant_http_requests_total", route="/x")
+
+    text = metrics.render(metrics.collect(str(tmp_path)))
+
+    assert _value(text, 'smartplant_http_requests_total{route="/x"}') >= 6
+    assert not (tmp_path / "999999999.json").exists()
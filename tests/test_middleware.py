@@ -0,0 +1,63 @@
+import json
+import logging
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.utils.logging_config import JsonFormatter
+from app.utils.middleware import RequestLoggerMiddleware
+
+
+def _app(**kwargs):
+    app = FastAPI()
+    app.add_middleware(RequestLoggerMiddleware, **kwargs)
+
+    @app.post("/api/sensor-data")
+    def ingest(ok: bool = True):
+        if not ok:
+            raise HTTPException(status_code=503)
+        return {}
+
+    @app.get("/other")
+    def other():
+        return {}
+
+    return TestClient(app)
+
+
+def test_requests_are_logged_with_sampling(caplog):
+    client = _app(sampled_paths=("/api/sensor-data",), sample_rate=0.0)
+    with caplog.at_level(logging.INFO, logger="smartplant.requests"):
+        client.post("/api/sensor-data")
+        client.post("/api/sensor-data?ok=false")
+        client.get("/other")
+
+    fields = [r.fields for r in caplog.records if r.name == "smartplant.requests"]
+    assert [(f["path"], f["status"]) for f in fields] == [("/api/sensor-data", 503), ("/other", 200)]
+    assert all(f["duration_ms"] >= 0 for f in fields)
+
+
+def test_json_formatter_merges_fields():
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "GET %s", ("/",), None)
+    record.fields = {"status": 200}
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "GET /" and entry["status"] == 200 and entry["level"] == "INFO"
+
+
+def test_queued_exceptions_keep_their_traceback_field():
+    import queue
+
+    from app.utils.logging_config import StructuredQueueHandler
+
+    records = queue.SimpleQueue()
+    logger = logging.getLogger("smartplant.test-queue")
+    logger.propagate = False
+    logger.addHandler(StructuredQueueHandler(records))
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("failed for %s", "esp32-1")
+
+    entry = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert entry["message"] == "failed for esp32-1"
+    assert "ZeroDivisionError" in entry["exc"]
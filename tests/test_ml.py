@@ -0,0 +1,98 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services import ml
+
+
+def _jpeg(size):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (255, 128, 0)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def test_preprocess_yields_model_sized_batch():
+    image = ml._preprocess(_jpeg((1600, 1200)))
+    assert image.shape == (*ml.IMG_SIZE, 3)
+    assert image.dtype == np.uint8
+
+    batch = ml._collate([image, image])
+    assert batch.shape == (2, *ml.IMG_SIZE, 3)
+    assert batch.dtype == np.float32
+    assert np.isclose(batch[0, 0, 0, 0], 1.0, atol=0.02)
+
+
+def test_oversized_upload_is_rejected(monkeypatch):
+    monkeypatch.setattr(ml, "MAX_IMAGE_BYTES", 10)
+    with pytest.raises(ml.ImageTooLargeError):
+        ml._preprocess(_jpeg((32, 32)))
+
+
+def test_tflite_backend_matches_keras(tmp_path):
+    import tensorflow as tf
+
+    model = tf.keras.Sequential(
+        [
+            tf.keras.Input((*ml.IMG_SIZE, 3)),
+            tf.keras.layers.Conv2D(4, 3, strides=8, activation="relu"),
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(4, activation="softmax"),
+        ]
+    )
+    keras_path = tmp_path / "model.keras"
+    model.save(keras_path)
+    tflite_path = ml.convert_to_tflite(keras_path, tmp_path / "model.tflite")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model.keras", "model.tflite"]
+
+    batch = np.random.default_rng(0).random((3, *ml.IMG_SIZE, 3), dtype=np.float32)
+    expected = ml.KerasBackend(keras_path).predict(batch)
+    got = ml.TFLiteBackend(tflite_path).predict(batch)
+    assert got.shape == expected.shape
+    assert np.abs(got - expected).max() < 0.05
+
+
+
+def test_prediction_is_labelled_by_the_model_that_ran(monkeypatch):
+    import asyncio
+    import time
+
+    class Fixed(ml.InferenceBackend):
+        def __init__(self, version):
+            self.version = version
+
+        def predict(self, batch):
+            return np.tile([0.9, 0.1], (len(batch), 1))
+
+    monkeypatch.setattr(ml, "_backend", Fixed("old"))
+    monkeypatch.setattr(ml, "_index_to_class", {0: "healthy", 1: "wilting"})
+    monkeypatch.setattr(ml, "_last_check", time.monotonic())
+    preprocess = ml._preprocess
+
+    def swap_after_decoding(image_bytes):
+        # A retrained model with the same classes in another order is
+        # swapped in after the request started but before its batch runs.
+        image = preprocess(image_bytes)
+        monkeypatch.setattr(ml, "_backend", Fixed("new"))
+        monkeypatch.setattr(ml, "_index_to_class", {0: "wilting", 1: "healthy"})
+        return image
+
+    monkeypatch.setattr(ml, "_preprocess", swap_after_decoding)
+    predicted_class, confidence, _, version = asyncio.run(ml.predict_async(_jpeg((64, 64))))
+    assert (predicted_class, version) == ("wilting", "new")
+    assert np.isclose(confidence, 0.9)
+
+
+def test_concurrent_saves_of_one_image_leave_a_single_file(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(ml, "IMAGE_DIR", tmp_path)
+    monkeypatch.setattr(ml, "SAVE_IMAGES", True)
+    photo = _jpeg((640, 480))
+    digest = ml.image_hash(photo)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: ml.save_image(photo, digest), range(32)))
+
+    assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == [f"{digest}.img"]
+    assert (tmp_path / digest[:2] / f"{digest}.img").read_bytes() == photo
@@ -27,3 +27,12 @@ def test_predict_fallback():
 def test_sensors_no_key():
     resp = client.get("/api/sensors")
     assert resp.status_code == 422
+
+
+def test_plant_info_alias_and_etag():
+    resp = client.get("/api/plant-info?plant_type=Solanum lycopersicum")
+    assert resp.status_code == 200
+    assert resp.json()["name"] == "Roșie"
+    etag = resp.headers["etag"]
+    resp = client.get("/api/plant-info?plant_type=rosie", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.quality import ReadingFilter
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _row(minute, soil=40.0, temperature=21.0, humidity=50.0, light=800.0, device="a"):
+    return {
+        "device_id": device,
+        "timestamp": (START + timedelta(minutes=minute)).isoformat(),
+        "soil_moisture": soil,
+        "temperature": temperature,
+        "air_humidity": humidity,
+        "light": light,
+    }
+
+
+def test_duplicates_within_window_are_dropped():
+    f = ReadingFilter()
+    first = _row(0)
+    retry = {**first, "timestamp": (START + timedelta(seconds=10)).isoformat(), "soil_moisture": 40.2}
+    kept = f.process([first, first, retry, _row(0, device="b"), _row(1)])
+    assert [(r["device_id"], r["timestamp"]) for r in kept] == [
+        ("a", first["timestamp"]),
+        ("b", first["timestamp"]),
+        ("a", _row(1)["timestamp"]),
+    ]
+    assert f.stats()["duplicates"] == 2
+
+
+def test_broken_values_are_blanked_and_empty_rows_dropped():
+    f = ReadingFilter()
+    (row,) = f.process([_row(0, temperature=float("nan"), humidity=-999, soil=140)])
+    assert row["temperature"] is None and row["air_humidity"] is None and row["soil_moisture"] is None
+    assert row["light"] == 800.0
+    assert f.process([_row(1, soil=None, temperature=None, humidity=None, light=-5)]) == []
+    assert f.stats()["invalid_values"] == 4 and f.stats()["dropped"] == 1
+
+
+def test_spikes_are_rejected_until_the_level_persists():
+    f = ReadingFilter()
+    f.process([_row(i, soil=40 + (i % 3)) for i in range(8)])
+    (spike,) = f.process([_row(8, soil=95)])
+    assert spike["soil_moisture"] is None and spike["temperature"] == 21.0
+
+    shifted = f.process([_row(9 + i, soil=80 + (i % 2)) for i in range(10)])
+    assert shifted[-1]["soil_moisture"] is not None
+    assert f.smoothed("a")["soil_moisture"] > 60
@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.ml import retrain
+from app.services import ml
+from app.utils.storage import SQLiteStorage
+
+COLORS = {"healthy": (40, 160, 40), "wilting": (140, 110, 40), "root_rot": (60, 30, 20)}
+
+
+def _photo(color, seed):
+    rng = np.random.default_rng(seed)
+    pixels = np.clip(np.array(color) + rng.integers(-20, 20, (64, 64, 3)), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _base_model(tmp_path, monkeypatch):
+    import tensorflow as tf
+
+    model = tf.keras.Sequential(
+        [
+            tf.keras.Input((*ml.IMG_SIZE, 3)),
+            tf.keras.layers.AveragePooling2D(16),
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(2, activation="softmax"),
+        ]
+    )
+    model.save(tmp_path / "base.keras")
+    (tmp_path / "label_map.json").write_text(json.dumps({"healthy": 0, "wilting": 1}))
+    monkeypatch.setattr(ml, "MODEL_PATH", tmp_path / "base.keras")
+    monkeypatch.setattr(ml, "LABEL_MAP_PATH", tmp_path / "label_map.json")
+    monkeypatch.setattr(ml, "MODEL_DIR", tmp_path / "models")
+    monkeypatch.setattr(ml, "IMAGE_DIR", tmp_path / "images")
+    monkeypatch.setattr(ml, "SAVE_IMAGES", True)
+
+
+def test_feedback_labels():
+    known = retrain.known_classes({"healthy": 0, "wilting": 1})
+    assert retrain.feedback_label("Correct", "wilting", known) == "wilting"
+    assert retrain.feedback_label("yellow leaves", "healthy", known) == "yellow_leaves"
+    assert retrain.feedback_label("label: Root rot", "healthy", known) == "root_rot"
+    assert retrain.feedback_label("root rot", "healthy", known) is None
+    assert retrain.feedback_label("gresit", "healthy", known) is None
+    assert retrain.feedback_label("unknown", "healthy", known) is None
+    assert retrain.feedback_label("label:the leaves look odd!", "healthy", known) is None
+
+
+def test_old_images_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml, "IMAGE_DIR", tmp_path / "images")
+    monkeypatch.setattr(ml, "SAVE_IMAGES", True)
+    for seed in (0, 1):
+        ml.save_image(_photo(COLORS["healthy"], seed), ml.image_hash(_photo(COLORS["healthy"], seed)))
+    old = next(ml.IMAGE_DIR.glob("*/*.img"))
+    os.utime(old, (time.time() - 10 * 86400,) * 2)
+
+    assert ml.prune_images(max_age_days=7) == 1
+    assert not old.exists() and len(list(ml.IMAGE_DIR.glob("*/*.img"))) == 1
+    assert ml.prune_images(max_age_days=0) == 0
+
+
+def test_retrain_publishes_version_and_workers_swap(tmp_path, monkeypatch):
+    _base_model(tmp_path, monkeypatch)
+    db = SQLiteStorage(str(tmp_path / "local.db"))
+    logs = []
+    for i in range(60):
+        label = list(COLORS)[i % 3]
+        photo = _photo(COLORS[label], i)
+        digest = ml.image_hash(photo)
+        ml.save_image(photo, digest)
+        feedback = "label:root_rot" if label == "root_rot" else label
+        logs.append({"predicted_class": "healthy", "image_hash": digest, "user_feedback": feedback})
+    logs.append({"predicted_class": "healthy", "image_hash": "ab" * 20})
+    db.insert("diagnostic_logs", logs)
+
+    monkeypatch.setattr(ml, "_backend", None)
+    monkeypatch.setattr(ml, "_index_to_class", None)
+    monkeypatch.setattr(ml, "_loaded_version", None)
+    ml.load_model()
+
+    report = retrain.retrain(db, epochs=200, min_examples=5, feedback_dir=tmp_path / "feedback")
+    assert report["classes"] == ["healthy", "wilting", "root_rot"]
+    assert report["labeled"] == 60 and report["embedded_now"] == 60
+    assert report["published"] == "v0001"
+    assert report["accuracy"] >= report["baseline_accuracy"]
+    assert ml.current_version() == "v0001"
+
+    again = retrain.retrain(db, epochs=1, dry_run=True, feedback_dir=tmp_path / "feedback")
+    assert again["embedded_now"] == 0 and again["parent"] == "v0001"
+
+    assert ml.check_for_update(force=True)
+    for _ in range(100):
+        if ml._loaded_version == "v0001":
+            break
+        time.sleep(0.1)
+    _, index_to_class = ml.load_model()
+    assert sorted(index_to_class.values()) == sorted(COLORS)
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.services import ingest, rollups
+from main import app
+
+client = TestClient(app)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def test_incremental_rollups_match_vectorized_aggregate():
+    rng = np.random.default_rng(0)
+    timestamps = 1_700_000_000 + np.sort(rng.uniform(0, 3 * 3600, 500))
+    values = rng.uniform(0, 100, 500)
+    store = rollups.Rollups()
+    store.covered_since = timestamps[0] - 1
+    store.add_rows([{"timestamp": _iso(t), "soil_moisture": v} for t, v in zip(timestamps, values)])
+
+    expected = rollups.aggregate(timestamps, values, 3600)
+    result = store.query("default", "soil_moisture", "hour", timestamps[0], timestamps[-1] + 1)
+    assert [r["count"] for r in result] == [cell[0] for cell in expected.values()]
+    for row, (count, total, lo, hi) in zip(result, expected.values()):
+        assert row["min"] == lo and row["max"] == hi
+        assert abs(row["mean"] - total / count) < 1e-9
+
+
+def test_sensor_stats_combines_backfill_and_live_rows(monkeypatch):
+    store = rollups.Rollups()
+    monkeypatch.setattr(rollups, "store", store)
+    monkeypatch.setattr(ingest.sensor_buffer, "_insert", lambda rows: None)
+    bucket = int(store.covered_since // 3600) * 3600
+    old = [{"timestamp": _iso(bucket - 1800), "soil_moisture": 10.0, "temperature": None}]
+    calls = []
+    monkeypatch.setattr(rollups, "fetch_raw", lambda device, start, end: calls.append(device) or old)
+
+    client.post("/api/sensor-data", json={"device_id": "d1", "soil_moisture": 30, "temperature": 21.5})
+    params = {"device_id": "d1", "metric": "soil_moisture", "resolution": "hour", "start": _iso(bucket - 3600)}
+    first = client.get("/api/sensor-stats", params=params).json()
+    second = client.get("/api/sensor-stats", params=params).json()
+
+    assert calls == ["d1"]
+    assert first == second
+    rows = first["metrics"]["soil_moisture"]
+    assert [r["count"] for r in rows] == [1, 1]
+    assert rows[0]["mean"] == 10.0 and rows[1]["max"] == 30
+
+
+def test_epoch_timestamps_are_accepted(monkeypatch):
+    stored = []
+    monkeypatch.setattr(rollups, "store", rollups.Rollups())
+    monkeypatch.setattr(ingest.sensor_buffer, "_insert", stored.extend)
+    now = datetime.now(timezone.utc).timestamp()
+
+    for ts in (int(now), now * 1000):
+        resp = client.post("/api/sensor-data", json={"device_id": "epoch", "timestamp": ts, "soil_moisture": 40 + len(stored)})
+        assert resp.status_code == 200
+    assert rollups.to_epoch(stored[0]["timestamp"]) == int(now)
+    assert abs(rollups.to_epoch(stored[1]["timestamp"]) - now) < 1e-3
+
+
+def test_late_rows_are_counted_once_and_pruned_by_age(monkeypatch):
+    store = rollups.Rollups()
+    late = {"device_id": "late", "timestamp": _iso(store.covered_since - 600), "soil_moisture": 20.0}
+    store.add_rows([late])
+    monkeypatch.setattr(rollups, "fetch_raw", lambda device, start, end: [late])
+    asyncio.run(store.ensure_covered("late", store.covered_since - 3600))
+    result = store.query("late", "soil_moisture", "minute", store.covered_since - 3600, store.covered_since)
+    assert [r["count"] for r in result] == [1]
+
+    # A row arriving after the backfill is live data for that range.
+    store.add_rows([{**late, "timestamp": _iso(store.covered_since - 540)}])
+    newest = store.covered_since + rollups.RETENTION["minute"] + 120
+    store.add_rows([{**late, "timestamp": _iso(newest)}])
+    series = store._buckets[("late", "soil_moisture", "minute")]
+    assert list(series) == [int(newest // 60) * 60]
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.ml.schedule_predict import recommend_watering, recommend_watering_batch
+
+
+class _Model:
+    def predict(self, df):
+        return np.c_[100 - 2 * df["soil_moisture"].to_numpy(), df["temperature"].to_numpy() / 10]
+
+
+FORECAST = pd.DataFrame(
+    {
+        "date": pd.to_datetime(["2026-01-01 06:00", "2026-01-01 18:00", "2026-01-02 00:00"]),
+        "weather_outside": ["sunny", "rainy", "rainy"],
+    }
+)
+
+
+def _reference_recommend_watering(model, row, forecast_df=None, moisture_threshold=60.0):
+    """The single-row algorithm as it was before the batch version, kept to check parity."""
+    timestamp = row.get("timestamp")
+    input_row = row.copy()
+    if "timestamp" in input_row:
+        input_row.pop("timestamp")
+
+    preds = model.predict(pd.DataFrame([input_row]))[0]
+    vol, next_days = float(preds[0]), float(preds[1])
+
+    avoid = False
+    if row["soil_moisture"] >= moisture_threshold or vol <= 0:
+        avoid = True
+        vol = 0.0
+
+    if forecast_df is not None and timestamp is not None:
+        today = pd.to_datetime(timestamp).date()
+        mask = forecast_df["date"].dt.date == today
+        if mask.any() and forecast_df.loc[mask, "weather_outside"].iloc[0] == "rainy":
+            avoid = True
+            vol = 0.0
+
+    next_dt = pd.to_datetime(timestamp) + timedelta(days=next_days) if timestamp else None
+    return {
+        "water_given_ml": round(vol, 1),
+        "avoid_overwatering": avoid,
+        "next_watering_datetime": next_dt.strftime("%Y-%m-%d %H:%M") if next_dt is not None else None,
+    }
+
+
+def test_batch_matches_single_row_recommendations():
+    rows = [
+        {"soil_moisture": 20.0, "temperature": 24.0, "timestamp": "2026-01-01 08:00"},
+        {"soil_moisture": 20.0, "temperature": 24.0, "timestamp": "2026-01-02 08:00"},
+        {"soil_moisture": 70.0, "temperature": 10.0, "timestamp": "2026-01-03 08:00"},
+        {"soil_moisture": 30.0, "temperature": 12.0, "timestamp": None},
+    ]
+    batch = recommend_watering_batch(_Model(), pd.DataFrame(rows), FORECAST).to_dict("records")
+
+    assert batch == [_reference_recommend_watering(_Model(), row, FORECAST) for row in rows]
+    assert [recommend_watering(_Model(), row, FORECAST) for row in rows] == batch
+    assert [r["avoid_overwatering"] for r in batch] == [False, True, True, False]
+    assert batch[0] == {"water_given_ml": 60.0, "avoid_overwatering": False, "next_watering_datetime": "2026-01-03 17:36"}
+    assert batch[3]["next_watering_datetime"] is None
+
+
+def test_batch_matches_reference_on_edge_cases():
+    rows = [
+        {"soil_moisture": 60.0, "temperature": 20.0, "timestamp": "2026-01-01 08:00"},
+        {"soil_moisture": 50.0, "temperature": 20.0, "timestamp": "2026-01-04 08:00"},
+        {"soil_moisture": 55.0, "temperature": 31.0, "timestamp": "2026-01-01 23:59"},
+        {"soil_moisture": 12.3, "temperature": 18.7, "timestamp": "2026-01-02 00:00"},
+    ]
+    for forecast in (FORECAST, None):
+        batch = recommend_watering_batch(_Model(), pd.DataFrame(rows), forecast).to_dict("records")
+        assert batch == [_reference_recommend_watering(_Model(), row, forecast) for row in rows]
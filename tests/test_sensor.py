@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+
+from app.services import ingest, state
+from main import app
+from app.utils.security import API_SECRET
+
+client = TestClient(app)
+
+
+def test_latest_reading_is_indexed_per_device(monkeypatch):
+    stored = []
+    monkeypatch.setattr(ingest.sensor_buffer, "_insert", stored.extend)
+    monkeypatch.setattr(state, "latest", state.LatestStateIndex())
+
+    for device, soil in [("a", 20), ("b", 50), ("a", 30)]:
+        resp = client.post("/api/sensor-data", json={"device_id": device, "soil_moisture": soil})
+        assert resp.status_code == 200
+
+    resp = client.get("/api/sensors?device_id=a", headers={"x-api-key": API_SECRET})
+    assert resp.json()["soil_moisture"] == 30
+    assert len(stored) == 3
+    assert set(client.get("/api/devices", headers={"x-api-key": API_SECRET}).json()) == {"a", "b"}
+
+
+def test_latest_state_compares_timestamps_as_instants():
+    index = state.LatestStateIndex()
+    index.update([{"device_id": "tz", "timestamp": "2026-01-01T10:00:00+02:00", "soil_moisture": 1}])
+    index.update([{"device_id": "tz", "timestamp": "2026-01-01T08:30:00.5+00:00", "soil_moisture": 2}])
+    index.update([{"device_id": "tz", "timestamp": "2026-01-01T08:15:00Z", "soil_moisture": 3}])
+    assert index.get("tz")["soil_moisture"] == 2
+
+
+def test_filtered_reading_never_triggers_watering(monkeypatch):
+    monkeypatch.setattr(ingest.sensor_buffer, "_insert", lambda rows: None)
+    reading = {"device_id": "filtered", "plant_type": "ficus", "soil_moisture": -999}
+
+    resp = client.post("/api/sensor-data", json=reading)
+    assert resp.status_code == 200
+    assert resp.json()["water_now"] is False and resp.json()["reason"] == "reading filtered"
+
+    resp = client.post("/api/sensor-data/batch", json=[reading])
+    assert resp.json()["accepted"] == 0 and resp.json()["water_now"] is False
+
+
+def test_malformed_timestamp_is_rejected_before_queueing(monkeypatch):
+    monkeypatch.setattr(state, "latest", state.LatestStateIndex())
+
+    for timestamp in ("yesterday", {"at": 1}, float("1e20")):
+        resp = client.post("/api/sensor-data", json={"device_id": "bad-ts", "timestamp": timestamp, "soil_moisture": 40})
+        assert resp.status_code == 422
+    resp = client.post("/api/sensor-data/batch", json=[{"device_id": "bad-ts", "soil_moisture": 40}, {"timestamp": "soon"}])
+    assert resp.status_code == 422
+    assert state.latest.get("bad-ts") is None
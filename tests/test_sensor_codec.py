@@ -0,0 +1,40 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.services import ingest, sensor_codec
+from main import app
+
+client = TestClient(app)
+
+
+def test_bounds_follow_sensor_log_fields():
+    assert sensor_codec.BOUNDS["soil_moisture"] == (0, 100)
+    assert sensor_codec.BOUNDS["temperature"] == (-20, 60)
+
+
+def test_binary_batch_is_decoded_and_validated(monkeypatch):
+    stored = []
+    monkeypatch.setattr(ingest.sensor_buffer, "_insert", stored.extend)
+    now = int(time.time())
+    readings = [
+        {"timestamp": now - 60, "soil_moisture": 42.5, "temperature": 21.0, "air_humidity": 55, "light": 900},
+        {"timestamp": 0, "soil_moisture": 140, "temperature": 21.0, "air_humidity": 55, "light": 900},
+        {"timestamp": now + 86400, "soil_moisture": 40, "temperature": 21.0, "air_humidity": 55, "light": 900},
+        {"timestamp": 0, "soil_moisture": 41, "temperature": 22.5, "air_humidity": 50, "light": 800},
+    ]
+    body = sensor_codec.encode(readings, device_id="esp-1", plant_type="rosie")
+
+    resp = client.post("/api/sensor-data/binary", content=body, headers={"Content-Type": "application/octet-stream"})
+
+    assert resp.status_code == 200
+    assert resp.json()["accepted"] == 2 and resp.json()["rejected"] == 2
+    assert [row["soil_moisture"] for row in stored] == [42.5, 41.0]
+    assert stored[0]["device_id"] == "esp-1" and stored[0]["plant_type"] == "rosie"
+    assert stored[0]["timestamp"].endswith("+00:00")
+
+
+def test_malformed_binary_payload_is_rejected():
+    body = sensor_codec.encode([{"soil_moisture": 40}], device_id="esp-1")
+    assert client.post("/api/sensor-data/binary", content=body[:-1]).status_code == 400
+    assert client.post("/api/sensor-data/binary", content=b"JSON" + body[4:]).status_code == 400
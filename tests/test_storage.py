@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from app.utils.storage import SQLiteStorage, StorageBackend, SupabaseSync
+
+
+class _Remote:
+    """Stands in for Supabase: rows keyed by id, upserted on ``sync_key``."""
+
+    def __init__(self, on_upsert=None, drop_response=False):
+        self.rows = {}
+        self.on_upsert = on_upsert
+        self.drop_response = drop_response
+
+    def upsert(self, table, rows, key):
+        ids = {row[key]: row_id for row_id, row in self.rows.items()}
+        stored = []
+        for row in rows:
+            row_id = ids.get(row[key]) or f"r{len(self.rows)}"
+            self.rows[row_id] = {**self.rows.get(row_id, {}), **row, "id": row_id}
+            stored.append(self.rows[row_id])
+        if self.on_upsert:
+            self.on_upsert()
+        return [] if self.drop_response else stored
+
+    def update(self, table, row_id, values):
+        self.rows[row_id].update(values)
+        return [self.rows[row_id]]
+
+
+def test_sqlite_storage_queries_by_device_and_time(tmp_path):
+    db = SQLiteStorage(str(tmp_path / "local.db"))
+    db.insert(
+        "sensor_logs",
+        [
+            {"device_id": "a", "timestamp": "2026-01-01T00:00:00+00:00", "soil_moisture": 40},
+            {"device_id": "b", "timestamp": "2026-01-01T00:01:00+00:00", "soil_moisture": 50},
+            {"device_id": "a", "timestamp": "2026-01-01T00:02:00+00:00", "soil_moisture": 30},
+            {"device_id": None, "timestamp": "2026-01-01T00:03:00+00:00", "soil_moisture": 20},
+        ],
+    )
+    assert [r["soil_moisture"] for r in db.recent("sensor_logs", 2)] == [20, 30]
+    assert [r["soil_moisture"] for r in db.recent("sensor_logs", 5, "a")] == [30, 40]
+    window = db.between("sensor_logs", "a", "2026-01-01T00:00:30+00:00", "2026-01-02", 0, 10)
+    assert [r["soil_moisture"] for r in window] == [30]
+    assert [r["soil_moisture"] for r in db.between("sensor_logs", None, "2026", "2027", 0, 10)] == [20]
+
+
+def test_sync_pushes_new_rows_then_updates(tmp_path):
+    db = SQLiteStorage(str(tmp_path / "local.db"))
+    remote = _Remote()
+    sync = SupabaseSync(db, remote, batch_size=10)
+    (log,) = db.insert("diagnostic_logs", [{"predicted_class": "healthy"}])
+
+    assert sync.sync_once() == 1
+    assert sync.sync_once() == 0
+    db.update("diagnostic_logs", log["id"], {"user_feedback": "correct"})
+    assert sync.sync_once() == 1
+    assert remote.rows["r0"]["user_feedback"] == "correct"
+    assert len(remote.rows) == 1
+
+
+def test_update_during_push_is_not_lost(tmp_path):
+    db = SQLiteStorage(str(tmp_path / "local.db"))
+    (log,) = db.insert("diagnostic_logs", [{"predicted_class": "healthy"}])
+    remote = _Remote(on_upsert=lambda: db.update("diagnostic_logs", log["id"], {"user_feedback": "wilting"}))
+    sync = SupabaseSync(db, remote, batch_size=10)
+
+    sync.sync_once()
+    remote.on_upsert = None
+    assert sync.sync_once() == 1
+    assert sync.sync_once() == 0
+    assert [row["user_feedback"] for row in remote.rows.values()] == ["wilting"]
+
+
+def test_retried_push_without_response_does_not_duplicate(tmp_path):
+    db = SQLiteStorage(str(tmp_path / "local.db"))
+    db.insert("sensor_logs", [{"device_id": "a", "soil_moisture": 40}, {"device_id": "a", "soil_moisture": 41}])
+    remote = _Remote(drop_response=True)
+    sync = SupabaseSync(db, remote, batch_size=10)
+
+    assert sync.sync_once() == 0
+    remote.drop_response = False
+    assert sync.sync_once() == 2
+    assert sync.sync_once() == 0
+    assert len(remote.rows) == 2
+
+
+def test_sync_loop_waits_when_a_pass_marks_nothing(tmp_path):
+    db = SQLiteStorage(str(tmp_path / "local.db"))
+    db.insert("sensor_logs", [{"device_id": "a", "soil_moisture": 40}])
+    upserts = []
+    remote = _Remote(on_upsert=lambda: upserts.append(1), drop_response=True)
+    sync = SupabaseSync(db, remote, interval=60, batch_size=1)
+
+    async def run():
+        sync.start()
+        await asyncio.sleep(0.3)
+        await sync.stop()
+
+    asyncio.run(run())
+    assert len(upserts) == 1 and sync.synced_rows == 0
+
+
+def test_backend_missing_a_method_fails_at_instantiation():
+    class InsertOnly(StorageBackend):
+        def insert(self, table, rows):
+            return rows
+
+    with pytest.raises(TypeError):
+        InsertOnly()
+
+
+def test_supabase_migration_covers_every_written_column():
+    from pathlib import Path
+
+    from app.utils.storage import COLUMNS
+
+    sql = (Path(__file__).parents[1] / "migrations" / "001_sync_columns.sql").read_text()
+    for table, columns in COLUMNS.items():
+        for column, sql_type in {**columns, "sync_key": "text"}.items():
+            assert f"alter table {table} add column if not exists {column} {sql_type}" in sql
+        assert f"create unique index if not exists {table}_sync_key on {table} (sync_key)" in sql
@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+
+from app.services import ml, warmup, watering
+from main import app
+
+client = TestClient(app)
+
+
+def test_ready_only_after_all_models_warm(monkeypatch):
+    monkeypatch.setattr(warmup, "status", {"ready": False, "started": True, "duration_ms": None, "models": {}})
+    assert client.get("/health/ready").status_code == 503
+
+    monkeypatch.setattr(ml, "warm_up", lambda: {"load_ms": 1.0, "warmup_ms": 1.0})
+    monkeypatch.setattr(watering, "warm_up", lambda: {"load_ms": 1.0, "warmup_ms": 1.0})
+    warmup.warm_up()
+    resp = client.get("/health/ready")
+    assert resp.status_code == 200
+    assert resp.json()["models"]["diagnosis"]["ok"]
+
+
+def test_failed_warm_up_recovers_once_model_loads(monkeypatch):
+    monkeypatch.setattr(warmup, "status", {"ready": False, "started": True, "duration_ms": None, "models": {}})
+
+    def fail():
+        raise RuntimeError("model file busy")
+
+    monkeypatch.setattr(ml, "warm_up", fail)
+    monkeypatch.setattr(watering, "warm_up", lambda: {"load_ms": 1.0, "warmup_ms": 1.0})
+    warmup.warm_up()
+    assert client.get("/health/ready").status_code == 503
+
+    monkeypatch.setattr(ml, "is_loaded", lambda: True)
+    resp = client.get("/health/ready")
+    assert resp.status_code == 200
+    assert resp.json()["models"]["diagnosis"]["loaded_lazily"]
+
+    monkeypatch.setattr(ml, "is_loaded", lambda: False)
+    monkeypatch.setattr(ml, "warm_up", lambda: {"load_ms": 1.0, "warmup_ms": 1.0})
+    warmup.warm_up(only_failed=True)
+    assert client.get("/health/ready").status_code == 200
@@ -0,0 +1,65 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import OneHotEncoder
+
+from app.models.schemas import PredictRequest
+from app.services import watering
+
+
+def _fit(monkeypatch):
+    rng = np.random.default_rng(0)
+    plants = np.array(["rosie", "ficus", "cactus"])[rng.integers(0, 3, 60)]
+    encoder = OneHotEncoder(handle_unknown="ignore").fit(pd.DataFrame({"plant_type": plants}))
+    numeric = rng.uniform(0, 100, (60, len(watering.NUMERIC_FEATURES)))
+    columns = watering.NUMERIC_FEATURES + list(encoder.get_feature_names_out(["plant_type"]))
+    frame = pd.DataFrame(
+        np.hstack([numeric, encoder.transform(pd.DataFrame({"plant_type": plants})).toarray()]),
+        columns=columns,
+    )
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(frame, rng.uniform(0, 10, (60, 2)))
+    monkeypatch.setattr(watering, "multi_rf", model)
+    monkeypatch.setattr(watering, "plant_type_encoder", encoder)
+    return model, frame.columns
+
+
+def _request(plant_type, soil):
+    return PredictRequest(
+        soil_moisture=soil,
+        temperature=22,
+        air_humidity=50,
+        light=300,
+        last_watered_days=2,
+        ml_prediction_prev=1,
+        plant_type=plant_type,
+    )
+
+
+def test_batch_matches_dataframe_prediction(monkeypatch):
+    model, columns = _fit(monkeypatch)
+    reqs = [_request("rosie", 20), _request("cactus", 70), _request("unknown", 40)]
+    expected = model.predict(
+        pd.DataFrame(
+            [[r.soil_moisture, 22, 50, 300, 2, 1, r.plant_type == "cactus", r.plant_type == "ficus", r.plant_type == "rosie"] for r in reqs],
+            columns=columns,
+        ).astype(float)
+    )
+    got = watering.predict_many(reqs)
+    assert np.allclose(got, expected)
+    assert np.allclose(watering.predict(reqs[0]), expected[0])
+
+
+def test_predict_uses_arrays_without_feature_name_warnings(monkeypatch):
+    model, _ = _fit(monkeypatch)
+    watering.predict(_request("rosie", 20))
+
+    def no_frames(*args, **kwargs):
+        raise AssertionError("DataFrame allocated during prediction")
+
+    monkeypatch.setattr(pd.DataFrame, "__init__", no_frames)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        watering.predict_many([_request("ficus", 30), _request("cactus", 60)])
+    assert hasattr(model, "feature_names_in_")